@@ -2,6 +2,7 @@
 
 import      Class.Adf24Tx2Rx4 as Adf24Tx2Rx4
 import      Class.RadarProc as RadarProc
+import      Class.AcqThread as AcqThread
 from        numpy import *
 import      time as time
 
@@ -111,11 +112,20 @@ n               =   arange(int(dCfg['N']))
 Range           =   Proc.GetRangeProfile('Range')
 
 
+# Frames are read in the background while the last one is processed and plotted
+Acq             =   AcqThread.AcqThread(Brd, {"NrFrms": 16})
+Acq.Strt()
+
 DataTx1         =   zeros((256*dCfg["StopIdx"]*4, int(NrFrms)))
 for Cycles in range(0, int(NrFrms)):
-    Data        =   Brd.BrdGetData()
+    Seq, Ts, Data   =   Acq.GetNext()
     Rp          =   Proc.RangeProfile(Data)
-
+    if DispRp == 0:
+        # The plot keeps the samples, the ring slot is reused
+        Data    =   array(Data)
+    if not Acq.Check(Seq):
+        # The thread overwrote the frame while it was processed: drop it
+        continue
 
     Plot1.clear()
     Plot2.clear()
@@ -134,6 +144,7 @@ for Cycles in range(0, int(NrFrms)):
         Plot4.plot(n[1:],Data[1:,3], pen=Pen4)
     pg.QtGui.QApplication.processEvents()
 
-
+Acq.Stop()
+print("Frames: ", Acq.GetSts())
 
 del Brd
@@ -47,6 +47,11 @@ Plot7.showGrid(x=True, y=True)
 Plot8       =   Win.addPlot(title="Tx2-Rx4", col=3, row=1)
 Plot8.showGrid(x=True, y=True)
 
+# Angle spectrum of the virtual array, maximum over the range bins
+Plot9       =   Win.addPlot(title="Tx1/Tx2 virtual array", col=0, row=2, colspan=4)
+Plot9.showGrid(x=True, y=True)
+Plot9.setLabel('bottom', "Angle (deg)")
+
 Pen1        =   pg.mkPen(color=(0, 0, 255), width=1)
 Pen2        =   pg.mkPen(color=(0, 255, 0), width=1)
 Pen3        =   pg.mkPen(color=(255, 0, 0), width=1)
@@ -86,7 +91,9 @@ dCfg        =   {
                     "Tp"        :   300/1.0e6,
                     "N"         :   256,
                     "StrtIdx"   :   0,
-                    "StopIdx"   :   2,
+                    # 8 Tx1/Tx2 pairs per frame: the Doppler compensation
+                    # of the virtual array needs more than one pair
+                    "StopIdx"   :   16,
                     "MimoEna"   :   1
                 }
 
@@ -109,11 +116,33 @@ dRpCfg          =   {
                         "RMin"          :   1,
                         "RMax"          :   50,
                         "dB"            :   1,
-                        "Ext"           :   1
+                        "Ext"           :   1,
+                        "N"             :   dCfg["N"]
                     }       
 
+# Virtual array of Tx1/Tx2 for beamforming
+dUlaCfg         =   {
+                        "fs"            :   fs,
+                        "kf"            :   kf,
+                        "FuSca"         :   FuSca,
+                        "RangeFFT"      :   2**10,
+                        "Abs"           :   1,
+                        "dB"            :   1,
+                        "Ext"           :   1,
+                        "RMin"          :   1,
+                        "RMax"          :   10,
+                        "Mode"          :   'Steer',
+                        "Ang"           :   arange(-60, 61),
+                        "RxPosn"        :   Brd.RfGet('RxPosn'),
+                        "TxPosn"        :   Brd.RfGet('TxPosn'),
+                        "fc"            :   Brd.RfGet('fc'),
+                        "N"             :   dCfg["N"],
+                        "MimoEna"       :   dCfg["MimoEna"]
+                    }
+
 Proc            =   RadarProc.RadarProc()
 Proc.CfgRangeProfile(dRpCfg)
+Proc.CfgBeamformingUla(dUlaCfg)
 
 
 fStrt           =   Brd.Adf_Pll.fStrt
@@ -122,15 +151,21 @@ TRampUp         =   Brd.Adf_Pll.TRampUp
 n               =   arange(int(dCfg['N']))
 N               =   int(dCfg['N'])
 Range           =   Proc.GetRangeProfile('Range')
+Ang             =   Proc.GetBeamformingUla('Ang')
 
 
 DataTx1         =   zeros((256*dCfg["StopIdx"]*4, int(NrFrms)))
 for Cycles in range(0, int(NrFrms)):
     Data        =   Brd.BrdGetData()
     Data1       =   Data[0:N,:]
-    Data2       =   Data[N:,:]
-    Rp1         =   Proc.RangeProfile(Data1)
-    Rp2         =   Proc.RangeProfile(Data2)
+    Data2       =   Data[N:2*N,:]
+    # Range profiles of both chirps in one call: Tx1, Tx2
+    Rp          =   Proc.RangeProfileBatch(Data)
+    Rp1         =   Rp[0]
+    Rp2         =   Rp[1]
+    # 8 element virtual array: range bins x angles
+    JOpt        =   Proc.BeamformingUla(Data)
+    JMax        =   amax(JOpt, axis=0)
 
     Plot1.clear()
     Plot2.clear()
@@ -140,6 +175,7 @@ for Cycles in range(0, int(NrFrms)):
     Plot6.clear()
     Plot7.clear()
     Plot8.clear()
+    Plot9.clear()
 
     if DispRp > 0:
         Plot1.plot(Range,Rp1[:,0], pen=Pen1)   
@@ -159,6 +195,7 @@ for Cycles in range(0, int(NrFrms)):
         Plot6.plot(n[1:],Data2[1:,1], pen=Pen2)
         Plot7.plot(n[1:],Data2[1:,2], pen=Pen3)
         Plot8.plot(n[1:],Data2[1:,3], pen=Pen4)        
+    Plot9.plot(Ang, JMax - amax(JMax), pen=Pen1)
     pg.QtGui.QApplication.processEvents()
 
 
@@ -1,6 +1,7 @@
 # AN77_05 -- Mimo processing
 import  Class.Adf24Tx2Rx4 as Adf24Tx2Rx4
 import  Class.RadarProc as RadarProc
+import  Class.AcqThread as AcqThread
 import  time as time
 import  matplotlib.pyplot as plt
 from    numpy import *
@@ -98,11 +99,18 @@ Range           =   Proc.GetRangeProfile('Range')
 #--------------------------------------------------------------------------
 # Measure and calculate DBF
 #--------------------------------------------------------------------------
+# Frames are read in the background; GetNext skips the ones the plot is too slow for
+Acq             =   AcqThread.AcqThread(Brd, {"NrFrms": 16})
+Acq.Strt()
+
 for MeasIdx in range(0,int(dCfg["NrFrms"])):
-    Data        =   Brd.BrdGetData()
+    Seq, Ts, Data   =   Acq.GetNext()
     RP          =   Proc.RangeProfile(Data)
 
     JOpt        =   Proc.BeamformingUla(Data)
+    if not Acq.Check(Seq):
+        # The thread overwrote the frame while it was processed: drop it
+        continue
     #print("Siz ", JOpt.shape)
     #print(JOpt)
     JMax        =   amax(JOpt)
@@ -115,4 +123,5 @@ for MeasIdx in range(0,int(dCfg["NrFrms"])):
 
     plt.pause(0.001)
 
-
+Acq.Stop()
+print("Frames: ", Acq.GetSts())
@@ -0,0 +1,197 @@
+# AcqThread.py -- AcqThread class
+#
+# Background acquisition: a thread runs the BrdGetData request/read cycle
+# and writes the frames into a preallocated ring buffer, so processing and
+# plotting of one frame overlap with the transfer of the next ones.
+#
+# The ring holds every frame twice (slot Idx and Idx + NrFrms). Any window
+# of up to NrFrms consecutive frames is then one contiguous block and is
+# returned as a view. The thread is the only writer: it fills a slot and
+# then publishes the frame by advancing Seq, so readers never take a lock.
+# A view stays valid until the thread comes round to its slot again, which
+# Check(Seq) tells.
+
+from    numpy import *
+import  threading
+import  time
+
+class AcqThread(object):
+
+    def __init__(self, Brd, dCfg=None):
+        self.Brd            =   Brd             # object with BrdGetData()
+        self.Acq_NrFrms     =   64              # ring depth in frames
+        self.Acq_Timeout    =   2.0             # GetNext timeout in s
+
+        self.Buf            =   None
+        self.SeqBuf         =   None
+        self.TsBuf          =   None
+        self.Seq            =   -1              # last published frame
+        self.ReadSeq        =   -1              # last frame returned by GetNext
+        self.NrOverrun      =   0               # frames lost by GetNext
+        self.NrErr          =   0
+        self.Err            =   None
+        self.Thread         =   None
+        self.BrdView        =   0               # board RdView setting before Strt
+        self.StopEvt        =   threading.Event()
+        self.NewFrm         =   threading.Event()
+
+        if dCfg is not None:
+            self.CfgAcq(dCfg)
+
+    def CfgAcq(self, dCfg):
+        #   @function       CfgAcq
+        #   @brief          Configure the acquisition; takes effect at Strt
+        #           NrFrms:         Frames kept in the ring (window length limit)
+        #           Timeout:        Seconds GetNext waits for a frame
+        if 'NrFrms' in dCfg:
+            self.Acq_NrFrms     =   int(dCfg["NrFrms"])
+            if self.Acq_NrFrms < 2:
+                self.Acq_NrFrms =   2
+        if 'Timeout' in dCfg:
+            self.Acq_Timeout    =   dCfg["Timeout"]
+
+    def Strt(self):
+        #   @function       Strt
+        #   @brief          Read the first frame, allocate the ring for its
+        #                   shape and start the acquisition thread; restarts
+        #                   a thread that stopped on an error
+        if self.Thread is not None and self.Thread.is_alive():
+            return
+        # Put copies every frame, so the board can return views of its
+        # read buffers (DemoRad Set('RdView'))
+        if hasattr(self.Brd, 'ChirpBuf_View'):
+            if self.Thread is None:
+                self.BrdView    =   self.Brd.Get('RdView')
+            self.Brd.Set('RdView', 1)
+        try:
+            Data        =   asarray(self.Brd.BrdGetData())
+        except Exception:
+            # No thread runs that Stop could end: leave the board as it was
+            if hasattr(self.Brd, 'ChirpBuf_View'):
+                self.Brd.Set('RdView', self.BrdView)
+            self.Thread     =   None
+            raise
+        NrFrms          =   self.Acq_NrFrms
+        self.Buf        =   zeros((2*NrFrms,) + Data.shape, dtype = Data.dtype)
+        self.SeqBuf     =   zeros(2*NrFrms, dtype = int64)
+        self.TsBuf      =   zeros(2*NrFrms)
+        self.Seq        =   -1
+        self.ReadSeq    =   -1
+        self.NrOverrun  =   0
+        self.NrErr      =   0
+        self.Err        =   None
+        self.Put(Data, time.time())
+
+        self.StopEvt.clear()
+        self.Thread         =   threading.Thread(target=self.Run, name="AcqThread")
+        self.Thread.daemon  =   True
+        self.Thread.start()
+
+    def Stop(self):
+        if self.Thread is None:
+            return
+        self.StopEvt.set()
+        self.Thread.join()
+        self.Thread     =   None
+        if hasattr(self.Brd, 'ChirpBuf_View'):
+            self.Brd.Set('RdView', self.BrdView)
+
+    def Run(self):
+        while not self.StopEvt.is_set():
+            try:
+                Data    =   self.Brd.BrdGetData()
+            except Exception as Err:
+                # The board is gone or the transfer broke: stop and report it
+                self.NrErr  +=  1
+                self.Err    =   Err
+                self.NewFrm.set()
+                return
+            self.Put(Data, time.time())
+
+    def Put(self, Data, Ts):
+        Seq     =   self.Seq + 1
+        Idx     =   Seq % self.Acq_NrFrms
+        Idx2    =   Idx + self.Acq_NrFrms
+        self.Buf[Idx]       =   Data
+        self.Buf[Idx2]      =   self.Buf[Idx]
+        self.SeqBuf[Idx]    =   Seq
+        self.SeqBuf[Idx2]   =   Seq
+        self.TsBuf[Idx]     =   Ts
+        self.TsBuf[Idx2]    =   Ts
+        # Publish after the slot is complete
+        self.Seq            =   Seq
+        self.NewFrm.set()
+
+    def GetLatest(self):
+        #   @function       GetLatest
+        #   @brief          Newest frame as (Seq, Ts, Data view)
+        Seq     =   self.Seq
+        if Seq < 0:
+            return None
+        Idx     =   Seq % self.Acq_NrFrms
+        return Seq, self.TsBuf[Idx], self.Buf[Idx]
+
+    def GetWindow(self, NrFrms, Seq=None):
+        #   @function       GetWindow
+        #   @brief          NrFrms consecutive frames ending at Seq (default:
+        #                   newest) as views (Seqs, Ts, Data), oldest first
+        if NrFrms > self.Acq_NrFrms:
+            raise ValueError("AcqThread: window of %d frames exceeds the ring of %d" % (NrFrms, self.Acq_NrFrms))
+        if Seq is None:
+            Seq     =   self.Seq
+        if Seq - NrFrms + 1 < 0 or self.Seq - Seq >= self.Acq_NrFrms - NrFrms:
+            return None
+        Idx     =   (Seq - NrFrms + 1) % self.Acq_NrFrms
+        return self.SeqBuf[Idx:Idx+NrFrms], self.TsBuf[Idx:Idx+NrFrms], self.Buf[Idx:Idx+NrFrms]
+
+    def GetNext(self):
+        #   @function       GetNext
+        #   @brief          Oldest frame not yet returned as (Seq, Ts, Data view);
+        #                   waits up to Timeout. Frames the thread has already
+        #                   overwritten are skipped and counted as overruns.
+        while self.Seq <= self.ReadSeq:
+            if self.Err is not None:
+                raise RuntimeError("AcqThread: acquisition stopped: %s" % self.Err)
+            self.NewFrm.clear()
+            if self.Seq > self.ReadSeq:
+                break
+            if not self.NewFrm.wait(self.Acq_Timeout):
+                raise RuntimeError("AcqThread: no frame within %g s" % self.Acq_Timeout)
+
+        Seq     =   self.ReadSeq + 1
+        # One slot of margin: the thread may be writing the slot after Seq
+        Oldest  =   self.Seq - self.Acq_NrFrms + 2
+        if Seq < Oldest:
+            self.NrOverrun  +=  Oldest - Seq
+            Seq             =   Oldest
+        self.ReadSeq    =   Seq
+        Idx     =   Seq % self.Acq_NrFrms
+        return Seq, self.TsBuf[Idx], self.Buf[Idx]
+
+    def Check(self, Seq, NrFrms=1):
+        #   @function       Check
+        #   @brief          True while the views of the NrFrms frames ending at Seq
+        #                   have not been overwritten; call after processing them
+        Ok  =   self.Seq - Seq < self.Acq_NrFrms - NrFrms
+        if not Ok:
+            self.NrOverrun  +=  1
+        return Ok
+
+    def GetSts(self):
+        #   @function       GetSts
+        #   @brief          Acquisition state; FrmRate is measured over the ring
+        Seq                 =   self.Seq
+        dSts                =   dict()
+        dSts["Seq"]         =   Seq
+        dSts["Overrun"]     =   self.NrOverrun
+        dSts["Err"]         =   self.NrErr
+        dSts["Running"]     =   self.Thread is not None and self.Thread.is_alive()
+        dSts["FrmRate"]     =   0.0
+        NrFrms              =   self.Acq_NrFrms - 2
+        if Seq < NrFrms:
+            NrFrms          =   Seq
+        if NrFrms > 0:
+            Ts              =   self.TsBuf[Seq % self.Acq_NrFrms] - self.TsBuf[(Seq - NrFrms) % self.Acq_NrFrms]
+            if Ts > 0:
+                dSts["FrmRate"] =   NrFrms/Ts
+        return dSts
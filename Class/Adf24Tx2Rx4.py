@@ -219,7 +219,19 @@ class Adf24Tx2Rx4(DemoRad.DemoRad):
     def     BrdDispSts(self):
         self.BrdDispInf()
 
+    # DOXYGEN -------------------------------------------------
+    #> @brief Read one frame (chirps StrtIdx to StopIdx)
+    #>
+    #> Returns a new (samples x channels) array. With Set('RdView', 1) it
+    #> returns a view of a reused read buffer instead, which the read
+    #> Get('RdBufs') calls later overwrites; copy frames that are kept
+    #> longer (AcqThread copies every frame into its ring)
     def     BrdGetData(self):
+        if self.ChirpPipe_Depth > 1:
+            # Pipelined: (re)start when the chirp range changed (RfMeas)
+            if not self.ChirpPipe or self.ChirpPipe[-1] != (self.StrtIdx, self.StopIdx):
+                self.Dsp_GetChirpStrt(self.StrtIdx, self.StopIdx)
+            return self.Dsp_GetChirpNext()
         return self.Dsp_GetChirp(self.StrtIdx,self.StopIdx)
 
     def     RfGetChipSts(self):
@@ -0,0 +1,45 @@
+# BufPool.py -- BufPool class
+#
+# Named work buffers that are reused from frame to frame. A buffer is only
+# (re)allocated when its shape or dtype changes, so after the first frame
+# of a configuration the processing runs without new allocations. The
+# allocation counters make that visible.
+
+from    numpy import *
+
+class BufPool(object):
+
+    def __init__(self):
+        self.dBuf       =   dict()
+        self.NrAlloc    =   0               # allocations since the pool was created
+        self.NrAllocFrm =   0               # allocations since the last GetAllocs call
+
+    def Get(self, Name, Shape, Dtype):
+        #   @function       Get
+        #   @brief          Buffer Name with the given shape and dtype. The content
+        #                   is whatever the last user left in it; a new buffer is
+        #                   zero, so zero padding written once stays valid as long
+        #                   as only the data part is overwritten
+        Shape   =   tuple(int(Val) for Val in Shape)
+        Dtype   =   dtype(Dtype)
+        Buf     =   self.dBuf.get(Name)
+        if Buf is None or Buf.shape != Shape or Buf.dtype != Dtype:
+            Buf                 =   zeros(Shape, dtype=Dtype)
+            self.dBuf[Name]     =   Buf
+            self.NrAlloc        +=  1
+            self.NrAllocFrm     +=  1
+        return Buf
+
+    def GetAllocs(self):
+        #   @function       GetAllocs
+        #   @brief          Number of allocations since the last call; call once
+        #                   per frame to check that steady state allocates nothing
+        NrAlloc             =   self.NrAllocFrm
+        self.NrAllocFrm     =   0
+        return NrAlloc
+
+    def GetBytes(self):
+        return sum([Buf.nbytes for Buf in self.dBuf.values()])
+
+    def Clear(self):
+        self.dBuf.clear()
@@ -0,0 +1,365 @@
+# Cfar.py -- Cfar class
+#
+# Cell averaging (CA) and ordered statistic (OS) CFAR detectors for range
+# profiles. The detectors work on whole (range, channel) or
+# (frame, range, channel) arrays; range is always the second to last axis
+# as returned by RadarProc.RangeProfile and RadarProc.RangeProfileBatch.
+
+from    numpy import *
+from    numpy.lib.stride_tricks import sliding_window_view
+
+# Detection list returned by Cfar.Detect
+#   R:      Range of the peak (bin index if no range axis is given)
+#   Amp:    Amplitude of the peak
+#   Bins:   Number of consecutive bins above the threshold
+#   Idx:    Range bin of the peak
+#   Chn:    Channel
+#   Frm:    Frame (0 for a single frame)
+DetDtype    =   dtype([ ("R", float64), ("Amp", float64), ("Bins", int32),
+                        ("Idx", int32), ("Chn", int32), ("Frm", int32)])
+
+class Cfar(object):
+
+    def __init__(self, dCfg=None):
+        self.Type       =   'CA'
+        self.Lz         =   int(9)          # cells under test and guard cells
+        self.Lb         =   int(8)          # training cells before (lower range)
+        self.La         =   int(8)          # training cells after
+        self.K          =   -1              # OS: order of the statistic (-1: 3/4 of the cells)
+        self.ThresdB    =   10              # threshold above the statistic
+        self.dB         =   0               # input is in dB
+        self.Edge       =   0               # ignore targets within Edge bins of the ends
+        self.PeakExt    =   0               # bins beyond a target searched for its peak
+
+        if dCfg is not None:
+            self.CfgCfar(dCfg)
+
+    def CfgCfar(self, dCfg):
+        #   @function       CfgCfar
+        #   @brief          Configure the detector
+        #           Type:           'CA' (cell averaging) or 'OS' (ordered statistic)
+        #           Lz:             Width of the window around the cell under test
+        #                           that is excluded from the statistic
+        #           Lb:             Training cells before the window
+        #           La:             Training cells after the window
+        #           K:              OS: index of the ordered training cell
+        #           ThresdB:        Threshold above the statistic in dB
+        #           dB:             Input data is in dB (threshold is added)
+        #           Edge:           Number of bins at both ends without detections
+        #           PeakExt:        Bins on both sides of a target included in
+        #                           the search for its peak
+        if 'Type' in dCfg:
+            self.Type       =   dCfg["Type"].upper()
+        if 'Lz' in dCfg:
+            self.Lz         =   int(dCfg["Lz"])
+            if self.Lz < 1:
+                self.Lz     =   int(1)
+        if 'Lb' in dCfg:
+            self.Lb         =   int(dCfg["Lb"])
+            if self.Lb < 0:
+                self.Lb     =   int(0)
+        if 'La' in dCfg:
+            self.La         =   int(dCfg["La"])
+            if self.La < 0:
+                self.La     =   int(0)
+        if 'K' in dCfg:
+            self.K          =   int(dCfg["K"])
+        if 'ThresdB' in dCfg:
+            self.ThresdB    =   dCfg["ThresdB"]
+        if 'dB' in dCfg:
+            self.dB         =   dCfg["dB"]
+        if 'Edge' in dCfg:
+            self.Edge       =   int(dCfg["Edge"])
+        if 'PeakExt' in dCfg:
+            self.PeakExt    =   int(dCfg["PeakExt"])
+
+        if self.Type not in ('CA', 'OS'):
+            raise ValueError("Cfar: unknown Type " + str(self.Type))
+
+    def Thres(self, X):
+        #   @function       Thres
+        #   @brief          Threshold for every cell of X (..., range, channel)
+        X       =   self.Amp(X)
+        if self.Type == 'CA':
+            Stat    =   self.CaStat(X)
+        else:
+            Stat    =   self.OsStat(X)
+
+        if self.dB > 0:
+            Stat    +=  self.ThresdB
+        else:
+            Stat    *=  10**(self.ThresdB/20)
+        return Stat
+
+    def Amp(self, X):
+        X       =   asarray(X)
+        if iscomplexobj(X):
+            X   =   abs(X)
+        return X
+
+    def CaStat(self, X):
+        #   @function       CaStat
+        #   @brief          Mean of the training cells, from a cumulative sum
+        #                   along range; at the ends only the existing cells
+        #                   are averaged
+        Ny      =   X.shape[-2]
+        Sum     =   zeros(X.shape[:-2] + (Ny + 1, X.shape[-1]), dtype = result_type(X.dtype, float32))
+        cumsum(X, axis=-2, out=Sum[...,1:,:])
+
+        n       =   arange(Ny)
+        Lo      =   n - self.Lz//2
+        Hi      =   Lo + self.Lz
+        IdxB    =   clip(Lo - self.Lb, 0, Ny)
+        IdxLo   =   clip(Lo, 0, Ny)
+        IdxHi   =   clip(Hi, 0, Ny)
+        IdxA    =   clip(Hi + self.La, 0, Ny)
+
+        Stat    =   Sum[...,IdxLo,:] - Sum[...,IdxB,:]
+        Stat    +=  Sum[...,IdxA,:]
+        Stat    -=  Sum[...,IdxHi,:]
+        Cnt     =   (IdxLo - IdxB) + (IdxA - IdxHi)
+        Stat    /=  maximum(Cnt, 1)[:,newaxis]
+        return Stat
+
+    def OsStat(self, X):
+        #   @function       OsStat
+        #   @brief          K-th smallest training cell; cells beyond the ends
+        #                   count as infinite
+        Ny      =   X.shape[-2]
+        NTrain  =   self.Lb + self.La
+        K       =   self.K
+        if K < 0:
+            K   =   (3*NTrain)//4
+        if K > NTrain - 1:
+            K   =   NTrain - 1
+
+        Lo      =   self.Lz//2 + self.Lb
+        Hi      =   self.Lz + self.Lb + self.La - 1 - Lo
+        Pad     =   [(0, 0)]*X.ndim
+        Pad[-2] =   (Lo, Hi)
+        XPad    =   pad(X.astype(result_type(X.dtype, float32)), Pad, constant_values=inf)
+
+        # (..., range, channel, window) view; the guard window is skipped
+        Win     =   sliding_window_view(XPad, Lo + Hi + 1, axis=-2)
+        Cells   =   r_[0:self.Lb, self.Lb + self.Lz:self.Lb + self.Lz + self.La]
+        Train   =   Win[...,Cells]
+        Stat    =   partition(Train, K, axis=-1)[...,K]
+        return Stat
+
+    def Detect(self, X, Thres=None, Range=None):
+        #   @function       Detect
+        #   @brief          Targets of X (..., range, channel)
+        #                   Consecutive bins above the threshold form one
+        #                   target, reported at its maximum.
+        #           X:              Range profiles
+        #           Thres:          Threshold (default: Thres(X))
+        #           Range:          Range axis (optional)
+        #           Returns:        Structured array of DetDtype
+        X       =   self.Amp(X)
+        if Thres is None:
+            Thres   =   self.Thres(X)
+
+        Ny      =   X.shape[-2]
+        Nx      =   X.shape[-1]
+        # One row per (frame, channel) with range along the row
+        Amp     =   moveaxis(X, -1, -2).reshape(-1, Ny)
+        Mask    =   zeros((Amp.shape[0], Ny + 2), dtype=int8)
+        Mask[:,1:-1]    =   moveaxis(X > Thres, -1, -2).reshape(-1, Ny)
+
+        Edges       =   diff(Mask, axis=1)
+        Row, Strt   =   nonzero(Edges == 1)
+        Stop        =   nonzero(Edges == -1)[1]
+
+        Keep    =   (Strt >= self.Edge) & (Stop <= Ny - self.Edge)
+        Row     =   Row[Keep]
+        Strt    =   Strt[Keep]
+        Stop    =   Stop[Keep]
+
+        # Maximum of every run: flat indices of all cells, then the first
+        # cell of each run that equals the run maximum
+        Det         =   zeros(len(Row), dtype=DetDtype)
+        if len(Row) > 0:
+            Lo          =   clip(Strt - self.PeakExt, 0, Ny)
+            Len         =   clip(Stop + self.PeakExt, 0, Ny) - Lo
+            Offs        =   cumsum(Len) - Len
+            Seg         =   repeat(arange(len(Row)), Len)
+            Cells       =   arange(Len.sum()) - Offs[Seg] + repeat(Lo, Len)
+            Vals        =   Amp[Row[Seg], Cells]
+            Max         =   maximum.reduceat(Vals, Offs)
+            First       =   unique(Seg[Vals == Max[Seg]], return_index=True)[1]
+            Idx         =   Cells[flatnonzero(Vals == Max[Seg])[First]]
+
+            Det["Amp"]  =   Max
+            Det["Bins"] =   Stop - Strt
+            Det["Idx"]  =   Idx
+            Det["Chn"]  =   Row % Nx
+            Det["Frm"]  =   Row // Nx
+            if Range is None:
+                Det["R"]    =   Idx
+            else:
+                Det["R"]    =   asarray(Range)[Idx]
+        return Det
+
+# Detection list returned by Cfar2D.Detect
+#   R, V:       Range and velocity of the cell (bin indices if no axes are given)
+#   Amp:        Amplitude
+#   RIdx, VIdx: Range and velocity bin
+#   Frm:        Map index (0 for a single map)
+Det2DDtype  =   dtype([ ("R", float64), ("V", float64), ("Amp", float64),
+                        ("RIdx", int32), ("VIdx", int32), ("Frm", int32)])
+
+class Cfar2D(object):
+
+    def __init__(self, dCfg=None):
+        self.RangeLz    =   int(5)          # guard window (incl. cell under test) along range
+        self.RangeLb    =   int(4)          # training cells before / after along range
+        self.RangeLa    =   int(4)
+        self.VelLz      =   int(5)          # same along velocity
+        self.VelLb      =   int(4)
+        self.VelLa      =   int(4)
+        self.ThresdB    =   12
+        self.dB         =   0
+        self.VelWrap    =   1               # velocity axis is circular (Doppler FFT)
+        self.Peak       =   1               # report local maxima only
+
+        if dCfg is not None:
+            self.CfgCfar(dCfg)
+
+    def CfgCfar(self, dCfg):
+        #   @function       CfgCfar
+        #   @brief          Configure the detector
+        #           RangeLz, VelLz: Guard window around the cell under test
+        #           RangeLb, VelLb: Training cells before the guard window
+        #           RangeLa, VelLa: Training cells after the guard window
+        #           ThresdB:        Threshold above the mean in dB
+        #           dB:             Input data is in dB (threshold is added)
+        #           VelWrap:        Training window wraps around the velocity axis
+        #           Peak:           Detect only local maxima (3x3) above the threshold
+        for Key in ('RangeLz', 'RangeLb', 'RangeLa', 'VelLz', 'VelLb', 'VelLa'):
+            if Key in dCfg:
+                Val     =   int(dCfg[Key])
+                if Val < 0:
+                    Val =   int(0)
+                setattr(self, Key, Val)
+        if self.RangeLz < 1:
+            self.RangeLz    =   int(1)
+        if self.VelLz < 1:
+            self.VelLz      =   int(1)
+        if 'ThresdB' in dCfg:
+            self.ThresdB    =   dCfg["ThresdB"]
+        if 'dB' in dCfg:
+            self.dB         =   dCfg["dB"]
+        if 'VelWrap' in dCfg:
+            self.VelWrap    =   dCfg["VelWrap"]
+        if 'Peak' in dCfg:
+            self.Peak       =   dCfg["Peak"]
+
+    def Thres(self, X):
+        #   @function       Thres
+        #   @brief          Cell averaging threshold for maps X (..., range, velocity)
+        #                   The training area is the (Lb+Lz+La)^2 box minus the
+        #                   Lz^2 guard box; both box sums come from one integral
+        #                   image (cumulative sums along both axes)
+        X       =   asarray(X)
+        if iscomplexobj(X):
+            X   =   abs(X)
+        Nr      =   X.shape[-2]
+        Nv      =   X.shape[-1]
+
+        # Box limits per axis, [Lo, Hi) relative to the cell
+        RLo     =   arange(Nr) - self.RangeLz//2
+        RHi     =   RLo + self.RangeLz
+        VLo     =   arange(Nv) - self.VelLz//2
+        VHi     =   VLo + self.VelLz
+        ROut    =   (RLo - self.RangeLb, RHi + self.RangeLa)
+        VOut    =   (VLo - self.VelLb, VHi + self.VelLa)
+
+        if self.VelWrap > 0:
+            # Circular padding, so the box limits never leave the padded map
+            PadLo   =   self.VelLb + self.VelLz//2
+            PadHi   =   self.VelLa + self.VelLz - self.VelLz//2
+            Idx     =   arange(-PadLo, Nv + PadHi) % Nv
+            X       =   X[...,Idx]
+            VIn     =   (VLo + PadLo, VHi + PadLo)
+            VOut    =   (VOut[0] + PadLo, VOut[1] + PadLo)
+            VCnt    =   (VIn[1] - VIn[0], VOut[1] - VOut[0])
+        else:
+            VIn     =   (clip(VLo, 0, Nv), clip(VHi, 0, Nv))
+            VOut    =   (clip(VOut[0], 0, Nv), clip(VOut[1], 0, Nv))
+            VCnt    =   (VIn[1] - VIn[0], VOut[1] - VOut[0])
+        RIn     =   (clip(RLo, 0, Nr), clip(RHi, 0, Nr))
+        ROut    =   (clip(ROut[0], 0, Nr), clip(ROut[1], 0, Nr))
+
+        Sum     =   zeros(X.shape[:-2] + (X.shape[-2] + 1, X.shape[-1] + 1), dtype = result_type(X.dtype, float32))
+        cumsum(X, axis=-2, out=Sum[...,1:,1:])
+        cumsum(Sum[...,1:,1:], axis=-1, out=Sum[...,1:,1:])
+
+        Stat    =   self.BoxSum(Sum, ROut, VOut) - self.BoxSum(Sum, RIn, VIn)
+        Cnt     =   outer(ROut[1] - ROut[0], VCnt[1]) - outer(RIn[1] - RIn[0], VCnt[0])
+        Stat    /=  maximum(Cnt, 1)
+
+        if self.dB > 0:
+            Stat    +=  self.ThresdB
+        else:
+            Stat    *=  10**(self.ThresdB/20)
+        return Stat
+
+    def BoxSum(self, Sum, R, V):
+        R0      =   R[0][:,newaxis]
+        R1      =   R[1][:,newaxis]
+        V0      =   V[0][newaxis,:]
+        V1      =   V[1][newaxis,:]
+        Box     =   Sum[...,R1,V1] - Sum[...,R0,V1]
+        Box     -=  Sum[...,R1,V0]
+        Box     +=  Sum[...,R0,V0]
+        return Box
+
+    def Tar(self, X, Thres=None):
+        #   @function       Tar
+        #   @brief          Target map: 1 for cells above the threshold (and
+        #                   local maxima if Peak is set)
+        X       =   asarray(X)
+        if iscomplexobj(X):
+            X   =   abs(X)
+        if Thres is None:
+            Thres   =   self.Thres(X)
+        Tar     =   X > Thres
+
+        if self.Peak > 0:
+            # 3x3 maximum from shifted copies; velocity wraps like the training window
+            Mode    =   'wrap' if self.VelWrap > 0 else 'edge'
+            Pad     =   [(0, 0)]*X.ndim
+            Pad[-1] =   (1, 1)
+            XPad    =   pad(X, Pad, mode=Mode)
+            Pad[-1] =   (0, 0)
+            Pad[-2] =   (1, 1)
+            XPad    =   pad(XPad, Pad, mode='edge')
+            Nr      =   X.shape[-2]
+            Nv      =   X.shape[-1]
+            for DR in range(3):
+                for DV in range(3):
+                    if DR != 1 or DV != 1:
+                        Tar     &=  X >= XPad[...,DR:DR+Nr,DV:DV+Nv]
+        return Tar
+
+    def Detect(self, X, Thres=None, Range=None, Vel=None):
+        #   @function       Detect
+        #   @brief          Targets of maps X (..., range, velocity)
+        #           Range, Vel:     Axes (optional)
+        #           Returns:        Structured array of Det2DDtype
+        X       =   asarray(X)
+        if iscomplexobj(X):
+            X   =   abs(X)
+        Tar     =   self.Tar(X, Thres)
+
+        Nr      =   X.shape[-2]
+        Nv      =   X.shape[-1]
+        Frm, RIdx, VIdx     =   nonzero(Tar.reshape(-1, Nr, Nv))
+        Det             =   zeros(len(Frm), dtype=Det2DDtype)
+        Det["Amp"]      =   X.reshape(-1, Nr, Nv)[Frm, RIdx, VIdx]
+        Det["RIdx"]     =   RIdx
+        Det["VIdx"]     =   VIdx
+        Det["Frm"]      =   Frm
+        Det["R"]        =   RIdx if Range is None else asarray(Range)[RIdx]
+        Det["V"]        =   VIdx if Vel is None else asarray(Vel)[VIdx]
+        return Det
@@ -14,6 +14,7 @@ import numpy as np
 import struct
 import time
 import platform
+from collections import deque
 
 from numpy import *
 
@@ -44,6 +45,20 @@ class DemoRad():
         self.ChirpSize    = 256*4*4/2
         self.CalPage      = 0
 
+        # Pipelined chirp requests: (startpos, stoppos) of the 0x7003
+        # requests in flight, oldest first
+        self.ChirpPipe        = deque()
+        self.ChirpPipe_Depth  = 1
+
+        # Reusable read buffers of Dsp_GetChirp, (RdBuf, int16 view) per
+        # size; ChirpBuf_Nr of them are rotated, so the frame returned last
+        # stays valid while the next one is read. Dsp_GetChirp returns a
+        # copy unless ChirpBuf_View (Set('RdView')) is set
+        self.ChirpBuf         = dict()
+        self.ChirpBuf_Nr      = 2
+        self.ChirpBuf_Idx     = 0
+        self.ChirpBuf_View    = 0
+
         # ------------------------------------------------------------------
         # Configure Sampling
         # ------------------------------------------------------------------
@@ -201,6 +216,9 @@ class DemoRad():
         @return - 
     """
     def CmdSend(self, Ack, Cod, Data):
+        # Responses of other commands must not interleave with chirp data
+        if self.ChirpPipe:
+            self.Dsp_GetChirpStop()
         self.usb.CmdSend(Ack, Cod, Data)
 
     """@brief Wrapper for the usb function
@@ -230,7 +248,7 @@ class DemoRad():
         DspCmd[2] = SpiCfg["Chn"]
         DspCmd[3:] = Regs
 
-        Ret = self.usb.CmdSend(0, Cod, DspCmd)
+        Ret = self.CmdSend(0, Cod, DspCmd)
         Ret = self.usb.CmdRecv()
         return Ret
 
@@ -586,6 +604,27 @@ class DemoRad():
                     NrFrms  =   2**31
                     print('Limit Number of Frames')
                 self.Rad_NrFrms  =   NrFrms
+        elif stVal ==  'PipeDepth':
+            # Number of chirp requests kept in flight (Dsp_GetChirpStrt)
+            if len(varargin) > 0:
+                Depth       =   int(varargin[0])
+                if Depth < 1:
+                    Depth   =   1
+                self.ChirpPipe_Depth    =   Depth
+        elif stVal ==  'RdBufs':
+            # Number of read buffers Dsp_GetChirp rotates (Dsp_GetChirpBuf)
+            if len(varargin) > 0:
+                NrBuf       =   int(varargin[0])
+                if NrBuf < 1:
+                    NrBuf   =   1
+                self.ChirpBuf.clear()
+                self.ChirpBuf_Nr        =   NrBuf
+                self.ChirpBuf_Idx       =   0
+        elif stVal ==  'RdView':
+            # 1: Dsp_GetChirp returns views of its read buffers (no copy),
+            # valid for RdBufs reads; 0: new arrays
+            if len(varargin) > 0:
+                self.ChirpBuf_View      =   int(varargin[0])
         elif stVal ==  'NrChn':
             if len(varargin) > 0:
                 NrChn       =   floor(varargin[0])
@@ -625,6 +664,12 @@ class DemoRad():
                 Ret     =   self.Rad_NrFrms
             elif stVal == 'NrChn':
                 Ret         =   self.Rad_NrChn
+            elif stVal == 'PipeDepth':
+                Ret         =   self.ChirpPipe_Depth
+            elif stVal == 'RdBufs':
+                Ret         =   self.ChirpBuf_Nr
+            elif stVal == 'RdView':
+                Ret         =   self.ChirpBuf_View
             elif stVal == 'FuSca':
                 self.FuSca = 0.498 / 65536
                 Ret = self.FuSca
@@ -709,24 +754,89 @@ class DemoRad():
         return dRet
 
     """@brief Returns chirps from measurement
+        The data is read in place into a reused buffer. A new array is
+        returned, unless Set('RdView', 1): then the result is a view of the
+        buffer that the read RdBufs (Set('RdBufs')) calls later overwrites.
         param[in] - start position of chirp(s) returned
         param[in] - end position of chirp(s) returned
         @return - result (success/not) + Measurement data
     """
     def Dsp_GetChirp(self, startpos, stoppos):
+        self.Dsp_GetChirpReq(startpos, stoppos)
+        return self.Dsp_GetChirpResp()
+
+    """@brief Starts pipelined chirp reads
+        Sends ChirpPipe_Depth (Set('PipeDepth')) 0x7003 requests without
+        waiting for their data, so the board always has the next request
+        queued and the transfer rate is set by the bulk endpoint instead of
+        the round trip of every command. Read the frames with
+        Dsp_GetChirpNext and end with Dsp_GetChirpStop; any other command
+        stops the pipeline first.
+        param[in] - start position of chirp(s) returned
+        param[in] - end position of chirp(s) returned
+    """
+    def Dsp_GetChirpStrt(self, startpos, stoppos):
+        self.Dsp_GetChirpStop()
+        for Idx in range(0, int(self.ChirpPipe_Depth)):
+            self.Dsp_GetChirpReq(startpos, stoppos)
+
+    """@brief Returns the oldest frame in flight and requests the next one
+        @return - Measurement data
+    """
+    def Dsp_GetChirpNext(self):
+        if not self.ChirpPipe:
+            raise RuntimeError("Dsp_GetChirpNext: no chirp requests in flight, call Dsp_GetChirpStrt")
+        startpos, stoppos = self.ChirpPipe[0]
+        # Queue the next request before reading, so the board never idles
+        self.Dsp_GetChirpReq(startpos, stoppos)
+        return self.Dsp_GetChirpResp()
+
+    """@brief Reads and discards the responses of all requests in flight
+    """
+    def Dsp_GetChirpStop(self):
+        while self.ChirpPipe:
+            self.Dsp_GetChirpResp()
+
+    def Dsp_GetChirpReq(self, startpos, stoppos):
         DspCmd      = zeros(3, dtype='uint32')
         Cod         = int('0x7003', 0)
         DspCmd[0]   = 1
         DspCmd[1]   = startpos
         DspCmd[2]   = stoppos
-        self.CmdSend(0, Cod, DspCmd)
+        self.usb.CmdSend(0, Cod, DspCmd)
+        self.ChirpPipe.append((startpos, stoppos))
 
+    def Dsp_GetChirpResp(self):
+        # The board answers in request order: bulk data, then the ack
+        startpos, stoppos = self.ChirpPipe.popleft()
         chirps      = stoppos - startpos
-        Data        = self.usb.UsbRead((self.ChirpSize * chirps))
-        RetData     = fromstring(Data, dtype='int16')
-        Ret         = reshape(RetData, (int(len(RetData) / 4), int(4)))
+        NrBytes     = int(self.ChirpSize * chirps)
+        RdBuf, Data = self.Dsp_GetChirpBuf(NrBytes)
+        RxLen       = self.usb.UsbReadInto(RdBuf)
+        if RxLen != NrBytes:
+            # Lost track of the responses: drop the rest of the pipeline
+            self.ChirpPipe.clear()
+            raise IOError("Dsp_GetChirp: %d bytes received, %d expected" % (RxLen, NrBytes))
         self.CmdRecv()
-        return Ret[:,::-1]
+        Ret         = Data.reshape(-1, 4)[:,::-1]
+        if self.ChirpBuf_View > 0:
+            return Ret
+        return Ret.copy()
+
+    """@brief Returns the next read buffer for NrBytes of chirp data
+        ChirpBuf_Nr (Set('RdBufs')) buffers per size are used in turn.
+        @return - (RdBuf for UsbReadInto, int16 view of it)
+    """
+    def Dsp_GetChirpBuf(self, NrBytes):
+        Key = (NrBytes, self.ChirpBuf_Idx)
+        self.ChirpBuf_Idx = (self.ChirpBuf_Idx + 1) % self.ChirpBuf_Nr
+        if Key not in self.ChirpBuf:
+            # New chirp range: drop the buffers of the old one
+            for OldKey in list(self.ChirpBuf):
+                if OldKey[0] != NrBytes:
+                    del self.ChirpBuf[OldKey]
+            self.ChirpBuf[Key] = self.usb.GetRdBuf(NrBytes)
+        return self.ChirpBuf[Key]
 
     """@brief Erases the complete flash of the DSP boot device
         Do not use this function unless you know what you are doing.
@@ -0,0 +1,107 @@
+# FftBackend.py -- FftBackend class
+#
+# FFTs of RadarProc and sar.py. Lib 'numpy' uses numpy.fft and writes into a
+# given buffer (numpy >= 2.0); Lib 'scipy' uses scipy.fft and splits the
+# transforms of a block over Workers threads. Both libraries keep the plans
+# (twiddle factors) of the recently used lengths in their own cache; the
+# backend keeps the padded FFT lengths per requested length.
+
+from    numpy import *
+import  inspect
+
+try:
+    import  scipy.fft   as sfft
+except ImportError:
+    sfft    =   None
+
+# numpy >= 2.0 writes FFT results straight into a given buffer
+try:
+    FftOut  =   'out' in inspect.signature(fft.fft).parameters
+except (TypeError, ValueError):
+    FftOut  =   False
+
+class FftBackend(object):
+
+    def __init__(self, dCfg=None):
+        self.Lib        =   'numpy'
+        self.Workers    =   1
+        self.dLen       =   dict()
+        if dCfg is not None:
+            self.CfgFft(dCfg)
+
+    def CfgFft(self, dCfg):
+        #   @function       CfgFft
+        #   @brief          Select the FFT library
+        #           Lib:            'numpy' or 'scipy'
+        #           Workers:        Threads of the scipy FFTs; -1 uses all cores
+        #                           (numpy.fft is single threaded)
+        if 'Lib' in dCfg:
+            if dCfg["Lib"] not in ('numpy', 'scipy'):
+                raise ValueError("FftBackend: unknown Lib '%s'" % dCfg["Lib"])
+            if dCfg["Lib"] == 'scipy' and sfft is None:
+                raise ImportError("FftBackend: Lib 'scipy' needs scipy")
+            self.Lib        =   dCfg["Lib"]
+        if 'Workers' in dCfg:
+            self.Workers    =   int(dCfg["Workers"])
+            if self.Workers == 0:
+                self.Workers    =   1
+
+    def GetFft(self, stSel):
+        if stSel == 'Lib':
+            return self.Lib
+        if stSel == 'Workers':
+            return self.Workers
+
+    def GetLen(self, N):
+        #   @function       GetLen
+        #   @brief          Smallest FFT length >= N that factors into small primes
+        N       =   int(N)
+        if N not in self.dLen:
+            if sfft is not None:
+                self.dLen[N]    =   sfft.next_fast_len(N)
+            else:
+                self.dLen[N]    =   int(2**ceil(log2(N)))
+        return self.dLen[N]
+
+    def Fft(self, Data, NFFT=None, Axis=-1, Out=None):
+        #   @function       Fft
+        #   @brief          fft of Data, written into Out if given
+        #                   With the default norm numpy selects the double
+        #                   precision loop for complex64 and converts through
+        #                   temporary arrays; norm "forward" keeps it in single
+        #                   precision and the 1/NFFT is undone in place
+        if self.Lib == 'scipy':
+            return self.Put(sfft.fft(Data, NFFT, Axis, workers=self.Workers), Out)
+        if Out is None or not FftOut:
+            return self.Put(fft.fft(Data, NFFT, Axis), Out)
+        if Out.dtype == complex64:
+            fft.fft(Data, NFFT, Axis, norm="forward", out=Out)
+            Out     *=  Out.shape[Axis]
+            return Out
+        return fft.fft(Data, NFFT, Axis, out=Out)
+
+    def Ifft(self, Data, NFFT=None, Axis=-1, Out=None):
+        if self.Lib == 'scipy':
+            return self.Put(sfft.ifft(Data, NFFT, Axis, workers=self.Workers), Out)
+        if Out is None or not FftOut:
+            return self.Put(fft.ifft(Data, NFFT, Axis), Out)
+        return fft.ifft(Data, NFFT, Axis, out=Out)
+
+    def Rfft(self, Data, NFFT=None, Axis=-1, Out=None):
+        if self.Lib == 'scipy':
+            return self.Put(sfft.rfft(Data, NFFT, Axis, workers=self.Workers), Out)
+        if Out is None or not FftOut:
+            return self.Put(fft.rfft(Data, NFFT, Axis), Out)
+        if Out.dtype == complex64:
+            fft.rfft(Data, NFFT, Axis, norm="forward", out=Out)
+            if NFFT is None:
+                NFFT    =   Data.shape[Axis]
+            Out     *=  NFFT
+            return Out
+        return fft.rfft(Data, NFFT, Axis, out=Out)
+
+    def Put(self, X, Out):
+        if Out is None:
+            return X
+        Out[...]    =   X
+        return Out
@@ -7,6 +7,9 @@
 # of the BSD license.  See the LICENSE file for details.
 
 from    numpy import *
+import  Class.Cfar          as Cfar
+import  Class.BufPool       as BufPool
+import  Class.FftBackend    as FftBackend
 
 class RadarProc(object):
     """ Radarbook class object:
@@ -20,6 +23,8 @@ class RadarProc(object):
         self.fs                         =   -1
         self.kf                         =   -1
         self.FuSca                      =   2/2048
+        self.Dtype                      =   dtype('float64')
+        self.CDtype                     =   dtype('complex128')
 
         # Calculate RangeProfile
         self.RangeProfile_RemoveMean    =   1
@@ -32,6 +37,19 @@ class RadarProc(object):
         self.RangeProfile_Ext           =   0
         self.RangeProfile_RMin          =   0
         self.RangeProfile_RMax          =   0
+        self.RangeProfile_N             =   0
+        self.RangeProfile_Plan          =   None
+        self.RangeFFT_Ramp              =   dict()
+        self.RangeFFT_Czt               =   dict()
+        self.RangeFFT_Zoom              =   1
+
+        # Work buffers of all stages; Pool_Out > 0 also returns the stage
+        # outputs from the pool (valid until the next call of the stage)
+        self.Pool                       =   BufPool.BufPool()
+        self.Pool_Out                   =   0
+        self.Hanning                    =   dict()
+        # FFT library of all stages (CfgRangeProfile etc.: FftLib, FftWorkers)
+        self.Fft                        =   FftBackend.FftBackend()
 
         #Calculate BeamformingUla
         self.BeamformingUla_RemoveMean  =   1
@@ -47,6 +65,18 @@ class RadarProc(object):
         self.BeamformingUla_AngWindow   =   1
         self.BeamformingUla_ChnOrder    =   arange(4)
         self.BeamformingUla_CalData     =   ones(4)
+        self.BeamformingUla_Mode        =   'FFT'
+        self.BeamformingUla_Ang         =   arange(-60, 61)
+        self.BeamformingUla_RxPosn      =   arange(4)*6.2170e-3 + 32.014e-3
+        self.BeamformingUla_TxPosn      =   zeros(1)
+        self.BeamformingUla_fc          =   24.125e9
+        self.BeamformingUla_Steer       =   None
+        self.BeamformingUla_Array       =   None
+        self.BeamformingUla_Win         =   None
+        self.BeamformingUla_N           =   0
+        self.BeamformingUla_NrTar       =   1
+        self.BeamformingUla_Loading     =   1e-3
+        self.BeamformingUla_MimoEna     =   0
 
         #Calculate RangeDoppler
         self.RangeDoppler_RemoveMean        =   1
@@ -65,6 +95,7 @@ class RadarProc(object):
         self.RangeDoppler_fc                =   0
         self.RangeDoppler_Tp                =   0
         self.RangeDopplerTar_ThresdB        =   0
+        self.RangeDopplerCfar_Det           =   Cfar.Cfar2D()
 
         self.RangeProfileCfar_Lz            =   int(9)
         self.RangeProfileCfar_Lb            =   int(8)
@@ -72,6 +103,9 @@ class RadarProc(object):
         self.RangeProfileCfar_Hz            =   0
         self.RangeProfileCfar_Hb            =   1
         self.RangeProfileCfar_Ha            =   1
+        # 'Filt': coherent filter threshold, 'CA'/'OS': Cfar detector on the range profile
+        self.RangeProfileCfar_Type          =   'Filt'
+        self.RangeProfileCfar_Det           =   Cfar.Cfar({"Lz": 9, "Lb": 8, "La": 8, "Edge": 3, "PeakExt": 2})
 
 
         self.BeamformingUlaCfar_RangeLz     =   int(9)
@@ -88,6 +122,37 @@ class RadarProc(object):
         self.BeamformingUlaCfar_AngHb       =   1
         self.BeamformingUlaCfar_AngHa       =   1
 
+    def CfgDtype(self, Dtype):
+        #   @brief          Select processing precision
+        #           Dtype:          'float32' (complex64) or 'float64' (complex128)
+        self.Dtype      =   dtype(Dtype)
+        self.CDtype     =   result_type(self.Dtype, complex64)
+        self.RangeProfile_Plan  =   None
+        self.BeamformingUla_Steer   =   None
+        self.BeamformingUla_Array   =   None
+        self.BeamformingUla_Win     =   None
+
+    def CfgPool(self, Out):
+        #   @brief          Stage outputs from the buffer pool
+        #           Out:            0: every call returns new arrays
+        #                           1: outputs are pooled as well; a result is
+        #                              overwritten by the next call of the stage
+        self.Pool_Out   =   Out
+
+    def GetOut(self, Name, Shape, Dtype):
+        #   @brief          Buffer for a stage output (see CfgPool)
+        if self.Pool_Out > 0:
+            return self.Pool.Get(Name, Shape, Dtype)
+        return empty(Shape, dtype = Dtype)
+
+    def GetHanning(self, N):
+        #   @brief          Hanning window of length N and its sum, cached
+        Key     =   (N, self.Dtype)
+        if Key not in self.Hanning:
+            Win                 =   hanning(N).astype(self.Dtype)
+            self.Hanning[Key]   =   (Win, float(sum(Win)))
+        return self.Hanning[Key]
+
     def GetRangeProfile(self, stSel):
         if stSel == 'Range':
             if self.RangeProfile_XPos > 0:
@@ -130,121 +195,361 @@ class RadarProc(object):
         #           RMin:           Minimum Range
         #           RMax:           Maximum Range
         #           Ext:            Extract range interval
+        #           Zoom:           Chirp-z transform for the range interval
+        #                           (0: off, 1: if cheaper, 2: always)
 
-        X   =   self.RangeProfileFFT(Data)
+        # With XPos only the positive bins of the range interval are returned
+        X   =   self.RangeProfileFFT(Data, Scratch=1)
 
-        if self.RangeProfile_XPos > 0:
-            X       =   X[0:int(self.RangeProfile_FFT/2),:]
+        if self.RangeProfile_XPos == 0 and self.RangeProfile_Ext > 0:
+            X       =   X[int(self.RangeProfile_IdxMin):int(self.RangeProfile_IdxMax),:]
 
         if self.RangeProfile_Abs > 0:
-            X       =   abs(X)
+            Rp      =   self.GetOut("RangeProfile", X.shape, self.Dtype)
+            absolute(X, out=Rp)
             if self.RangeProfile_dB > 0:
-                X   =   20*log10(X)
-
+                log10(Rp, out=Rp)
+                Rp  *=  20
+        else:
+            Rp      =   self.GetOut("RangeProfile", X.shape, self.CDtype)
+            Rp[:]   =   X
+
+        return Rp
+
+    def RangeProfileBatch(self, Data, Blk=64):
+        #   @function       RangeProfileBatch
+        #   @brief          Range profiles of many frames in one call
+        #                   Same processing as RangeProfile (NIni, RemoveMean,
+        #                   Window, XPos, Abs, dB, Ext) for a (frames x samples
+        #                   x channels) cube, e.g. a recording or a memory map.
+        #                   A (chirps*N x channels) block as returned for
+        #                   StopIdx > 1 is split into chirps of N samples
+        #                   (CfgRangeProfile "N").
+        #           Data:           Frames x samples x channels
+        #           Blk:            Frames processed together
+        #           Returns:        Frames x range bins x channels
+        if Data.ndim == 2:
+            N       =   self.RangeProfile_N
+            if N <= 0:
+                N   =   Data.shape[0]
+            Data    =   Data.reshape(-1, N, Data.shape[1])
+
+        Frms    =   Data.shape[0]
+        Ny      =   Data.shape[1] - self.RangeProfile_NIni
+        Nx      =   Data.shape[2]
+        NFFT    =   int(self.RangeProfile_FFT)
+        Plan    =   self.GetRangeProfilePlan(Ny, Nx)
+
+        # Range bins that are kept
         if self.RangeProfile_Ext > 0:
-            X       =   X[int(self.RangeProfile_IdxMin):int(self.RangeProfile_IdxMax),:]
+            IdxMin  =   int(self.RangeProfile_IdxMin)
+            IdxMax  =   int(self.RangeProfile_IdxMax)
+        elif self.RangeProfile_XPos > 0:
+            IdxMin  =   0
+            IdxMax  =   NFFT//2
+        else:
+            IdxMin  =   0
+            IdxMax  =   NFFT
 
-        return X
+        if self.RangeProfile_Abs > 0:
+            Rp      =   zeros((Frms, IdxMax - IdxMin, Nx), dtype = self.Dtype)
+        else:
+            Rp      =   zeros((Frms, IdxMax - IdxMin, Nx), dtype = self.CDtype)
+
+        for Idx in range(0, Frms, Blk):
+            Nb      =   Rp[Idx:Idx+Blk].shape[0]
+            # The last block can be shorter: its buffers are kept separately
+            Dat     =   self.Pool.Get(("RangeProfileBatch_Dat", Nb), (Nb, Ny, Nx), self.Dtype)
+            Dat[:]  =   Data[Idx:Idx+Blk, self.RangeProfile_NIni:, :]
+            if self.RangeProfile_RemoveMean > 0:
+                Mean    =   self.Pool.Get(("RangeProfileBatch_Mean", Nb), (Nb, 1, Nx), self.Dtype)
+                mean(Dat, axis=1, keepdims=True, out=Mean)
+                Dat     -=  Mean
+            Dat     *=  Plan["Win"]
+
+            if self.RangeProfile_Abs > 0:
+                X   =   self.Pool.Get(("RangeProfileBatch_X", Nb), (Nb, IdxMax - IdxMin, Nx), self.CDtype)
+            else:
+                X   =   Rp[Idx:Idx+Blk]
 
-    def RangeProfileFFT(self, Data, *varargin):
+            if self.RangeProfile_XPos > 0:
+                self.RangeFFT(Dat, NFFT, Plan["Pos"], Plan["ScaWin"], IdxMin, IdxMax, X)
+            else:
+                Src1, Dst1, Src2, Dst2  =   Plan["Idx"]
+                x               =   self.Pool.Get(("RangeProfileBatch_Buf", Nb, Ny), (Nb, NFFT, Nx), self.CDtype)
+                x[:,Dst1,:]     =   Dat[:,Src1,:]
+                x[:,Dst2,:]     =   Dat[:,Src2,:]
+                # Separate output: the zero padding of x has to stay
+                Spec            =   self.Pool.Get(("RangeProfileBatch_Spec", Nb), (Nb, NFFT, Nx), self.CDtype)
+                self.Fft.Fft(x, NFFT, 1, Spec)
+                multiply(Spec[:,IdxMin:IdxMax,:], self.FuSca/Plan["ScaWin"], out=X)
+
+            if self.RangeProfile_Abs > 0:
+                Out     =   Rp[Idx:Idx+Blk]
+                absolute(X, out=Out)
+                if self.RangeProfile_dB > 0:
+                    log10(Out, out=Out)
+                    Out *=  20
+
+        return Rp
+
+    def RangeProfileFFT(self, Data, *varargin, Scratch=0):
+        #   @function       RangeProfileFFT
+        #   @brief          Scaled range spectrum of one frame (positive bins of
+        #                   the range interval with XPos, else all NFFT bins)
+        #           varargin:       'Cfar': data filtered with the CFAR window
+        #           Scratch:        1: result in the work buffers of the plan,
+        #                              overwritten by the next call (RangeProfile
+        #                              and RangeProfileCfar copy it right away)
+        #                           0: output as set by CfgPool
         Data    =   Data[self.RangeProfile_NIni:,:]
         Siz     =   Data.shape
         Ny      =   Siz[0]                  # rows
         Nx      =   Siz[1]                  # colums
 
+        Plan    =   self.GetRangeProfilePlan(Ny, Nx)
+        Dat     =   Plan["Dat"]
+        Dat[:]  =   Data
+
         if self.RangeProfile_RemoveMean > 0:
             # Remove mean from data
-            Tmp     =   mean(Data, axis=0)              # mean for all input signals
-            mTmp    =   tile(Tmp, (Ny, 1))
-            Data    =   Data - mTmp
-
-        if self.RangeProfile_Window > 0:
-            Win     =   hanning(Ny)
-            ScaWin  =   sum(Win)
-            Win2D   =   tile(Win, (Nx, 1))
-            Win2D   =   Win2D.transpose()
-        else:
-            ScaWin  =   Ny
-            Win2D   =   ones(Ny, Nx)
-
-        Data        =   Data*Win2D
+            add.reduce(Dat, axis=0, out=Plan["Mean"])
+            Plan["Mean"]    /=  Ny
+            Dat             -=  Plan["Mean"]
+
+        Dat         *=  Plan["Win"]
+
+        if len(varargin) == 0 and self.RangeProfile_XPos > 0:
+            # Only the positive range bins are used: real input FFT
+            IdxMin, IdxMax  =   self.GetRangeProfileBins()
+            Out     =   Plan["Spec"]
+            if Scratch == 0:
+                Out =   self.GetOut("RangeProfileFFT_Spec", Out.shape, self.CDtype)
+            return self.RangeFFT(Dat, self.RangeProfile_FFT, Plan["Pos"], Plan["ScaWin"], IdxMin, IdxMax, Out)
+
+        # Write the data straight into its fftshifted position of the zero
+        # padded buffer; the remaining samples of the buffer stay zero
+        x           =   Plan["Buf"]
+        Src1, Dst1, Src2, Dst2  =   Plan["Idx"]
         if len(varargin) > 0:
             # Calculate CFAR
-            HCfar   =   tile(self.RangeProfileCfar_HCfar, (Nx,1))
-            HCfar   =   HCfar.transpose()
-            # Calculate symmetric fft
-            x           =   zeros((int(self.RangeProfile_FFT), Nx),dtype = 'complex_')
-            StrtIdx     =   int((self.RangeProfile_FFT - Ny)/2)
-            x[StrtIdx:StrtIdx+Ny,:]     =   Data
-            x           =   x*HCfar
+            multiply(Dat[Src1,:], Plan["HCfar"][Src1,:], out=x[Dst1,:])
+            multiply(Dat[Src2,:], Plan["HCfar"][Src2,:], out=x[Dst2,:])
         else:
-            # Calculate symmetric fft
-            x           =   zeros((int(self.RangeProfile_FFT), Nx),dtype = 'complex_')
-            StrtIdx     =   int((self.RangeProfile_FFT - Ny)/2)
-            x[StrtIdx:StrtIdx+Ny,:]     =   Data
+            x[Dst1,:]   =   Dat[Src1,:]
+            x[Dst2,:]   =   Dat[Src2,:]
 
-        x           =   fft.fftshift(x, axes = 0)
-        X           =   fft.fft(x, self.RangeProfile_FFT, 0)/ScaWin*self.FuSca
+        Out         =   Plan["Full"]
+        if Scratch == 0:
+            Out     =   self.GetOut("RangeProfileFFT_Full", Out.shape, self.CDtype)
+        X           =   self.Fft.Fft(x, self.RangeProfile_FFT, 0, Out)
+        X           *=  self.FuSca/Plan["ScaWin"]
 
         return X
 
-    def RangeProfileCfar(self, Data, stSel):
+    def RangeFFT(self, Data, NFFT, Pos, ScaWin, IdxMin=0, IdxMax=None, Out=None):
+        #   @function       RangeFFT
+        #   @brief          Positive range bins IdxMin:IdxMax of real data that
+        #                   starts at sample Pos of a zero padded buffer of
+        #                   length NFFT
+        #                   The shift of the data in the buffer (centring and
+        #                   fftshift) is applied as a linear phase ramp after an
+        #                   rfft, which halves the work of the complex FFT.
+        #                   If the bins are a small part of the spectrum they
+        #                   are evaluated with a chirp-z transform instead
+        #                   (see RangeFFT_Zoom).
+        #           Data:           Windowed data ([frames x] samples x channels)
+        #           NFFT:           FFT size
+        #           Pos:            Buffer index of the first sample
+        #           ScaWin:         Window scaling
+        #           IdxMin, IdxMax: Range bins to return (default: NFFT/2 bins)
+        #           Out:            Buffer for the result (default: new array)
+        #                           The work buffers come from the pool.
+        NFFT        =   int(NFFT)
+        if IdxMax is None:
+            IdxMax  =   NFFT//2
+        IdxMin      =   int(IdxMin)
+        IdxMax      =   int(IdxMax)
+        Siz         =   Data.shape[:-2]
+        Ny          =   Data.shape[-2]
+        Nx          =   Data.shape[-1]
+        if Out is None:
+            Out     =   empty(Siz + (IdxMax - IdxMin, Nx), dtype = self.CDtype)
+
+        Czt         =   self.GetRangeCzt(NFFT, Ny, Pos, IdxMin, IdxMax)
+        if Czt is None:
+            Y       =   self.Pool.Get(("RangeFFT_Rfft", NFFT) + Data.shape, Siz + (NFFT//2 + 1, Nx), self.CDtype)
+            self.Fft.Rfft(Data, NFFT, -2, Y)
+            multiply(Y[...,IdxMin:IdxMax,:], self.GetRangeRamp(NFFT, Pos)[IdxMin:IdxMax], out=Out)
+        else:
+            L       =   Czt["L"]
+            Tmp     =   self.Pool.Get(("RangeFFT_Czt", L) + Data.shape, Siz + (Ny, Nx), self.CDtype)
+            Y       =   self.Pool.Get(("RangeFFT_Conv", L) + Data.shape, Siz + (L, Nx), self.CDtype)
+            multiply(Data, Czt["Pre"], out=Tmp)
+            self.Fft.Fft(Tmp, L, -2, Y)
+            Y       *=  Czt["H"]
+            self.Fft.Ifft(Y, L, -2, Y)
+            multiply(Y[...,0:IdxMax-IdxMin,:], Czt["Post"], out=Out)
+        Out         *=  self.FuSca/ScaWin
+        return Out
+
+    def GetRangeCzt(self, NFFT, Ny, Pos, IdxMin, IdxMax):
+        #   @function       GetRangeCzt
+        #   @brief          Chirp-z (Bluestein) plan for bins IdxMin:IdxMax of an
+        #                   NFFT point spectrum of Ny samples, or None if the
+        #                   rfft is cheaper or the zoom is disabled
+        #                   X[k] = exp(-j2pi k Pos/NFFT) sum_n x[n] W^(k n), with
+        #                   k n = (k^2 + n^2 - (k-n)^2)/2, is a convolution of
+        #                   length M + Ny - 1 with M = IdxMax - IdxMin
+        Key     =   (NFFT, Ny, Pos, IdxMin, IdxMax, self.CDtype, self.RangeFFT_Zoom)
+        if Key in self.RangeFFT_Czt:
+            return self.RangeFFT_Czt[Key]
+
+        M       =   IdxMax - IdxMin
+        L       =   self.Fft.GetLen(M + Ny - 1)
+        # Operation counts of rfft + ramp and of two FFTs of length L + products
+        CostFFT =   NFFT/2*log2(NFFT) + NFFT/2
+        CostCzt =   2*L*log2(L) + L + Ny + M
+        if self.RangeFFT_Zoom == 0 or (self.RangeFFT_Zoom == 1 and CostCzt >= CostFFT):
+            self.RangeFFT_Czt[Key]  =   None
+            return None
+
+        # Phases as integers mod 2 NFFT: exp(-j pi Idx/NFFT) stays exact for large NFFT
+        n       =   arange(Ny)
+        m       =   arange(M)
+        l       =   arange(-(Ny - 1), M)
+        Pre     =   exp(-1j*pi*((n*n + 2*IdxMin*n) % (2*NFFT))/NFFT)
+        Post    =   exp(-1j*pi*((m*m + 2*(IdxMin + m)*Pos) % (2*NFFT))/NFFT)
+        h       =   zeros(L, dtype = complex128)
+        h[l % L]=   exp(1j*pi*((l*l) % (2*NFFT))/NFFT)
+
+        Czt             =   dict()
+        Czt["L"]        =   L
+        Czt["Pre"]      =   Pre[:,newaxis].astype(self.CDtype)
+        Czt["H"]        =   self.Fft.Fft(h)[:,newaxis].astype(self.CDtype)
+        Czt["Post"]     =   Post[:,newaxis].astype(self.CDtype)
+        self.RangeFFT_Czt[Key]  =   Czt
+        return Czt
+
+    def GetRangeRamp(self, NFFT, Pos):
+        Key     =   (NFFT, Pos, self.CDtype)
+        if Key not in self.RangeFFT_Ramp:
+            # exp(-j2pi k Pos/NFFT); the product is reduced mod NFFT to keep the phase exact
+            Idx     =   (arange(NFFT//2)*Pos) % NFFT
+            Ramp    =   exp(-2j*pi*Idx/NFFT).astype(self.CDtype)
+            self.RangeFFT_Ramp[Key]     =   Ramp[:,newaxis]
+        return self.RangeFFT_Ramp[Key]
+
+    def GetRangeProfileBins(self):
+        if self.RangeProfile_Ext > 0:
+            return int(self.RangeProfile_IdxMin), int(self.RangeProfile_IdxMax)
+        return 0, int(self.RangeProfile_FFT)//2
+
+    def GetRangeProfilePlan(self, Ny, Nx):
+        Plan    =   self.RangeProfile_Plan
+        if Plan is None or Plan["Key"] != (Ny, Nx, self.Dtype):
+            Plan    =   self.CfgRangeProfilePlan(Ny, Nx)
+        return Plan
+
+    def CfgRangeProfilePlan(self, Ny, Nx):
+        #   @function       CfgRangeProfilePlan
+        #   @brief          Precompute window, scaling, buffer layout and work
+        #                   buffers of RangeProfileFFT for (Ny, Nx) input data
+        #           Ny:             Samples per chirp after removing NIni
+        #           Nx:             Number of channels
+        NFFT    =   int(self.RangeProfile_FFT)
+
+        if self.RangeProfile_Window > 0:
+            Win     =   hanning(Ny).astype(self.Dtype)
+            ScaWin  =   sum(Win)
+        else:
+            Win     =   ones(Ny, dtype = self.Dtype)
+            ScaWin  =   Ny
 
-        X   =   self.RangeProfileFFT(Data, 'Cfar')
+        # fftshift moves sample n of the centred block to (StrtIdx + n + NFFT/2) mod NFFT
+        StrtIdx     =   int((NFFT - Ny)/2)
+        Pos         =   (StrtIdx + NFFT//2) % NFFT
+        Len1        =   NFFT - Pos
+        if Len1 > Ny:
+            Len1    =   Ny
+        Idx         =   (   slice(0, Len1), slice(Pos, Pos + Len1),
+                            slice(Len1, Ny), slice(0, Ny - Len1)    )
+
+        Plan            =   dict()
+        Plan["Key"]     =   (Ny, Nx, self.Dtype)
+        Plan["Win"]     =   Win[:,newaxis]
+        Plan["ScaWin"]  =   ScaWin
+        Plan["Idx"]     =   Idx
+        Plan["Pos"]     =   Pos
+        Plan["Dat"]     =   self.Pool.Get("RangeProfile_Dat", (Ny, Nx), self.Dtype)
+        Plan["Mean"]    =   self.Pool.Get("RangeProfile_Mean", (Nx,), self.Dtype)
+        # Zero padded FFT input, output of the full spectrum and of the range bins
+        Plan["Buf"]     =   self.Pool.Get("RangeProfile_Buf", (NFFT, Nx), self.CDtype)
+        Plan["Buf"][:]  =   0
+        Plan["Full"]    =   self.Pool.Get("RangeProfile_Full", (NFFT, Nx), self.CDtype)
+        IdxMin, IdxMax  =   self.GetRangeProfileBins()
+        Plan["Spec"]    =   self.Pool.Get("RangeProfile_Spec", (IdxMax - IdxMin, Nx), self.CDtype)
+        if hasattr(self, 'RangeProfileCfar_HCfar'):
+            HCfar               =   self.RangeProfileCfar_HCfar[StrtIdx:StrtIdx+Ny]
+            Plan["HCfar"]       =   HCfar[:,newaxis].astype(self.CDtype)
+
+        self.RangeProfile_Plan  =   Plan
+        return Plan
 
-        if self.RangeProfile_XPos > 0:
-            X       =   X[0:int(self.RangeProfile_FFT/2),:]
+    def RangeProfileCfar(self, Data, stSel):
+        #   @function       RangeProfileCfar
+        #   @brief          CFAR threshold and targets of the range profile
+        #           stSel:          'Thres': threshold for every range bin
+        #                           'Det':   structured array of targets (Cfar.DetDtype)
+        #                           'List':  per channel list of target dicts (R, Amp, Bins)
 
-        if self.RangeProfile_Abs > 0:
-            X       =   abs(X)
-            if self.RangeProfile_dB > 0:
-                X   =   20*log10(X)
+        if self.RangeProfileCfar_Type == 'Filt':
+            X   =   self.RangeProfileFFT(Data, 'Cfar', Scratch=1)
 
-        if self.RangeProfile_Ext > 0:
-            X       =   X[int(self.RangeProfile_IdxMin):int(self.RangeProfile_IdxMax),:]
+            if self.RangeProfile_XPos > 0:
+                X       =   X[0:int(self.RangeProfile_FFT/2),:]
 
+            if self.RangeProfile_Ext > 0:
+                X       =   X[int(self.RangeProfile_IdxMin):int(self.RangeProfile_IdxMax),:]
+
+            # X is a work buffer that RangeProfile below reuses
+            if self.RangeProfile_Abs > 0:
+                Thres   =   self.GetOut("RangeProfileCfar", X.shape, self.Dtype)
+                absolute(X, out=Thres)
+                if self.RangeProfile_dB > 0:
+                    log10(Thres, out=Thres)
+                    Thres   *=  20
+            else:
+                Thres       =   self.GetOut("RangeProfileCfar", X.shape, self.CDtype)
+                Thres[:]    =   X
+            X   =   Thres
 
-        if stSel == 'Thres':
-            return X
-        if stSel == 'List':
-            RP      =   self.RangeProfile(Data)
+            if stSel == 'Thres':
+                return X
+            RP  =   self.RangeProfile(Data)
+        else:
+            RP  =   self.RangeProfile(Data)
+            self.RangeProfileCfar_Det.dB    =   self.RangeProfile_Abs > 0 and self.RangeProfile_dB > 0
+            X   =   self.RangeProfileCfar_Det.Thres(RP)
+            if stSel == 'Thres':
+                return X
+
+        if stSel == 'Det' or stSel == 'List':
             Range   =   self.GetRangeProfile('Range')
-            # find values above threshold
+            Det     =   self.RangeProfileCfar_Det.Detect(RP, X, Range)
+            if stSel == 'Det':
+                return Det
 
-            TarMap  =   (RP > X)*ones(RP.shape)
-            Siz     =   TarMap.shape
-            Ny      =   Siz[0]                  # rows
-            Nx      =   Siz[1]                  # colums
-            TarMap  =   TarMap[1:Ny,:] - TarMap[0:Ny-1,:]
             lTar    =   list()
-            for Idx in range(0,Nx):
+            for Idx in range(0, RP.shape[1]):
                 lChn    =   list()
-                TarMap[0,Idx]       =   0
-                TarMap[1,Idx]       =   0
-                TarMap[Ny-3,Idx]    =   0
-                TarMap[Ny-2,Idx]    =   0
-                IdcsPos     =   argwhere(TarMap[:,Idx] > 0.1) + 1
-                IdcsNeg     =   argwhere(TarMap[:,Idx] < -0.1) + 1
-
-                if len(IdcsPos) < len(IdcsNeg):
-                    IdcsNeg     =   IdcsNeg[0:len(IdcsPos)]
-                if len(IdcsNeg) < len(IdcsPos):
-                    IdcsPos     =   IdcsPos[0:len(IdcsNeg)]
-
-
-                for TarIdx in range(0,len(IdcsPos)):
-                    dTar    =   {}
-                    if IdcsPos[TarIdx] < IdcsNeg[TarIdx]:
-                        MaxIdx          =   argmax(RP[IdcsPos[TarIdx]-2:IdcsNeg[TarIdx]+2,Idx]) + IdcsPos[TarIdx]-2
-
-                        dTar["R"]       =   Range[MaxIdx]
-                        dTar["Amp"]     =   RP[MaxIdx,Idx]
-                        dTar["Bins"]    =   IdcsNeg[TarIdx] - IdcsPos[TarIdx]
+                for Tar in Det[Det["Chn"] == Idx]:
+                    dTar            =   {}
+                    dTar["R"]       =   Tar["R"]
+                    dTar["Amp"]     =   Tar["Amp"]
+                    dTar["Bins"]    =   Tar["Bins"]
                     lChn.append(dTar)
-
                 lTar.append(lChn)
-
-
             return lTar
 
         return X
@@ -270,6 +575,17 @@ class RadarProc(object):
             self.RangeProfileCfar_Hb        =   dCfg["Hb"]
         if 'Ha' in dCfg:
             self.RangeProfileCfar_Ha        =   dCfg["Ha"]
+        if 'Type' in dCfg:
+            self.RangeProfileCfar_Type      =   dCfg["Type"]
+
+        # Type, K and ThresdB only apply to the 'CA' and 'OS' detectors
+        dDetCfg     =   dict((Key, dCfg[Key]) for Key in ('K', 'ThresdB', 'Edge', 'PeakExt') if Key in dCfg)
+        dDetCfg["Lz"]   =   self.RangeProfileCfar_Lz
+        dDetCfg["Lb"]   =   self.RangeProfileCfar_Lb
+        dDetCfg["La"]   =   self.RangeProfileCfar_La
+        if self.RangeProfileCfar_Type != 'Filt':
+            dDetCfg["Type"] =   self.RangeProfileCfar_Type
+        self.RangeProfileCfar_Det.CfgCfar(dDetCfg)
 
         hCfar               =   zeros(self.RangeProfileCfar_Lb + self.RangeProfileCfar_Lz + self.RangeProfileCfar_La)
         Idx1                =   0
@@ -288,6 +604,7 @@ class RadarProc(object):
         hCfarPad            =   fft.fftshift(hCfarPad)
         self.RangeProfileCfar_HCfar     =   fft.ifft(hCfarPad, self.RangeProfile_FFT)
         self.RangeProfileCfar_HCfar     =   fft.fftshift(self.RangeProfileCfar_HCfar)*self.RangeProfile_FFT
+        self.RangeProfile_Plan          =   None
 
         return self.RangeProfileCfar_HCfar
 
@@ -306,6 +623,13 @@ class RadarProc(object):
         #           FuSca:          Data Scaling constant
         #           fs:             Sampling frequency
         #           kf:             Chirp rate
+        #           Dtype:          Processing precision (float32 or float64)
+        #           Zoom:           Chirp-z range interval (0: off, 1: if cheaper, 2: always)
+        #           N, NrChn:       Frame size; if given the plan is built here
+        #                           N also splits chirp blocks in RangeProfileBatch
+        #           PoolOut:        Return outputs from the buffer pool (see CfgPool)
+        #           FftLib:         FFT library of all stages: 'numpy' or 'scipy'
+        #           FftWorkers:     Threads of the scipy FFTs (-1: all cores)
 
         if 'NIni' in dCfg:
             self.RangeProfile_NIni  =   dCfg["NIni"]
@@ -317,7 +641,7 @@ class RadarProc(object):
             self.RangeProfile_Window        =   dCfg["Window"]
         if 'FFT' in dCfg:
             self.RangeProfile_FFT           =   dCfg["FFT"]
-            self.RangeProfile_FFT           =   round(self.RangeProfile_FFT/2)*2
+            self.RangeProfile_FFT           =   int(round(self.RangeProfile_FFT/2)*2)
         if 'XPos' in dCfg:
             self.RangeProfile_XPos          =   dCfg["XPos"]
         if 'Abs' in dCfg:
@@ -336,6 +660,18 @@ class RadarProc(object):
             self.RangeProfile_RMax          =   dCfg["RMax"]
         if 'Ext' in dCfg:
             self.RangeProfile_Ext           =   dCfg["Ext"]
+        if 'N' in dCfg:
+            self.RangeProfile_N             =   int(dCfg["N"])
+        if 'Zoom' in dCfg:
+            self.RangeFFT_Zoom  =   dCfg["Zoom"]
+        if 'Dtype' in dCfg:
+            self.CfgDtype(dCfg["Dtype"])
+        if 'PoolOut' in dCfg:
+            self.CfgPool(dCfg["PoolOut"])
+        if 'FftLib' in dCfg:
+            self.Fft.CfgFft({"Lib": dCfg["FftLib"]})
+        if 'FftWorkers' in dCfg:
+            self.Fft.CfgFft({"Workers": dCfg["FftWorkers"]})
 
         # Update requried parameters
         if self.RangeProfile_XPos > 0:
@@ -348,6 +684,11 @@ class RadarProc(object):
             self.RangeProfile_IdxMin      =   argmin(abs(Range - self.RangeProfile_RMin))
             self.RangeProfile_IdxMax      =   argmin(abs(Range - self.RangeProfile_RMax))
 
+        self.RangeProfile_Plan  =   None
+        if 'N' in dCfg and 'NrChn' in dCfg:
+            # Build the processing plan now instead of on the first frame
+            self.CfgRangeProfilePlan(int(dCfg["N"]) - self.RangeProfile_NIni, int(dCfg["NrChn"]))
+
     def RangeDoppler(self, Data):
         #   @function       BeamformingUla
         #   @author         Haderer Andreas (HaAn)
@@ -369,32 +710,25 @@ class RadarProc(object):
         Siz     =   Data.shape
         Ny      =   Siz[0]                          # rows
         Nx      =   Siz[1]                          # colums
+        Buf     =   self.GetRangeDopplerBuf(Ny, Nx)
+        Dat     =   Buf["Dat"]
+        Dat[:]  =   Data
 
         if self.RangeDoppler_RemoveMean > 0:
             # Remove mean from data
-            Tmp     =   mean(Data, axis=1)          # mean for all input signals
-            mTmp    =   tile(Tmp, (Nx, 1))
-            Data    =   Data - mTmp.transpose()
+            mean(Dat, axis=1, keepdims=True, out=Buf["Mean"])
+            Dat     -=  Buf["Mean"]
 
         if self.RangeDoppler_RangeWindow > 0:
-            Win     =   hanning(Ny)
-            ScaWin  =   sum(Win)
-            Win2D   =   tile(Win, (Nx, 1))
-            Win2D   =   Win2D.transpose()
-            Data    =   Data*Win2D
+            Win, ScaWin     =   self.GetHanning(Ny)
+            Dat     *=  Win[:,newaxis]
         else:
             ScaWin  =   Ny
 
-        # Calculate Range FFT
-        x           =   zeros((int(self.RangeDoppler_RangeFFT), Nx))
+        # Calculate Range FFT: positive rangebins only
         StrtIdx     =   int((self.RangeDoppler_RangeFFT - Ny)/2)
-        x[StrtIdx:StrtIdx+Ny,:]     =   Data
-        X           =   fft.fft(x, self.RangeDoppler_RangeFFT, 0)/ScaWin*self.FuSca
-        # Extract positive rangebins
-        X           =   X[0:int(self.RangeDoppler_RangeFFT/2),:]
-
-        if self.RangeDoppler_Ext > 0:
-            X       =   X[int(self.RangeDoppler_IdxMin):int(self.RangeDoppler_IdxMax),:]
+        IdxMin, IdxMax  =   self.GetRangeDopplerBins()
+        X           =   self.RangeFFT(Dat, self.RangeDoppler_RangeFFT, StrtIdx, ScaWin, IdxMin, IdxMax, Buf["Range"])
 
         # Calculate Angular FFT
         Siz     =   X.shape
@@ -402,27 +736,54 @@ class RadarProc(object):
         Nx      =   Siz[1]
 
         if self.RangeDoppler_VelWindow > 0:
-            Win     =   hanning(Nx)
-            ScaWin  =   sum(Win)
-            Win2D   =   tile(Win, (Ny,1))
-            X       =   X*Win2D
+            Win, ScaWin     =   self.GetHanning(Nx)
+            X       *=  Win
         else:
             ScaWin  =   Nx
 
-        # Use complex array: important for assignment in the next line
-        rd          =   zeros((Ny, int(self.RangeDoppler_VelFFT)), dtype = 'complex_')
+        # Zero padded buffer: only the data columns are written
+        rd          =   Buf["Buf"]
         StrtIdx     =   int((self.RangeDoppler_VelFFT - Nx)/2)
         rd[:,StrtIdx:StrtIdx + Nx]    =   X
 
-        RD        =   fft.fft(rd, self.RangeDoppler_VelFFT, 1)/ScaWin
-        RD        =   fft.fftshift(RD, axes = 1)
+        RD          =   self.Fft.Fft(rd, self.RangeDoppler_VelFFT, 1, Buf["Spec"])
+        RD          /=  ScaWin
 
+        # fftshift while copying to the output
+        NFFT        =   int(self.RangeDoppler_VelFFT)
+        Half        =   NFFT//2
         if self.RangeDoppler_Abs > 0:
-            RD          =   abs(RD)
+            Out     =   self.GetOut("RangeDoppler", RD.shape, self.Dtype)
+            absolute(RD[:,Half:], out=Out[:,0:NFFT-Half])
+            absolute(RD[:,0:Half], out=Out[:,NFFT-Half:])
             if self.RangeDoppler_dB > 0:
-                RD    =   20*log10(RD)
+                log10(Out, out=Out)
+                Out *=  20
+        else:
+            Out     =   self.GetOut("RangeDoppler", RD.shape, self.CDtype)
+            Out[:,0:NFFT-Half]  =   RD[:,Half:]
+            Out[:,NFFT-Half:]   =   RD[:,0:Half]
 
-        return RD
+        return Out
+
+    def GetRangeDopplerBins(self):
+        if self.RangeDoppler_Ext > 0:
+            return int(self.RangeDoppler_IdxMin), int(self.RangeDoppler_IdxMax)
+        return 0, int(self.RangeDoppler_RangeFFT)//2
+
+    def GetRangeDopplerBuf(self, Ny, Nx):
+        #   @function       GetRangeDopplerBuf
+        #   @brief          Pooled work buffers of RangeDoppler for Ny samples
+        #                   and Nx chirps; allocated by CfgRangeDoppler
+        IdxMin, IdxMax  =   self.GetRangeDopplerBins()
+        NFFT            =   int(self.RangeDoppler_VelFFT)
+        Buf             =   dict()
+        Buf["Dat"]      =   self.Pool.Get("RangeDoppler_Dat", (Ny, Nx), self.Dtype)
+        Buf["Mean"]     =   self.Pool.Get("RangeDoppler_Mean", (Ny, 1), self.Dtype)
+        Buf["Range"]    =   self.Pool.Get("RangeDoppler_Range", (IdxMax - IdxMin, Nx), self.CDtype)
+        Buf["Buf"]      =   self.Pool.Get("RangeDoppler_Buf", (IdxMax - IdxMin, NFFT), self.CDtype)
+        Buf["Spec"]     =   self.Pool.Get("RangeDoppler_Spec", (IdxMax - IdxMin, NFFT), self.CDtype)
+        return Buf
 
     def CfgRangeDoppler(self, dCfg):
         if 'NIni' in dCfg:
@@ -435,10 +796,10 @@ class RadarProc(object):
             self.RangeDoppler_Window            =   dCfg["Window"]
         if 'RangeFFT' in dCfg:
             self.RangeDoppler_RangeFFT          =   dCfg["RangeFFT"]
-            self.RangeDoppler_RangeFFT          =    round(self.RangeDoppler_RangeFFT/2)*2
+            self.RangeDoppler_RangeFFT          =    int(round(self.RangeDoppler_RangeFFT/2)*2)
         if 'VelFFT' in dCfg:
             self.RangeDoppler_VelFFT            =   dCfg["VelFFT"]
-            self.RangeDoppler_VelFFT            =    round(self.RangeDoppler_VelFFT/2)*2
+            self.RangeDoppler_VelFFT            =    int(round(self.RangeDoppler_VelFFT/2)*2)
         if 'Abs' in dCfg:
             self.RangeDoppler_Abs               =   dCfg["Abs"]
         if 'dB' in dCfg:
@@ -465,6 +826,16 @@ class RadarProc(object):
             self.RangeDoppler_Tp                =   dCfg["Tp"]
         if 'ThresdB' in dCfg:
             self.RangeDopplerTar_ThresdB        =   dCfg["ThresdB"]
+        if 'Zoom' in dCfg:
+            self.RangeFFT_Zoom  =   dCfg["Zoom"]
+        if 'Dtype' in dCfg:
+            self.CfgDtype(dCfg["Dtype"])
+        if 'PoolOut' in dCfg:
+            self.CfgPool(dCfg["PoolOut"])
+        if 'FftLib' in dCfg:
+            self.Fft.CfgFft({"Lib": dCfg["FftLib"]})
+        if 'FftWorkers' in dCfg:
+            self.Fft.CfgFft({"Workers": dCfg["FftWorkers"]})
 
         # Update requried parameters
         Freq    =   arange(int(self.RangeDoppler_RangeFFT/2))/self.RangeDoppler_RangeFFT * self.fs
@@ -474,6 +845,58 @@ class RadarProc(object):
             self.RangeDoppler_IdxMin      =   argmin(abs(Range - self.RangeDoppler_RMin))
             self.RangeDoppler_IdxMax      =   argmin(abs(Range - self.RangeDoppler_RMax))
 
+        # Size the work buffers; the zero padding of the Doppler FFT is set here
+        Buf         =   self.GetRangeDopplerBuf(int(self.RangeDoppler_N) - self.RangeDoppler_NIni, int(self.RangeDoppler_Frms))
+        Buf["Buf"][:]   =   0
+
+    def RangeDopplerCfar(self, Data, stSel):
+        #   @function       RangeDopplerCfar
+        #   @brief          2D cell averaging CFAR on the range-Doppler map
+        #           Data:           Data of one range-Doppler map or a stack
+        #                           (maps x Frms*N) of several maps
+        #           stSel:          'Thres': threshold map
+        #                           'Tar':   target map (1: target)
+        #                           'Det':   structured array of targets (Cfar.Det2DDtype)
+        Data    =   asarray(Data)
+        if Data.ndim == 2 and Data.shape[1] == self.RangeDoppler_Frms*self.RangeDoppler_N:
+            # Copied map by map: with pooled outputs (CfgPool) every
+            # RangeDoppler call returns the same buffer
+            RD  =   None
+            for Idx in range(0, Data.shape[0]):
+                Map     =   self.RangeDoppler(Data[Idx])
+                if RD is None:
+                    RD  =   empty((Data.shape[0],) + Map.shape, dtype = Map.dtype)
+                RD[Idx] =   Map
+        else:
+            RD  =   self.RangeDoppler(Data)
+        if iscomplexobj(RD):
+            RD  =   abs(RD)
+
+        self.RangeDopplerCfar_Det.dB    =   self.RangeDoppler_Abs > 0 and self.RangeDoppler_dB > 0
+        Thres   =   self.RangeDopplerCfar_Det.Thres(RD)
+        if stSel == 'Thres':
+            return Thres
+        if stSel == 'Tar':
+            return 1*self.RangeDopplerCfar_Det.Tar(RD, Thres)
+        if stSel == 'Det':
+            Range   =   self.GetRangeDoppler('Range')
+            Vel     =   None
+            if self.RangeDoppler_Tp > 0 and self.RangeDoppler_fc > 0:
+                Vel     =   self.GetRangeDoppler('Vel')
+            return self.RangeDopplerCfar_Det.Detect(RD, Thres, Range, Vel)
+        return Thres
+
+    def CfgRangeDopplerCfar(self, dCfg):
+        #   @function       CfgRangeDopplerCfar
+        #   @brief          Configure the range-Doppler CFAR
+        #           RangeLz, VelLz: Guard window around the cell under test
+        #           RangeLb, VelLb: Training cells before the guard window
+        #           RangeLa, VelLa: Training cells after the guard window
+        #           ThresdB:        Threshold above the mean in dB
+        #           VelWrap:        Training window wraps around the velocity axis
+        #           Peak:           Detect only local maxima above the threshold
+        self.RangeDopplerCfar_Det.CfgCfar(dCfg)
+
     def GetRangeDoppler(self, stSel):
         if stSel == 'Range':
             Freq    =   arange(int(self.RangeDoppler_RangeFFT/2))/self.RangeDoppler_RangeFFT * self.fs
@@ -506,75 +929,210 @@ class RadarProc(object):
         #           dB:             Spectrum in dB
         #           FuSca:          Data Scaling constant
 
+        if len(varargin) == 0 and (self.BeamformingUla_Mode in ('Mvdr', 'Music') or self.BeamformingUla_MimoEna > 0):
+            return self.BeamformingUlaDoa(Data)
+
         Data    =   Data[self.BeamformingUla_NIni:,:]
         Siz     =   Data.shape
         Ny      =   Siz[0]                          # rows
         Nx      =   Siz[1]                          # colums
 
+        Dat     =   self.Pool.Get("BeamformingUla_Dat", (Ny, Nx), self.Dtype)
+        Dat[:]  =   Data
         if self.BeamformingUla_RemoveMean > 0:
             # Remove mean from data
-            Tmp     =   mean(Data, axis=0)          # mean for all input signals
-            mTmp    =   tile(Tmp, (Ny, 1))
-            Data    =   Data - mTmp
+            Mean    =   self.Pool.Get("BeamformingUla_Mean", (1, Nx), self.Dtype)
+            mean(Dat, axis=0, keepdims=True, out=Mean)
+            Dat     -=  Mean
 
         if self.BeamformingUla_RangeWindow > 0:
-            Win     =   hanning(Ny)
-            ScaWin  =   sum(Win)
-            Win2D   =   tile(Win, (Nx, 1))
-            Win2D   =   Win2D.transpose()
-            Data    =   Data*Win2D
+            Win, ScaWin     =   self.GetHanning(Ny)
+            Dat     *=  Win[:,newaxis]
         else:
             ScaWin  =   Ny
 
         if len(varargin) > 0:
             ChnIdx      =   int((self.BeamformingUla_AngFFT - Nx)/2)
-            x           =   zeros((self.BeamformingUla_RangeFFT , Nx), dtype = 'complex_')
-            StrtIdx     =   int((self.BeamformingUla_RangeFFT - Ny)/2)
-            x[StrtIdx:StrtIdx+Ny,:]     =   Data*self.HCfar[StrtIdx:StrtIdx+Ny,ChnIdx:ChnIdx + Nx]
-        else:
-            # Calculate Range FFT
-            x           =   zeros((int(self.BeamformingUla_RangeFFT), Nx))
+            x           =   zeros((self.BeamformingUla_RangeFFT , Nx), dtype = self.CDtype)
             StrtIdx     =   int((self.BeamformingUla_RangeFFT - Ny)/2)
-            x[StrtIdx:StrtIdx+Ny,:]     =   Data
+            x[StrtIdx:StrtIdx+Ny,:]     =   Dat*self.HCfar[StrtIdx:StrtIdx+Ny,ChnIdx:ChnIdx + Nx]
 
-        x           =   fft.fftshift(x, axes = 0)
-        X           =   fft.fft(x, self.BeamformingUla_RangeFFT, 0)/ScaWin*self.FuSca
-        # Extract positive rangebins
-        X           =   X[0:int(self.BeamformingUla_RangeFFT/2),:]
+            x           =   fft.fftshift(x, axes = 0)
+            X           =   self.Fft.Fft(x, self.BeamformingUla_RangeFFT, 0).astype(self.CDtype, copy=False)
+            X           *=  self.FuSca/ScaWin
+            # Extract positive rangebins
+            X           =   X[0:int(self.BeamformingUla_RangeFFT/2),:]
 
-        if self.BeamformingUla_Ext > 0:
-            X       =   X[int(self.BeamformingUla_IdxMin):int(self.BeamformingUla_IdxMax),:]
+            if self.BeamformingUla_Ext > 0:
+                X       =   X[int(self.BeamformingUla_IdxMin):int(self.BeamformingUla_IdxMax),:]
+            Name        =   "BeamformingUlaCfar_"
+        else:
+            # Calculate Range FFT: positive rangebins only, fftshift as phase ramp
+            NFFT        =   int(self.BeamformingUla_RangeFFT)
+            StrtIdx     =   int((NFFT - Ny)/2)
+            Pos         =   (StrtIdx + NFFT//2) % NFFT
+            IdxMin, IdxMax  =   self.GetBeamformingUlaBins()
+            X           =   self.Pool.Get("BeamformingUla_Range", (IdxMax - IdxMin, Nx), self.CDtype)
+            self.RangeFFT(Dat, NFFT, Pos, ScaWin, IdxMin, IdxMax, X)
+            Name        =   "BeamformingUla_"
 
         # extract channels according to channel order
-        XChn        =   X[:,self.BeamformingUla_ChnOrder]
-        CalChn      =   self.BeamformingUla_CalData[self.BeamformingUla_ChnOrder]
+        ChnOrder    =   self.BeamformingUla_ChnOrder
+        XChn        =   self.Pool.Get(Name + "Chn", (X.shape[0], len(ChnOrder)), self.CDtype)
+        take(X, ChnOrder, axis=1, out=XChn)
 
+        if len(varargin) == 0 and self.BeamformingUla_Mode == 'Steer':
+            # One matrix multiply with the steering vectors of the angle grid
+            Steer   =   self.GetBeamformingUlaSteer(XChn.shape[1])
+            JOpt    =   self.GetOut("BeamformingUla_JOpt", (XChn.shape[0], Steer.shape[1]), self.CDtype)
+            return dot(XChn, Steer, out=JOpt)
 
         # Calculate Angular FFT
         Siz     =   XChn.shape
         Ny      =   Siz[0]                  # rows
         Nx      =   Siz[1]
 
+        Win, ScaWin =   self.GetBeamformingUlaWin(Nx)
+        XChn        *=  Win
+
+        # Zero padded buffer: only the channel columns are written
+        NFFT        =   int(self.BeamformingUla_AngFFT)
+        jOpt        =   self.Pool.Get((Name + "Buf", Nx), (Ny, NFFT), self.CDtype)
+        StrtIdx     =   int((NFFT - Nx)/2)
+        jOpt[:,StrtIdx:StrtIdx + Nx]    =   XChn
+
+        JFft        =   self.Fft.Fft(jOpt, NFFT, 1, self.Pool.Get(Name + "Spec", (Ny, NFFT), self.CDtype))
+        JFft        /=  ScaWin
+
+        # fftshift while copying to the output
+        Half        =   NFFT//2
+        JOpt        =   self.GetOut(Name + "JOpt", (Ny, NFFT), self.CDtype)
+        JOpt[:,0:NFFT-Half]     =   JFft[:,Half:]
+        JOpt[:,NFFT-Half:]      =   JFft[:,0:Half]
+
+        return JOpt
+
+    def GetBeamformingUlaBins(self):
+        if self.BeamformingUla_Ext > 0:
+            return int(self.BeamformingUla_IdxMin), int(self.BeamformingUla_IdxMax)
+        return 0, int(self.BeamformingUla_RangeFFT)//2
+
+    def GetBeamformingUlaWin(self, Nx):
+        #   @brief          Angular window times calibration of the Nx channels in
+        #                   ChnOrder, and the window sum. Cached until the next Cfg call
+        Win     =   self.BeamformingUla_Win
+        if Win is not None and Win[0].shape[0] == Nx and Win[0].dtype == self.CDtype:
+            return Win
+
+        CalChn      =   asarray(self.BeamformingUla_CalData)[self.BeamformingUla_ChnOrder].astype(self.CDtype)
         if self.BeamformingUla_AngWindow > 0:
-            Win     =   hanning(Nx)
+            Win     =   hanning(Nx).astype(self.Dtype)
             ScaWin  =   sum(Win)
             Win     =   Win*CalChn
-            Win2D   =   tile(Win, (Ny,1))
-            XChn    =   XChn*Win2D
         else:
             ScaWin  =   Nx
-            Win2D   =   tile(CalChn, (Ny,1))
-            XChn    =   XChn*Win2D
-
-        # Use complex array: important for assignment in the next line
-        jOpt        =   zeros((Ny, int(self.BeamformingUla_AngFFT)), dtype = 'complex_')
-        StrtIdx     =   int((self.BeamformingUla_AngFFT - Nx)/2)
-        jOpt[:,StrtIdx:StrtIdx + Nx]    =   XChn
+            Win     =   CalChn
+        self.BeamformingUla_Win     =   (Win.astype(self.CDtype), ScaWin)
+        return self.BeamformingUla_Win
+
+    def BeamformingUlaChirps(self, Data):
+        #   @function       BeamformingUlaChirps
+        #   @brief          Range spectra of all chirps of a frame
+        #           Data:           (chirps*N) x channels
+        #           Returns:        chirps x range bins x channels, with
+        #                           channel order and calibration applied
+        N       =   int(self.BeamformingUla_N)
+        if N <= 0:
+            N   =   Data.shape[0]
+        Data    =   Data.reshape(-1, N, Data.shape[-1])[:,self.BeamformingUla_NIni:,:].astype(self.Dtype)
+        Ny      =   Data.shape[1]
 
-        JOpt        =   fft.fft(jOpt, self.BeamformingUla_AngFFT, 1)/ScaWin
-        JOpt        =   fft.fftshift(JOpt, axes = (1))
+        if self.BeamformingUla_RemoveMean > 0:
+            Data    -=  mean(Data, axis=1, keepdims=True)
+        if self.BeamformingUla_RangeWindow > 0:
+            Win     =   hanning(Ny).astype(self.Dtype)
+            ScaWin  =   sum(Win)
+            Data    *=  Win[:,newaxis]
+        else:
+            ScaWin  =   Ny
 
-        return JOpt
+        NFFT        =   int(self.BeamformingUla_RangeFFT)
+        StrtIdx     =   int((NFFT - Ny)/2)
+        Pos         =   (StrtIdx + NFFT//2) % NFFT
+        if self.BeamformingUla_Ext > 0:
+            X       =   self.RangeFFT(Data, NFFT, Pos, ScaWin, self.BeamformingUla_IdxMin, self.BeamformingUla_IdxMax)
+        else:
+            X       =   self.RangeFFT(Data, NFFT, Pos, ScaWin)
+
+        ChnOrder    =   self.BeamformingUla_ChnOrder
+        CalChn      =   asarray(self.BeamformingUla_CalData)[ChnOrder].astype(self.CDtype)
+        return X[...,ChnOrder]*CalChn
+
+    def BeamformingUlaMimo(self, X):
+        #   @function       BeamformingUlaMimo
+        #   @brief          Virtual array of time multiplexed transmitters
+        #                   Chirp c is sent by Tx (c mod NTx). Consecutive chirps
+        #                   of all Tx form one snapshot of the NTx*NRx virtual
+        #                   array (Tx major, see GetBeamformingUlaPosn). A moving
+        #                   target adds a phase between the Tx slots; it is
+        #                   estimated per range bin from the phase advance between
+        #                   snapshots (Tx1 chirps) and removed.
+        #           X:              chirps x range bins x NRx
+        #           Returns:        snapshots x range bins x NTx*NRx
+        NTx     =   len(asarray(self.BeamformingUla_TxPosn).ravel())
+        Nc      =   X.shape[0]//NTx
+        if Nc == 0:
+            raise ValueError("BeamformingUla: MIMO needs at least %d chirps per frame" % NTx)
+        X       =   X[0:Nc*NTx].reshape((Nc, NTx) + X.shape[1:])
+
+        if Nc > 1:
+            Rho     =   einsum('mri,mri->r', X[1:,0], conj(X[:-1,0]))
+            Phi     =   angle(Rho)/NTx
+            Comp    =   exp(-1j*outer(arange(NTx), Phi)).astype(self.CDtype)
+            X       =   X*Comp[newaxis,:,:,newaxis]
+
+        X       =   swapaxes(X, 1, 2)
+        return X.reshape(Nc, X.shape[1], -1)
+
+    def BeamformingUlaDoa(self, Data):
+        #   @function       BeamformingUlaDoa
+        #   @brief          Angle spectrum from all chirps of a frame
+        #                   ('Mvdr' or 'Music' mode, or MimoEna)
+        #                   With MimoEna the snapshots of the virtual array are
+        #                   used; the 'Steer' and 'FFT' modes then average the
+        #                   power of the steering matrix output over snapshots.
+        #                   For Mvdr/Music the channel covariance of every range
+        #                   bin is averaged over the snapshots and decomposed with
+        #                   one batched eigh over all range bins.
+        #                   Mvdr:   1/(a^H R^-1 a)
+        #                   Music:  1/|En^H a|^2 with the noise subspace En
+        #                   Returned as the square root of the spectrum, so Abs
+        #                   and dB behave as for the other modes
+        #           Data:           (chirps*N) x channels
+        X       =   self.BeamformingUlaChirps(Data)
+        if self.BeamformingUla_MimoEna > 0:
+            X   =   self.BeamformingUlaMimo(X)
+        Nc      =   X.shape[0]
+        Nx      =   X.shape[2]
+
+        if self.BeamformingUla_Mode not in ('Mvdr', 'Music'):
+            JOpt    =   abs(matmul(X, self.GetBeamformingUlaSteer(Nx)))**2
+            return sqrt(mean(JOpt, axis=0))
+
+        # Covariance per range bin: range bins x channels x channels
+        R           =   einsum('cri,crj->rij', X, conj(X))/Nc
+        Load        =   self.BeamformingUla_Loading*real(trace(R, axis1=1, axis2=2))/Nx
+        R           +=  Load[:,newaxis,newaxis]*eye(Nx)
+
+        Val, Vec    =   linalg.eigh(R)
+        # Projection of the steering vectors on the eigenvectors: bins x eig x angles
+        Proj        =   abs(matmul(conj(swapaxes(Vec, 1, 2)), self.GetBeamformingUlaArray(Nx)))**2
+        if self.BeamformingUla_Mode == 'Mvdr':
+            Den     =   einsum('rea,re->ra', Proj, 1/Val)
+        else:
+            NrNoise =   Nx - int(self.BeamformingUla_NrTar)
+            Den     =   sum(Proj[:,0:NrNoise,:], axis=1)
+        return sqrt(1/Den)
 
     def BeamformingUla(self, Data):
         #   @function       BeamformingUla
@@ -591,9 +1149,14 @@ class RadarProc(object):
         #           FuSca:          Data Scaling constant
         JOpt    =   self.BeamformingUlaFFT(Data)
         if self.BeamformingUla_Abs > 0:
-            JOpt        =   abs(JOpt)
+            if iscomplexobj(JOpt):
+                JOpt    =   absolute(JOpt, out=self.GetOut("BeamformingUla", JOpt.shape, self.Dtype))
+            else:
+                # Mvdr, Music and MIMO return a real spectrum
+                absolute(JOpt, out=JOpt)
             if self.BeamformingUla_dB > 0:
-                JOpt    =   20*log10(JOpt)
+                log10(JOpt, out=JOpt)
+                JOpt    *=  20
 
         return JOpt
 
@@ -700,6 +1263,24 @@ class RadarProc(object):
         return self.HCfar
 
     def CfgBeamformingUla(self, dCfg):
+        #   @function       CfgBeamformingUla
+        #   @brief          Configure digital beamforming
+        #           Mode:           'FFT': angular FFT of AngFFT points
+        #                           'Steer': steering matrix for the angle grid Ang
+        #                           'Mvdr', 'Music': high resolution spectrum for Ang
+        #           Ang:            Angle grid in deg ('Steer', 'Mvdr', 'Music')
+        #           N:              Samples per chirp; Mvdr/Music average the
+        #                           covariance over the chirps of a frame
+        #           NrTar:          Music: dimension of the signal subspace
+        #           Loading:        Diagonal loading relative to the mean eigenvalue
+        #           MimoEna:        Chirps are time multiplexed over TxPosn; the
+        #                           virtual array is formed (as in the RfMeas dCfg)
+        #           RxPosn:         Rx antenna positions, e.g. Brd.RfGet('RxPosn')
+        #           TxPosn:         Tx antenna positions, e.g. Brd.RfGet('TxPosn')
+        #           fc:             Carrier frequency, e.g. Brd.RfGet('fc')
+        #           PoolOut:        Return outputs from the buffer pool (see CfgPool)
+        #           FftLib:         FFT library of all stages: 'numpy' or 'scipy'
+        #           FftWorkers:     Threads of the scipy FFTs (-1: all cores)
         if 'NIni' in dCfg:
             self.BeamformingUla_NIni  =   dCfg["NIni"]
             if self.BeamformingUla_NIni < 0:
@@ -710,10 +1291,10 @@ class RadarProc(object):
             self.BeamformingUla_Window          =   dCfg["Window"]
         if 'RangeFFT' in dCfg:
             self.BeamformingUla_RangeFFT        =   dCfg["RangeFFT"]
-            self.BeamformingUla_RangeFFT        =    round(self.BeamformingUla_RangeFFT/2)*2
+            self.BeamformingUla_RangeFFT        =    int(round(self.BeamformingUla_RangeFFT/2)*2)
         if 'AngFFT' in dCfg:
             self.BeamformingUla_AngFFT          =   dCfg["AngFFT"]
-            self.BeamformingUla_AngFFT          =    round(self.BeamformingUla_AngFFT/2)*2
+            self.BeamformingUla_AngFFT          =    int(round(self.BeamformingUla_AngFFT/2)*2)
         if 'Abs' in dCfg:
             self.BeamformingUla_Abs             =   dCfg["Abs"]
         if 'dB' in dCfg:
@@ -733,7 +1314,38 @@ class RadarProc(object):
         if 'CalData' in dCfg:
             self.BeamformingUla_CalData         =   dCfg["CalData"]
         if 'ChnOrder' in dCfg:
-            self.BeamformingUla_ChnOrder        =   dCfg["ChnOrder"]
+            self.BeamformingUla_ChnOrder        =   asarray(dCfg["ChnOrder"])
+        if 'Mode' in dCfg:
+            self.BeamformingUla_Mode            =   dCfg["Mode"]
+        if 'Ang' in dCfg:
+            self.BeamformingUla_Ang             =   dCfg["Ang"]
+        if 'RxPosn' in dCfg:
+            self.BeamformingUla_RxPosn          =   dCfg["RxPosn"]
+        if 'TxPosn' in dCfg:
+            self.BeamformingUla_TxPosn          =   dCfg["TxPosn"]
+        if 'fc' in dCfg:
+            self.BeamformingUla_fc              =   dCfg["fc"]
+        if 'N' in dCfg:
+            self.BeamformingUla_N               =   dCfg["N"]
+        if 'NrTar' in dCfg:
+            self.BeamformingUla_NrTar           =   dCfg["NrTar"]
+        if 'Loading' in dCfg:
+            self.BeamformingUla_Loading         =   dCfg["Loading"]
+        if 'MimoEna' in dCfg:
+            self.BeamformingUla_MimoEna         =   dCfg["MimoEna"]
+        self.BeamformingUla_Steer               =   None
+        self.BeamformingUla_Array               =   None
+        self.BeamformingUla_Win                 =   None
+        if 'Zoom' in dCfg:
+            self.RangeFFT_Zoom  =   dCfg["Zoom"]
+        if 'Dtype' in dCfg:
+            self.CfgDtype(dCfg["Dtype"])
+        if 'PoolOut' in dCfg:
+            self.CfgPool(dCfg["PoolOut"])
+        if 'FftLib' in dCfg:
+            self.Fft.CfgFft({"Lib": dCfg["FftLib"]})
+        if 'FftWorkers' in dCfg:
+            self.Fft.CfgFft({"Workers": dCfg["FftWorkers"]})
 
         # Update requried parameters
         Freq    =   arange(int(self.BeamformingUla_RangeFFT/2))/self.BeamformingUla_RangeFFT * self.fs
@@ -743,7 +1355,68 @@ class RadarProc(object):
             self.BeamformingUla_IdxMin      =   argmin(abs(Range - self.BeamformingUla_RMin))
             self.BeamformingUla_IdxMax      =   argmin(abs(Range - self.BeamformingUla_RMax))
 
-    def GetBeamformingUla(self, dCfg):
+    def GetBeamformingUlaPosn(self, Nx):
+        #   @function       GetBeamformingUlaPosn
+        #   @brief          Positions of the Nx data channels: the Rx positions
+        #                   for a single Tx, Tx + Rx (Tx major) for a virtual array
+        RxPosn  =   asarray(self.BeamformingUla_RxPosn, dtype=float64).ravel()
+        TxPosn  =   asarray(self.BeamformingUla_TxPosn, dtype=float64).ravel()
+        if Nx == len(RxPosn):
+            return TxPosn[0] + RxPosn
+        if Nx == len(RxPosn)*len(TxPosn):
+            return (TxPosn[:,newaxis] + RxPosn[newaxis,:]).ravel()
+        raise ValueError("BeamformingUla: no antenna positions for %d channels" % Nx)
+
+    def GetBeamformingUlaOrder(self, Nx):
+        #   @brief          Channel order of the Nx channels; ChnOrder of the Rx
+        #                   channels is repeated for every Tx of a virtual array
+        ChnOrder    =   asarray(self.BeamformingUla_ChnOrder)
+        NRx         =   len(ChnOrder)
+        return (arange(0, Nx, NRx)[:,newaxis] + ChnOrder[newaxis,:]).ravel()
+
+    def GetBeamformingUlaArray(self, Nx):
+        #   @function       GetBeamformingUlaArray
+        #   @brief          Array response (channels in ChnOrder x angles) for the
+        #                   angle grid BeamformingUla_Ang. Cached until the next
+        #                   Cfg call
+        Array   =   self.BeamformingUla_Array
+        if Array is not None and Array.shape[0] == Nx and Array.dtype == self.CDtype:
+            return Array
+
+        Posn        =   self.GetBeamformingUlaPosn(Nx)[self.GetBeamformingUlaOrder(Nx)]
+        Posn        =   Posn - mean(Posn)
+        k           =   2*pi*self.BeamformingUla_fc/self.c0
+        Ang         =   deg2rad(asarray(self.BeamformingUla_Ang, dtype=float64))
+        self.BeamformingUla_Array   =   exp(1j*k*outer(Posn, sin(Ang))).astype(self.CDtype)
+        return self.BeamformingUla_Array
+
+    def GetBeamformingUlaSteer(self, Nx):
+        #   @function       GetBeamformingUlaSteer
+        #   @brief          Beamforming matrix (channels x angles) for the angle
+        #                   grid BeamformingUla_Ang; includes angular window,
+        #                   calibration and scaling. Cached until the next Cfg call
+        Steer   =   self.BeamformingUla_Steer
+        if Steer is not None and Steer.shape[0] == Nx and Steer.dtype == self.CDtype:
+            return Steer
+
+        if self.BeamformingUla_MimoEna > 0:
+            # Calibration is applied to the Rx channels before the virtual array
+            CalChn  =   ones(Nx)
+        else:
+            CalChn  =   asarray(self.BeamformingUla_CalData)[asarray(self.BeamformingUla_ChnOrder)]
+        if self.BeamformingUla_AngWindow > 0:
+            Win     =   hanning(Nx)
+            ScaWin  =   sum(Win)
+        else:
+            Win     =   ones(Nx)
+            ScaWin  =   Nx
+
+        Steer       =   conj(self.GetBeamformingUlaArray(Nx))*(Win*CalChn/ScaWin)[:,newaxis]
+
+        self.BeamformingUla_Steer   =   Steer.astype(self.CDtype)
+        return self.BeamformingUla_Steer
+
+    def GetBeamformingUla(self, stSel):
         if stSel == 'Range':
             Freq    =   arange(int(self.BeamformingUla_RangeFFT/2))/self.BeamformingUla_RangeFFT * self.fs
             if self.BeamformingUla_Ext > 0:
@@ -762,6 +1435,9 @@ class RadarProc(object):
                 IdxMax      =   argmin(abs(Range - self.BeamformingUla_RMax))
                 Freq        =   Freq[IdxMin:IdxMax]
             return Freq
+        if stSel == 'Ang':
+            # Angle grid in deg of the 'Steer' mode
+            return asarray(self.BeamformingUla_Ang)
         if stSel == 'AngFreqNorm':
             Freq            =   (arange(int(self.BeamformingUla_AngFFT)) - self.BeamformingUla_AngFFT/2)/self.BeamformingUla_AngFFT
             return Freq
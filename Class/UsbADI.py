@@ -44,14 +44,14 @@ class usbADI():
         arr = (ctypes.c_char * (4))()
         NrBytes = self.usb.UsbRead(4, arr)
         if NrBytes != 0:
-            Header      = fromstring(arr, dtype='uint32')
+            Header      = frombuffer(arr, dtype='uint32')
             LenRxData   = Header[0]//(2**16)
             RxBytes = (ctypes.c_char * (LenRxData-1)*4) ()
 
             RxBytesLen     = self.usb.UsbRead(int((LenRxData - 1)*4), RxBytes)
             if RxBytesLen == ((LenRxData - 1)*4):
                 Data    = zeros(LenRxData - 1, dtype='uint32')
-                Data    = fromstring(RxBytes, dtype='uint32')
+                Data    = frombuffer(RxBytes, dtype='uint32')
                 Result  = (True, Data)
             else:
                 Result  = (False, )
@@ -70,6 +70,15 @@ class usbADI():
         RxDataLen   = self.usb.UsbRead(int(len), Data)
         return Data
 
+    def GetRdBuf(self, NrBytes):
+        """Returns a read buffer of NrBytes for UsbReadInto and its int16 view"""
+        RdBuf       = zeros(int(NrBytes)//2, dtype='int16')
+        return RdBuf, RdBuf
+
+    def UsbReadInto(self, RdBuf):
+        """Reads RdBuf.nbytes bytes into RdBuf (from GetRdBuf), returns the number of bytes read"""
+        return self.usb.UsbRead(int(RdBuf.nbytes), RdBuf.ctypes.data_as(ctypes.c_char_p))
+
     def ConnectToDevice(self):
         """Initializes and Opens DLL driver"""
         if self.UsbOpen:
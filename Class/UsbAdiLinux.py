@@ -29,6 +29,7 @@ class usbADI():
         self.INTERFACE = 0
 
         self.UsbOpen = False
+        self.InitPayload()
         self.usbDev = usb.core.find(idVendor=self.VENDOR_ID, idProduct=self.PRODUCT_ID)
         if self.usbDev is None:
             self.UsbOpen = False
@@ -56,6 +57,21 @@ class usbADI():
             assert self.usbRdEp is not None
 
 
+    def InitPayload(self):
+        """Allocates the command payload, which is reused for every command
+
+        2048 bytes: the byte length of the words (uint16), then up to 511
+        words (uint32), both little endian. The storage is an array.array,
+        which pyusb writes without converting it; the numpy views of the
+        length and the words (at byte offset 2, so unaligned) pack a
+        command with two slice assignments.
+        """
+        self.Payload = array('B', bytes(2048))
+        PayloadBuf = np.frombuffer(self.Payload, dtype='uint8')
+        self.PayloadLen = PayloadBuf[0:2].view('<u2')
+        self.PayloadWords = PayloadBuf[2:2046].view('<u4')
+        self.PayloadNrWords = 0
+
     def CmdBuild(self, Ack, CmdCod, Data):
         LenData = len(Data) + 1
         TxData = np.zeros(LenData, dtype='uint32')
@@ -64,44 +80,37 @@ class usbADI():
         return TxData
 
     def UsbWrCmd(self, Cmd):
-        Payload = np.zeros(2048, dtype='uint8')
-        PayloadIndex = 2
-        for Val in Cmd:
-            Payload[PayloadIndex + 3] = (Val >> 24) & 0xFF
-            Payload[PayloadIndex + 2] = (Val >> 16) & 0xFF
-            Payload[PayloadIndex + 1] = (Val >> 8) & 0xFF
-            Payload[PayloadIndex] = (Val) & 0xFF
-            PayloadIndex += 4
-        PayloadIndex -= 2
-        Payload[0] = PayloadIndex & 0xFF
-        Payload[1] = (PayloadIndex >> 8) & 0xFF
-        if self.UsbOpen:
-            self.usbWrEp.write(Payload)
-        else:
-            print("ERROR: Device not Open")
+        NrWords = len(Cmd)
+        self.CheckPayload(NrWords)
+        self.PayloadWords[:NrWords] = Cmd
+        self.UsbWrPayload(NrWords)
 
     def UsbWriteADICmd(self, TxData):
-        Payload = np.zeros(2048, dtype='uint8')
-        PayloadIndex = 2
-        for Val in TxData:
-            Payload[PayloadIndex + 3] = (Val >> 24) & 0xFF
-            Payload[PayloadIndex + 2] = (Val >> 16) & 0xFF
-            Payload[PayloadIndex + 1] = (Val >> 8) & 0xFF
-            Payload[PayloadIndex] = (Val) & 0xFF
-            PayloadIndex += 4
-        PayloadIndex -= 2
-        Payload[0] = PayloadIndex & 0xFF
-        Payload[1] = (PayloadIndex >> 8) & 0xFF
+        self.UsbWrCmd(TxData)
 
+    def CmdSend(self, Ack, Cod, Data):
+        """Packs header and data straight into the payload (CmdBuild + UsbWrCmd without the array)"""
+        NrWords = len(Data) + 1
+        self.CheckPayload(NrWords)
+        self.PayloadWords[0] = (2**24)*Ack + (2**16)*NrWords + Cod
+        self.PayloadWords[1:NrWords] = Data
+        self.UsbWrPayload(NrWords)
+
+    def CheckPayload(self, NrWords):
+        if NrWords > len(self.PayloadWords):
+            raise ValueError("Command of %d words exceeds the payload of %d words" % (NrWords, len(self.PayloadWords)))
+
+    def UsbWrPayload(self, NrWords):
+        """Writes the payload holding NrWords words; clears the words left from a longer command"""
+        if self.PayloadNrWords > NrWords:
+            self.PayloadWords[NrWords:self.PayloadNrWords] = 0
+        self.PayloadNrWords = NrWords
+        self.PayloadLen[0] = 4*NrWords
         if self.UsbOpen:
-            self.usbWrEp.write(Payload)
+            self.usbWrEp.write(self.Payload)
         else:
             print("ERROR: Device not Open")
 
-    def CmdSend(self, Ack, Cod, Data):
-        Cmd = self.CmdBuild(Ack, Cod, Data)
-        self.UsbWrCmd(Cmd)
-
     def CmdRecv(self):
         Result = (False, )
         RxData = self.usbRdEp.read(128)
@@ -125,6 +134,19 @@ class usbADI():
         RetData   = bytes(RxData)
         return RetData
 
+    def GetRdBuf(self, NrBytes):
+        """Returns a read buffer of NrBytes for UsbReadInto and its int16 view
+
+        pyusb reads straight into an array.array, the numpy view shares its
+        memory, so the data is never copied.
+        """
+        RdBuf = array('h', bytes(int(NrBytes)))
+        return RdBuf, np.frombuffer(RdBuf, dtype='int16')
+
+    def UsbReadInto(self, RdBuf):
+        """Reads len(RdBuf) items into RdBuf (from GetRdBuf), returns the number of bytes read"""
+        return self.usbRdEp.read(RdBuf)
+
     def CloseGlobalHandles(self):
         # Dummy, not needed for Linux
         print("Close Handles")
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Time-domain backprojection for the stepped-rail captures.
+
+Unlike sar.focused_sar this uses the exact two-way range from every rail
+position to every output pixel, so there is no Fresnel approximation and
+no fixed aperture length. The rail runs along x with position i at
+x = i*step, and y is the down-range distance from the rail.
+"""
+
+import multiprocessing as mp
+import os
+
+import numpy as np
+
+c0 = 3e8
+
+# Bytes of temporaries per pixel and rail position (range, index, weight,
+# samples and phase term)
+_BYTES_PER_PAIR = 56
+
+_state = {}
+
+
+def range_compress(DataCube, kf, fs=1e6, window=True, flipped=True, upsample=4):
+    """Return (profiles, dr): zero padded range profiles, one per rail position,
+    and their bin spacing in metres.
+
+    flipped: fast time is stored reversed, as sarImage.py does with np.flip
+    """
+    Data = np.asarray(DataCube, dtype="float64")
+    if flipped:
+        Data = Data[::-1]
+    Data = Data - Data.mean(axis=0)
+    if window:
+        Win = np.hanning(Data.shape[0])
+        Data = Data * (Win / Win.sum())[:, np.newaxis]
+
+    nfft = int(2 ** np.ceil(np.log2(Data.shape[0]))) * upsample
+    profiles = np.fft.rfft(Data, nfft, axis=0)
+    dr = fs / nfft * c0 / (2 * kf)
+    return profiles, dr
+
+
+def _init(profiles, dr, posn, fc, X, Y, max_bytes):
+    bins, N = profiles.shape
+    # Two zero bins at the end catch every sample that falls outside the
+    # measured range, which keeps the interpolation branch free
+    padded = np.zeros((N, bins + 2), dtype="complex128")
+    padded[:, :bins] = profiles.T
+    _state.update(
+        flat=padded.ravel(),
+        stride=bins + 2,
+        bins=bins,
+        dr=dr,
+        posn=posn,
+        k=4 * np.pi * fc / c0,
+        X=X,
+        Y=Y,
+        max_bytes=max_bytes,
+    )
+
+
+def _tile(bounds):
+    start, stop = bounds
+    x = _state["X"][start:stop, np.newaxis]
+    y2 = _state["Y"][start:stop, np.newaxis] ** 2
+    posn = _state["posn"]
+    flat = _state["flat"]
+    stride = _state["stride"]
+    bins = _state["bins"]
+
+    img = np.zeros(stop - start, dtype="complex128")
+    chunk = max(1, _state["max_bytes"] // (_BYTES_PER_PAIR * (stop - start)))
+    for p0 in range(0, len(posn), chunk):
+        p = np.arange(p0, min(p0 + chunk, len(posn)))
+        R = np.sqrt((x - posn[p]) ** 2 + y2)
+        u = R / _state["dr"]
+        idx = u.astype(np.intp)
+        w = u - idx
+        np.minimum(idx, bins, out=idx)
+        idx += p * stride
+        s = flat[idx] * (1 - w) + flat[idx + 1] * w
+        s *= np.exp(-1j * _state["k"] * R)
+        img += s.sum(axis=1)
+    return img
+
+
+def backprojection(
+    DataCube,
+    step,
+    X,
+    Y,
+    fStrt,
+    kf,
+    fs=1e6,
+    window=True,
+    flipped=True,
+    upsample=4,
+    workers=None,
+    tile=4096,
+    max_bytes=64 * 2**20,
+):
+    """Image a (samples, positions) capture onto the Cartesian grid X, Y.
+
+    X and Y are broadcast against each other, so 1-D axes can be passed as
+    x[np.newaxis, :] and y[:, np.newaxis]. The image is split into tiles of
+    at most `tile` pixels which are spread over `workers` processes (all
+    cores by default). Each worker keeps its temporaries below `max_bytes` by
+    walking the aperture in chunks, so the full pixel x aperture matrix is
+    never built. An empty grid gives an empty image of the same shape.
+    """
+    X, Y = np.broadcast_arrays(np.asarray(X, dtype="float64"), np.asarray(Y, dtype="float64"))
+    shape = X.shape
+    if X.size == 0:
+        return np.zeros(shape, dtype="complex128")
+    X = np.ascontiguousarray(X).ravel()
+    Y = np.ascontiguousarray(Y).ravel()
+
+    profiles, dr = range_compress(DataCube, kf, fs, window, flipped, upsample)
+    posn = np.arange(profiles.shape[1]) * step
+    # Phase is referenced to the first sample of the ramp
+    args = (profiles, dr, posn, fStrt, X, Y, max_bytes)
+
+    tile = max(1, min(tile, max_bytes // (_BYTES_PER_PAIR * 2)))
+    bounds = [(i, min(i + tile, X.size)) for i in range(0, X.size, tile)]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(bounds))
+    if workers <= 1:
+        _init(*args)
+        parts = [_tile(b) for b in bounds]
+    else:
+        with mp.Pool(workers, initializer=_init, initargs=args) as pool:
+            parts = pool.map(_tile, bounds)
+    _state.clear()
+
+    return np.concatenate(parts).reshape(shape)
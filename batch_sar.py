@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Re-image every capture in a directory.
+
+    python batch_sar.py "SavedData/Data To Keep" --out SavedData/Images -k 9 31
+
+Each .npy cube is processed with sar.sar and sar.focused_sar in its own
+worker process and written to <out>/<name>_k<k>.npz. A manifest of content
+hashes in the output directory lets reruns skip captures whose data and
+settings have not changed, and every run appends its timings to
+<out>/stats.csv.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import capture
+import sar
+
+# Defaults match the chirp configured in sarImage.py
+KF = (24.3e9 - 23.9e9) / (260 / 1.0e6)
+FUSCA = 0.498 / 65536
+
+
+def content_hash(path, settings):
+    h = hashlib.sha1(json.dumps(settings, sort_keys=True).encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def output_path(out, path, k):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(out, "{}_k{}.npz".format(name, k))
+
+
+def process(path, out, ks, kf, window, width, fusca, fft_workers=1):
+    sar.set_fft("scipy", fft_workers)
+    stats = []
+    cap = capture.Capture(path)
+    for k in ks:
+        t0 = time.perf_counter()
+        Out = sar.sar(cap.chunks(k, width), k, window) / fusca
+        t1 = time.perf_counter()
+        Out2 = sar.focused_sar(cap.chunks(k, width), k, kf, window) / fusca
+        t2 = time.perf_counter()
+        np.savez(output_path(out, path, k), unfocused=Out, focused=Out2)
+        stats.append(
+            {
+                "file": os.path.basename(path),
+                "k": k,
+                "points": len(cap),
+                "sar_s": t1 - t0,
+                "focused_s": t2 - t1,
+                "cols_per_s": 2 * len(cap) / (t2 - t0),
+                "mb_per_s": 2 * cap.data.nbytes / 2**20 / (t2 - t0),
+            }
+        )
+    return path, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--out", default=None, help="output directory (default: <directory>/Images)")
+    parser.add_argument("-k", "--sum-size", type=int, nargs="+", default=[9])
+    parser.add_argument("--kf", type=float, default=KF)
+    parser.add_argument("--fusca", type=float, default=FUSCA)
+    parser.add_argument("--no-window", dest="window", action="store_false")
+    parser.add_argument("--width", type=int, default=1024, help="rail positions per chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--fft-workers", type=int, default=None,
+        help="FFT threads per worker (default: the cores left over by --workers)",
+    )
+    parser.add_argument("--force", action="store_true", help="reprocess unchanged captures")
+    args = parser.parse_args(argv)
+
+    # Same rule as sarImage.py: apertures are odd
+    ks = [k if k % 2 else k + 1 for k in args.sum_size]
+    out = args.out or os.path.join(args.directory, "Images")
+    os.makedirs(out, exist_ok=True)
+
+    manifest_path = os.path.join(out, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    settings = {"k": ks, "kf": args.kf, "fusca": args.fusca, "window": args.window}
+    todo = {}
+    found = capture.open_dir(args.directory)
+    for cap in found:
+        digest = content_hash(cap.path, settings)
+        done = manifest.get(os.path.basename(cap.path)) == digest and all(
+            os.path.exists(output_path(out, cap.path, k)) for k in ks
+        )
+        if done and not args.force:
+            print("skip  {}".format(cap.path))
+            continue
+        todo[cap.path] = digest
+
+    # With fewer captures than cores, the FFTs of each capture use the spare cores
+    fft_workers = args.fft_workers or max(os.cpu_count() // max(min(args.workers, len(todo)), 1), 1)
+
+    rows = []
+    failed = []
+    t0 = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            jobs = {
+                pool.submit(process, path, out, ks, args.kf, args.window, args.width, args.fusca, fft_workers): path
+                for path in todo
+            }
+            for job in as_completed(jobs):
+                path = jobs[job]
+                try:
+                    _, stats = job.result()
+                except Exception as err:
+                    # One bad capture must not lose the ones that finished
+                    print("FAIL  {}: {!r}".format(path, err))
+                    failed.append(path)
+                    continue
+                manifest[os.path.basename(path)] = todo[path]
+                for row in stats:
+                    print(
+                        "done  {file} k={k}: {sar_s:.3f} s + {focused_s:.3f} s, "
+                        "{cols_per_s:.0f} cols/s, {mb_per_s:.1f} MB/s".format(**row)
+                    )
+                rows.extend(stats)
+    finally:
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+        if rows:
+            stats_path = os.path.join(out, "stats.csv")
+            new = not os.path.exists(stats_path)
+            with open(stats_path, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+                if new:
+                    writer.writeheader()
+                writer.writerows(rows)
+    elapsed = time.perf_counter() - t0
+
+    print(
+        "processed {} of {} captures in {:.2f} s with {} workers".format(
+            len(todo) - len(failed), len(found), elapsed, args.workers
+        )
+    )
+    if failed:
+        print("{} failed: {}".format(len(failed), ", ".join(failed)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the SAR and RadarProc hot paths.
+
+    python benchmark.py                 # everything
+    python benchmark.py -f sar --scale 8
+
+Runs headless with no board attached. SAR cases use the cubes in
+SavedData/Data To Keep and a synthetic capture whose length is set by
+--scale; RadarProc cases use synthetic frames shaped like the ones
+BrdGetData returns. Every case runs in its own process and reports the
+best wall time, the peak memory traced by tracemalloc and the peak RSS
+of that process. Results are appended to a history file and compared
+with the previous run of the same case, so regressions show up.
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import multiprocessing as mp
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import Class.Cfar as Cfar
+import Class.RadarProc as RadarProc
+import sar
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CAPTURES = os.path.join(HERE, "SavedData", "Data To Keep", "*.npy")
+
+fs = 1.0e6
+kf = (24.3e9 - 23.9e9) / (260 / 1.0e6)
+FuSca = 0.498 / 65536
+
+CASES = {}
+
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+
+    return register
+
+
+def synthetic_cube(scale):
+    rng = np.random.default_rng(0)
+    return rng.integers(-2000, 2000, (256, 866 * scale), dtype="int16")
+
+
+def captures():
+    return [np.load(f) for f in sorted(glob.glob(CAPTURES))]
+
+
+def frames(n, chirps=1):
+    rng = np.random.default_rng(0)
+    return rng.integers(-2000, 2000, (n, 256 * chirps, 4), dtype="int16")
+
+
+def proc():
+    Proc = RadarProc.RadarProc()
+    Proc.CfgRangeProfile(
+        {"RemoveMean": 1, "FFT": 2**9, "FuSca": FuSca, "fs": fs, "kf": kf,
+         "RMin": 1, "RMax": 50, "dB": 1, "Ext": 1}
+    )
+    Proc.CfgRangeDoppler(
+        {"fs": fs, "kf": kf, "RangeFFT": 2**9, "VelFFT": 2**8, "Abs": 1, "dB": 1,
+         "Ext": 1, "RMin": 1, "RMax": 10, "N": 256, "Frms": 128, "FuSca": FuSca}
+    )
+    Proc.CfgBeamformingUla(
+        {"fs": fs, "kf": kf, "RangeFFT": 2**10, "AngFFT": 2**7, "Abs": 1, "Ext": 1,
+         "RMin": 1, "RMax": 10, "FuSca": FuSca}
+    )
+    Proc.CfgRangeProfileCfar({"Lz": 9, "Lb": 8, "La": 8})
+    return Proc
+
+
+@case("sar.sar/captures")
+def _(args):
+    cubes = captures()
+    return lambda: [sar.sar(c, args.k) for c in cubes]
+
+
+@case("sar.sar2/captures")
+def _(args):
+    cubes = captures()
+    return lambda: [sar.sar2(c, args.k) for c in cubes]
+
+
+@case("sar.focused_sar/captures")
+def _(args):
+    cubes = captures()
+    return lambda: [sar.focused_sar(c, args.k, kf) for c in cubes]
+
+
+@case("sar.sar/synthetic")
+def _(args):
+    cube = synthetic_cube(args.scale)
+    return lambda: sar.sar(cube, args.k)
+
+
+@case("sar.sar2/synthetic")
+def _(args):
+    cube = synthetic_cube(args.scale)
+    return lambda: sar.sar2(cube, args.k)
+
+
+@case("sar.focused_sar/synthetic")
+def _(args):
+    cube = synthetic_cube(args.scale)
+    return lambda: sar.focused_sar(cube, args.k, kf)
+
+
+@case("sar.focused_sar/synthetic/threads")
+def _(args):
+    cube = synthetic_cube(args.scale)
+    sar.set_fft("scipy", -1)
+    return lambda: sar.focused_sar(cube, args.k, kf)
+
+
+@case("RadarProc.RangeProfile")
+def _(args):
+    Proc, Data = proc(), frames(args.frames)
+    return lambda: [Proc.RangeProfile(D) for D in Data]
+
+
+@case("RadarProc.RangeProfileBatch")
+def _(args):
+    Proc, Data = proc(), frames(args.frames)
+    return lambda: Proc.RangeProfileBatch(Data)
+
+
+@case("RadarProc.RangeProfileBatch/threads")
+def _(args):
+    Proc, Data = proc(), frames(args.frames)
+    Proc.CfgRangeProfile({"FftLib": "scipy", "FftWorkers": -1})
+    return lambda: Proc.RangeProfileBatch(Data)
+
+
+@case("RadarProc.Frame/PoolOut")
+def _(args):
+    # All stages of one frame with pooled outputs: no allocations after the first
+    Proc, Data = proc(), frames(max(args.frames // 128, 1), chirps=128)
+    Proc.CfgPool(1)
+    return lambda: [(Proc.RangeProfile(D[:256]), Proc.RangeDoppler(D[:, 0]), Proc.BeamformingUla(D[:256]))
+                    for D in Data]
+
+
+@case("RadarProc.RangeProfileCfar")
+def _(args):
+    Proc, Data = proc(), frames(args.frames)
+    return lambda: [Proc.RangeProfileCfar(D, "Thres") for D in Data]
+
+
+@case("Cfar.Detect/batch")
+def _(args):
+    Proc, Data = proc(), frames(args.frames)
+    Rp = np.abs(Proc.RangeProfileBatch(Data))
+    Det = Cfar.Cfar({"Type": "CA", "ThresdB": 12})
+    return lambda: Det.Detect(Rp)
+
+
+@case("RadarProc.RangeDoppler")
+def _(args):
+    Proc, Data = proc(), frames(max(args.frames // 128, 1), chirps=128)
+    return lambda: [Proc.RangeDoppler(D[:, 0]) for D in Data]
+
+
+@case("RadarProc.RangeDopplerCfar")
+def _(args):
+    Proc, Data = proc(), frames(max(args.frames // 128, 1), chirps=128)
+    return lambda: [Proc.RangeDopplerCfar(D[:, 0], "Det") for D in Data]
+
+
+@case("RadarProc.BeamformingUla")
+def _(args):
+    Proc, Data = proc(), frames(args.frames)
+    return lambda: [Proc.BeamformingUla(D) for D in Data]
+
+
+@case("RadarProc.BeamformingUla/Steer")
+def _(args):
+    Proc, Data = proc(), frames(args.frames)
+    Proc.CfgBeamformingUla({"Mode": "Steer", "Ang": np.arange(-60, 61)})
+    return lambda: [Proc.BeamformingUla(D) for D in Data]
+
+
+@case("RadarProc.BeamformingUla/Mvdr")
+def _(args):
+    Proc, Data = proc(), frames(max(args.frames // 32, 1), chirps=32)
+    Proc.CfgBeamformingUla({"Mode": "Mvdr", "Ang": np.arange(-60, 61), "N": 256})
+    return lambda: [Proc.BeamformingUla(D) for D in Data]
+
+
+@case("RadarProc.BeamformingUla/Mimo")
+def _(args):
+    Proc, Data = proc(), frames(max(args.frames // 32, 1), chirps=32)
+    Proc.CfgBeamformingUla({"Mode": "Steer", "Ang": np.arange(-60, 61), "N": 256, "MimoEna": 1,
+                            "TxPosn": [-18.654e-3, 0]})
+    return lambda: [Proc.BeamformingUla(D) for D in Data]
+
+
+@case("UsbAdiLinux.CmdSend/AdiDefaultConf")
+def _(args):
+    # Command encoding only: the payloads go to a fake endpoint, no board needed
+    import Class.UsbAdiLinux as UsbAdiLinux
+
+    class Endpoint:
+        def write(self, data):
+            return len(data)
+
+    Usb = UsbAdiLinux.usbADI.__new__(UsbAdiLinux.usbADI)
+    Usb.InitPayload()
+    Usb.UsbOpen = True
+    Usb.usbWrEp = Endpoint()
+    rng = np.random.default_rng(0)
+    Adar = rng.integers(0, 2**32, 78, dtype=np.uint64).astype(np.uint32)
+    Fmcw = rng.integers(0, 2**32, 10, dtype=np.uint64).astype(np.uint32)
+    Regs = rng.integers(0, 2**32, (100, 3), dtype=np.uint64).astype(np.uint32)
+    # Dsp_SetAdiDefaultConf plus a PLL/TX/RX register setup
+    return lambda: ([Usb.UsbWriteADICmd(Cfg) for Cfg in (Adar, Fmcw)],
+                    [Usb.CmdSend(0, 0x9017, Reg) for Reg in Regs])
+
+
+def run_case(name, args):
+    fn = CASES[name](args)
+    fn()
+    times = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    # Traced separately, tracemalloc slows the calls down
+    tracemalloc.start()
+    fn()
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "case": name,
+        "best_s": min(times),
+        "median_s": float(np.median(times)),
+        "alloc_peak_mb": traced_peak / 2**20,
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        "rss_peak_mb": rss / (2**20 if sys.platform == "darwin" else 2**10),
+    }
+
+
+def git_rev():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-f", "--filter", default="", help="only run cases containing this text")
+    parser.add_argument("-k", type=int, default=9, help="SAR aperture length")
+    parser.add_argument("--scale", type=int, default=4, help="synthetic capture is 866*scale columns")
+    parser.add_argument("--frames", type=int, default=256, help="RadarProc frames per call")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--history", default=os.path.join(HERE, "bench_history.jsonl"))
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown flagged as a regression")
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args(argv)
+
+    names = [n for n in CASES if args.filter in n]
+    if args.list:
+        print("\n".join(names))
+        return
+
+    params = {"k": args.k, "scale": args.scale, "frames": args.frames}
+    previous = {}
+    if os.path.exists(args.history):
+        with open(args.history) as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["params"] == params:
+                    previous.update({r["case"]: r for r in entry["results"]})
+
+    results = []
+    regressions = 0
+    print("{:<32} {:>10} {:>10} {:>10} {:>10}  {}".format(
+        "case", "best ms", "median ms", "alloc MB", "RSS MB", "vs last"))
+    for name in names:
+        # A fresh process per case keeps peak RSS attributable to it
+        with ProcessPoolExecutor(1, mp_context=mp.get_context("spawn")) as pool:
+            try:
+                r = pool.submit(run_case, name, args).result()
+            except ImportError as err:
+                # Board drivers (pyusb) are optional for the benchmarks
+                print("{:<32} skipped: {}".format(name, err))
+                continue
+        results.append(r)
+
+        change = ""
+        if name in previous:
+            rel = r["best_s"] / previous[name]["best_s"] - 1
+            change = "{:+.1%}".format(rel)
+            if rel > args.threshold:
+                change += "  REGRESSION"
+                regressions += 1
+        print("{:<32} {:>10.2f} {:>10.2f} {:>10.1f} {:>10.1f}  {}".format(
+            name, 1e3 * r["best_s"], 1e3 * r["median_s"], r["alloc_peak_mb"], r["rss_peak_mb"], change))
+
+    with open(args.history, "a") as f:
+        entry = {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "rev": git_rev(),
+            "params": params,
+            "results": results,
+        }
+        f.write(json.dumps(entry) + "\n")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Memory-mapped access to the (samples, positions) int16 cubes that
+sarImage.py writes to SavedData.
+
+Opening a capture only maps the file, and chunks are views into the map,
+so long scans can be imaged a block of rail positions at a time with
+sar.chunked (or by passing chunks straight to sar.sar, sar.sar2 and
+sar.focused_sar) without ever promoting the whole cube to float.
+"""
+
+import glob
+import os
+
+import numpy as np
+
+
+def iter_chunks(Data, k, width=1024):
+    """Yield views of Data covering `width` output columns each.
+
+    Consecutive chunks overlap by k columns, which is exactly what an
+    aperture of length k needs to continue seamlessly into the next chunk.
+    """
+    N = Data.shape[1]
+    for start in range(0, max(N - k, 1), width):
+        yield Data[:, start : min(start + width + k, N)]
+
+
+class Capture:
+    def __init__(self, path):
+        self.path = path
+        self.data = np.load(path, mmap_mode="r")
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def chunks(self, k, width=1024):
+        return iter_chunks(self.data, k, width)
+
+
+def open_dir(path):
+    return [Capture(f) for f in sorted(glob.glob(os.path.join(path, "*.npy")))]
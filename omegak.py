@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Omega-K (range-migration) reconstruction for the stepped-rail captures.
+
+The whole aperture is focused in the wavenumber domain: an azimuth FFT,
+a reference-range matched filter, Stolt interpolation onto a uniform
+down-range wavenumber grid and a 2-D inverse FFT. The cost is
+O(N log N) in the number of rail positions and there is no Fresnel
+approximation, so targets close to the rail stay focused.
+"""
+
+import numpy as np
+
+c0 = 3e8
+
+
+def _analytic(Data, flipped):
+    # One-sided spectrum along fast time, conjugated so that a target at
+    # range R contributes exp(-1j*Kr*R)
+    if flipped:
+        Data = Data[..., ::-1, :]
+    Data = Data - Data.mean(axis=-2, keepdims=True)
+    Ns = Data.shape[-2]
+    h = np.zeros(Ns)
+    h[0] = 1
+    h[1 : (Ns + 1) // 2] = 2
+    if Ns % 2 == 0:
+        h[Ns // 2] = 1
+    spec = np.fft.fft(Data, axis=-2) * h[:, np.newaxis]
+    return np.conj(np.fft.ifft(spec, axis=-2))
+
+
+def omega_k(
+    Data,
+    step,
+    fStrt,
+    fStop,
+    TRampUp,
+    fs=1e6,
+    r_ref=2.0,
+    ny=1024,
+    pad=2,
+    window=True,
+    flipped=True,
+):
+    """Reconstruct (..., samples, positions) captures with the omega-k algorithm.
+
+    Any leading axes are treated as a batch, so a stack of captures with the
+    same geometry is imaged in one call. Returns (Img, x, y) where Img has
+    shape (..., ny, pad*positions rounded up to a power of two) with
+    down-range along the rows like sar.sar. x is the cross-range axis
+    measured from the first rail position (targets behind the start wrap to
+    the far end) and y the down-range axis centred on r_ref.
+
+    flipped: fast time is stored reversed, as sarImage.py does with np.flip
+    """
+    Data = np.asarray(Data, dtype="float64")
+    Ns, N = Data.shape[-2:]
+    kf = (fStop - fStrt) / TRampUp
+
+    s = _analytic(Data, flipped)
+    if window:
+        s *= np.hanning(Ns)[:, np.newaxis]
+
+    # Two-way wavenumber of every fast-time sample
+    Kr = 4 * np.pi * (fStrt + kf * np.arange(Ns) / fs) / c0
+    dKr = Kr[1] - Kr[0]
+
+    nx = int(2 ** np.ceil(np.log2(pad * N)))
+    Kx = 2 * np.pi * np.fft.fftfreq(nx, step)
+
+    # Azimuth FFT, laid out as (..., Kx, Kr) so interpolation gathers along rows
+    S = np.fft.fft(s, nx, axis=-1)
+    S = np.swapaxes(S, -1, -2)
+
+    Kx2 = Kx[:, np.newaxis] ** 2
+    Ky2 = Kr[np.newaxis, :] ** 2 - Kx2
+    prop = Ky2 > 0
+    S *= np.where(prop, np.exp(1j * np.sqrt(np.where(prop, Ky2, 0)) * r_ref), 0)
+
+    # Stolt mapping: sample each row at the Kr that lands on a uniform Ky grid
+    Ky = np.linspace(np.sqrt(max(Kr[0] ** 2 - Kx2.max(), 0)), Kr[-1], ny)
+    u = (np.sqrt(Ky[np.newaxis, :] ** 2 + Kx2) - Kr[0]) / dKr
+    valid = (u >= 0) & (u <= Ns - 1)
+    idx = np.clip(u, 0, Ns - 2).astype(np.intp)
+    w = np.where(valid, u - idx, 0)
+    idx = np.broadcast_to(idx, S.shape[:-1] + (ny,))
+    St = np.take_along_axis(S, idx, axis=-1) * (1 - w)
+    St += np.take_along_axis(S, idx + 1, axis=-1) * w
+    St *= valid
+
+    img = np.fft.ifft2(St, axes=(-1, -2))
+    img = np.fft.fftshift(img, axes=-1)
+    img = np.swapaxes(img, -1, -2)
+
+    dKy = Ky[1] - Ky[0]
+    x = np.arange(nx) * step
+    y = r_ref + np.fft.fftshift(np.fft.fftfreq(ny, dKy / (2 * np.pi)))
+    return img, x, y
@@ -5,60 +5,241 @@ Created on Fri Jan 31 16:57:31 2020
 @author: Carter
 """
 
+from functools import lru_cache
+
 import numpy as np
-import scipy.signal as sg
+from numpy.lib.stride_tricks import sliding_window_view
+
+from Class.FftBackend import FftBackend
 
 D0 = 3.4e-3 # Gathered experimentally
 lam = 3e8/(24.1e9)
 
+# Apertures longer than this are correlated through an FFT along azimuth
+_FFT_MIN_K = 32
+
+# scipy.fft keeps single precision input in complex64, numpy.fft does not
+# on older releases
+_fft = FftBackend({"Lib": "scipy"})
+
+
+def set_fft(lib="scipy", workers=1):
+    """Select the FFT library used by all imaging functions.
+
+    workers is the number of threads scipy.fft splits the columns of a
+    transform over (-1 for all cores); numpy.fft is single threaded.
+    """
+    _fft.CfgFft({"Lib": lib, "Workers": workers})
+
+
+def _range_window(n, dtype="float64"):
+    Win = np.hanning(n)
+    return (Win / Win.sum())[:, np.newaxis].astype(dtype)
+
+
+def _rfft(x, axis=0):
+    return _fft.Rfft(x, None, axis)
+
+
+def _aperture_sum(Data, k, cols):
+    # Sum of Data[:, i:i+k] for i in range(cols) from one running sum, so the
+    # cost no longer depends on k. Integer captures are summed exactly.
+    if np.issubdtype(Data.dtype, np.integer):
+        acc = np.int64
+    else:
+        acc = np.result_type(Data.dtype, np.float64)
+    csum = np.zeros((Data.shape[0], Data.shape[1] + 1), dtype=acc)
+    np.cumsum(Data, axis=1, out=csum[:, 1:])
+    return csum[:, k : k + cols] - csum[:, :cols]
 
-def sar(Data, k, window=True):
+
+def chunked(func, chunks, k, *args, **kwargs):
+    """Apply sar, sar2 or focused_sar to overlapping chunks (see
+    capture.iter_chunks) and yield the image a block of columns at a time."""
+    # sar2 keeps the final window, which the next chunk produces again
+    trim = 1 if func is sar2 else 0
+    prev = None
+    for chunk in chunks:
+        if prev is not None:
+            yield prev[:, : prev.shape[1] - trim]
+        prev = func(np.asarray(chunk), k, *args, **kwargs)
+    if prev is not None:
+        yield prev
+
+
+def _from_chunks(func, chunks, k, *args):
+    return np.concatenate(list(chunked(func, chunks, k, *args)), axis=1)
+
+
+def sar(Data, k, window=True, dtype="float64"):
+    if not isinstance(Data, np.ndarray):
+        return _from_chunks(sar, Data, k, window, dtype)
+
+    output = _aperture_sum(Data, k, Data.shape[1] - k).astype(dtype)
     if window:
-        Win = np.hanning(Data.shape[0])
-        ScaWin = Win.sum()
-        Win = np.tile(Win, (Data.shape[1], 1)).T
-        Data = Data * Win / ScaWin
-        
-    output = np.zeros((Data.shape[0], Data.shape[1] - k), dtype="float64")
-    for i in range(0, Data.shape[1] - k):
-        output[:, i] = Data[:, i : i + k].sum(axis=1)
+        # The range window is the same for every column, so it can be applied
+        # once to the summed aperture instead of to every input column
+        output *= _range_window(Data.shape[0], dtype)
 
-    return np.fft.rfft(output, axis=0)
+    return _rfft(output, axis=0)
 
 
-def sar2(Data, k, window=True):
+def sar2(Data, k, window=True, dtype="float64"):
+    if not isinstance(Data, np.ndarray):
+        return _from_chunks(sar2, Data, k, window, dtype)
+
+    output = _aperture_sum(Data, k, Data.shape[1] - k + 1).astype(dtype)
     if window:
-        Win = np.hanning(Data.shape[0])
-        ScaWin = Win.sum()
-        Win = np.tile(Win, (Data.shape[1], 1)).T
-        Data = Data * Win / ScaWin
-        
-    h = np.ones((1, k))
-    output = sg.convolve(h, Data, mode='valid')
-    
-    return np.fft.rfft(output, axis=0)
-
-
-def focused_sar(Data, k, kf, window =True):
-    b = k //2
-    d = np.abs(np.arange(-b, b + 1, dtype=int)*D0)
-    Range = np.fft.rfftfreq(Data.shape[0], 1e-6)*3e8/(2*kf)
+        output *= _range_window(Data.shape[0], dtype)
+
+    return _rfft(output, axis=0)
+
+
+@lru_cache(maxsize=32)
+def _phase_kernel(N, k, kf, D0, lam):
+    b = k // 2
+    d = np.abs(np.arange(-b, b + 1, dtype=int) * D0)
+    Range = np.fft.rfftfreq(N, 1e-6) * 3e8 / (2 * kf)
     X, Y = np.meshgrid(d, Range)
-    xi = np.divide(2*np.pi*X**2, (lam*Y), out=np.zeros_like(X), where=Y!=0) 
-    phase_corr = np.exp(1j*xi)
-    
+    xi = np.divide(2 * np.pi * X**2, (lam * Y), out=np.zeros_like(X), where=Y != 0)
+    phase_corr = np.exp(1j * xi)
+    # Shared between callers through the cache, so guard it against edits
+    phase_corr.flags.writeable = False
+    return phase_corr
+
+
+def _azimuth_correlate(data_freq, phase_corr, cols):
+    # output[:, i] = (data_freq[:, i:i+k] * phase_corr).sum(axis=1)
+    k = phase_corr.shape[1]
+    if k <= _FFT_MIN_K:
+        windows = sliding_window_view(data_freq, k, axis=1)[:, :cols]
+        return np.einsum("bij,bj->bi", windows, phase_corr)
+    L = data_freq.shape[1] + k - 1
+    n = _fft.GetLen(L)
+    spec = _fft.Fft(data_freq, n, 1)
+    spec *= _fft.Fft(phase_corr[:, ::-1], n, 1)
+    return _fft.Ifft(spec, None, 1)[:, k - 1 : k - 1 + cols]
+
+
+def focused_sar(Data, k, kf, window =True, dtype="float64"):
+    if not isinstance(Data, np.ndarray):
+        return _from_chunks(focused_sar, Data, k, kf, window, dtype)
+
+    phase_corr = _phase_kernel(Data.shape[0], k, kf, D0, lam)
+    if phase_corr.shape[1] != k:
+        raise ValueError("focused_sar needs an odd aperture length, got k={}".format(k))
+    phase_corr = phase_corr.astype(np.result_type(dtype, np.complex64), copy=False)
+
+    Data = Data.astype(dtype)
+    if window:
+        Data *= _range_window(Data.shape[0], dtype)
+
+    data_freq = _rfft(Data, axis=0)
+
+    return _azimuth_correlate(data_freq, phase_corr, data_freq.shape[1] - k)
+
+
+def sar_sweep(Data, ks, kf, window=True, dtype="float64"):
+    """Unfocused and focused images for every aperture length in ks.
+
+    Returns {k: (sar, focused_sar)} matching sar(Data, k, window) and
+    focused_sar(Data, k, kf, window). The cube is transformed once; the
+    unfocused images come from one prefix sum over azimuth and the focused
+    ones from growing a single symmetric aperture one ring of columns at a
+    time (jumping with an FFT correlation across large gaps in ks), so a
+    sweep costs about as much as its largest k alone.
+    """
+    ks = sorted(set(ks))
+    for k in ks:
+        if k % 2 == 0:
+            raise ValueError("focused_sar needs an odd aperture length, got k={}".format(k))
+
+    Data = Data.astype(dtype)
     if window:
-        Win = np.hanning(Data.shape[0])
-        ScaWin = Win.sum()
-        Win = np.tile(Win, (Data.shape[1], 1)).T
-        Data = Data * Win / ScaWin 
-        
-    data_freq = np.fft.rfft(Data, axis=0)
-    
-    output = np.zeros((data_freq.shape[0], data_freq.shape[1] - k), dtype="complex128")
-    for i in range(0, data_freq.shape[1] - k):
-        output[:, i] = (data_freq[:, i : i + k] * phase_corr).sum(axis=1)
-        
-    return output
-
-    
\ No newline at end of file
+        Data *= _range_window(Data.shape[0], dtype)
+    data_freq = _rfft(Data, axis=0)
+    N = data_freq.shape[1]
+
+    csum = np.zeros((data_freq.shape[0], N + 1), dtype=data_freq.dtype)
+    np.cumsum(data_freq, axis=1, out=csum[:, 1:])
+
+    # Column b_max + b of the widest kernel is the phase for offset b
+    phase_corr = _phase_kernel(Data.shape[0], ks[-1], kf, D0, lam)
+    phase_corr = phase_corr.astype(data_freq.dtype, copy=False)
+    b_max = ks[-1] // 2
+
+    # focused[:, m] accumulates the aperture centred on column m
+    focused = data_freq.copy()
+    work = np.empty_like(data_freq)
+    b = 0
+    out = {}
+    for k in ks:
+        if k // 2 - b > _FFT_MIN_K // 2:
+            # A long jump in aperture is cheaper to correlate directly
+            b = k // 2
+            kernel = phase_corr[:, b_max - b : b_max + b + 1]
+            focused[:, b : N - b] = _azimuth_correlate(data_freq, kernel, N - k + 1)
+        while b < k // 2:
+            b += 1
+            ring = work[:, : N - 2 * b]
+            np.add(data_freq[:, 2 * b :], data_freq[:, : N - 2 * b], out=ring)
+            ring *= phase_corr[:, b_max + b, np.newaxis]
+            focused[:, b : N - b] += ring
+        cols = N - k
+        out[k] = (csum[:, k : k + cols] - csum[:, :cols], focused[:, b : b + cols].copy())
+    return out
+
+
+class IncrementalSar:
+    """Builds the sar and focused_sar images one rail position at a time.
+
+    Each call to update costs O(bins*k), so the images can be shown while
+    the scan is still running. Once `points` columns have been added,
+    unfocused and focused match sar(Data, k, window) and
+    focused_sar(Data, k, kf, window) for the whole capture.
+    """
+
+    def __init__(self, bins, k, kf, points, window=True):
+        self.k = k
+        self.n = 0
+        self.phase_corr = _phase_kernel(bins, k, kf, D0, lam)
+        if self.phase_corr.shape[1] != k:
+            raise ValueError("focused_sar needs an odd aperture length, got k={}".format(k))
+        self.win = _range_window(bins)[:, 0] if window else None
+
+        # Ring buffers holding the last k raw and transformed columns
+        self.raw = None
+        self.freq = np.zeros((bins // 2 + 1, k), dtype="complex128")
+        self.running = None
+
+        cols = max(points - k, 0)
+        self.unfocused = np.zeros((bins // 2 + 1, cols), dtype="complex128")
+        self.focused = np.zeros((bins // 2 + 1, cols), dtype="complex128")
+
+    def _rfft(self, col):
+        col = col.astype("float64")
+        if self.win is not None:
+            col *= self.win
+        return _rfft(col)
+
+    def update(self, column):
+        if self.raw is None:
+            acc = np.int64 if np.issubdtype(column.dtype, np.integer) else np.float64
+            self.raw = np.zeros((len(column), self.k), dtype=acc)
+            self.running = np.zeros(len(column), dtype=acc)
+
+        pos = self.n % self.k
+        self.running += column
+        self.running -= self.raw[:, pos]
+        self.raw[:, pos] = column
+        self.freq[:, pos] = self._rfft(column)
+        self.n += 1
+
+        # Window starting at column i is complete; sar.sar stops one short
+        # of the final window, so skip it here as well
+        i = self.n - self.k
+        if 0 <= i < self.unfocused.shape[1]:
+            order = (np.arange(self.k) + self.n) % self.k
+            self.unfocused[:, i] = self._rfft(self.running)
+            self.focused[:, i] = (self.freq[:, order] * self.phase_corr).sum(axis=1)
+        return i
@@ -83,17 +83,19 @@ else:
         sum_size = int(sys.argv[2])
 
 DataCube = np.zeros((dCfg["N"], points), dtype="int16")
+Imager = sar.IncrementalSar(dCfg["N"], sum_size, kf, points, window=False)
 
-# Collect Data
+# Collect Data, imaging each position as it arrives
 for i in range(0, points):
     Data = Brd.BrdGetData()
     DataCube[:, i] = np.flip(Data[:, 0])
+    Imager.update(DataCube[:, i])
     step.step(8)
     # print(i)
 
 # Process Data
-Out = sar.sar(DataCube, sum_size, window=False) / FuSca
-Out2 = sar.focused_sar(DataCube, sum_size, kf, window=False) / FuSca
+Out = Imager.unfocused / FuSca
+Out2 = Imager.focused / FuSca
 
 X, Y = np.meshgrid(np.arange(points - sum_size), Range)
 lam = c0 / (dCfg["fStrt"] + dCfg["fStop"]) / 2
@@ -0,0 +1,97 @@
+"""
+AcqThread against a simulated board.
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+import Class.AcqThread as AcqThread
+
+
+class Board:
+    # Frame Idx is filled with Idx; raises once after Fail frames
+    def __init__(self, Fail=-1, Delay=0.0):
+        self.Idx = 0
+        self.Fail = Fail
+        self.Delay = Delay
+
+    def BrdGetData(self):
+        if self.Idx == self.Fail:
+            self.Fail = -1
+            raise IOError("USB transfer failed")
+        if self.Delay:
+            time.sleep(self.Delay)
+        Data = np.full((256, 4), self.Idx % 30000, dtype="int16")
+        self.Idx += 1
+        return Data
+
+
+def test_frames_in_order():
+    Acq = AcqThread.AcqThread(Board(Delay=1e-4), {"NrFrms": 64})
+    Acq.Strt()
+    try:
+        for Idx in range(200):
+            Seq, Ts, Data = Acq.GetNext()
+            Ref = Data[0, 0]
+            if Acq.Check(Seq):
+                assert Seq == Ref
+                assert np.all(Data == Ref)
+    finally:
+        Acq.Stop()
+
+
+def test_check_after_lap():
+    Acq = AcqThread.AcqThread(Board(Delay=1e-4), {"NrFrms": 4})
+    Acq.Strt()
+    Seq, Ts, Data = Acq.GetNext()
+    while Acq.GetSts()["Seq"] < Seq + 8:
+        time.sleep(1e-3)
+    assert not Acq.Check(Seq)
+    Acq.Stop()
+
+
+def test_restart_after_error():
+    Brd = Board(Fail=5)
+    Acq = AcqThread.AcqThread(Brd, {"NrFrms": 8, "Timeout": 1.0})
+    Acq.Strt()
+    with pytest.raises(RuntimeError):
+        for Idx in range(10):
+            Acq.GetNext()
+    assert not Acq.GetSts()["Running"]
+
+    # The board is back: Strt starts a new thread
+    Acq.Strt()
+    assert Acq.GetSts()["Running"]
+    Seq, Ts, Data = Acq.GetNext()
+    assert Data[0, 0] >= 5
+    Acq.Stop()
+
+
+class ViewBoard(Board):
+    # A board with DemoRad's RdView setting
+    ChirpBuf_View = 0
+
+    def Get(self, stVal):
+        assert stVal == "RdView"
+        return self.ChirpBuf_View
+
+    def Set(self, stVal, Val):
+        assert stVal == "RdView"
+        self.ChirpBuf_View = Val
+
+
+def test_strt_error_restores_view():
+    Brd = ViewBoard(Fail=0)
+    Acq = AcqThread.AcqThread(Brd, {"NrFrms": 8})
+    with pytest.raises(IOError):
+        Acq.Strt()
+    assert Brd.ChirpBuf_View == 0
+
+    # The next Strt works and Stop restores the setting again
+    Acq.Strt()
+    assert Brd.ChirpBuf_View == 1
+    Acq.GetNext()
+    Acq.Stop()
+    assert Brd.ChirpBuf_View == 0
@@ -0,0 +1,56 @@
+"""
+batch_sar reruns: failed captures, the manifest and missing outputs.
+"""
+
+import json
+import os
+
+import numpy as np
+
+import batch_sar
+
+
+def captures(directory):
+    rng = np.random.default_rng(0)
+    for name in ("a", "b"):
+        np.save(os.path.join(directory, name + ".npy"), rng.integers(-2000, 2000, (256, 60), dtype="int16"))
+    # A 1-D array is no capture: its job fails
+    np.save(os.path.join(directory, "bad.npy"), np.zeros(10, dtype="int16"))
+
+
+def run(directory, out):
+    return batch_sar.main([str(directory), "--out", str(out), "--workers", "1", "--fft-workers", "1"])
+
+
+def test_failed_job_keeps_manifest(tmp_path, capsys):
+    captures(tmp_path)
+    out = tmp_path / "Images"
+    assert run(tmp_path, out) == 1
+    assert "FAIL" in capsys.readouterr().out
+
+    with open(out / "manifest.json") as f:
+        manifest = json.load(f)
+    assert sorted(manifest) == ["a.npy", "b.npy"]
+    assert (out / "a_k9.npz").exists() and (out / "b_k9.npz").exists()
+
+    # Finished captures are skipped, the failed one is tried again
+    assert run(tmp_path, out) == 1
+    printed = capsys.readouterr().out
+    assert "skip" in printed and "a.npy" in printed and "b.npy" in printed
+    assert "done  a.npy" not in printed and "done  b.npy" not in printed
+    assert "FAIL" in printed
+
+
+def test_missing_output_is_reprocessed(tmp_path, capsys):
+    captures(tmp_path)
+    os.remove(tmp_path / "bad.npy")
+    out = tmp_path / "Images"
+    assert run(tmp_path, out) == 0
+    capsys.readouterr()
+
+    os.remove(out / "a_k9.npz")
+    assert run(tmp_path, out) == 0
+    printed = capsys.readouterr().out
+    assert "done  a.npy" in printed
+    assert "done  b.npy" not in printed
+    assert (out / "a_k9.npz").exists()
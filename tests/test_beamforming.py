@@ -0,0 +1,93 @@
+"""
+BeamformingUla angle spectra of simulated targets.
+"""
+
+import numpy as np
+import pytest
+
+import Class.RadarProc as RadarProc
+
+fs = 1.0e6
+kf = (24.3e9 - 23.9e9) / (260 / 1.0e6)
+FuSca = 0.498 / 65536
+fc = 24.125e9
+c0 = 3e8
+Tp = 300 / 1.0e6
+RxPosn = np.arange(4) * 6.2170e-3 + 32.014e-3
+TxPosn = np.array([-18.654e-3, 0])
+
+
+def proc(dCfg):
+    Proc = RadarProc.RadarProc()
+    Cfg = {"fs": fs, "kf": kf, "RangeFFT": 2**10, "Abs": 1, "Ext": 1, "RMin": 1, "RMax": 10,
+           "FuSca": FuSca, "N": 256, "fc": fc, "RxPosn": RxPosn, "Ang": np.arange(-60, 61)}
+    Cfg.update(dCfg)
+    Proc.CfgBeamformingUla(Cfg)
+    return Proc
+
+
+def chirps(Tars, Chirps, TxPosn=TxPosn, Noise=20, Seed=0):
+    # Tars: (range, angle in deg, velocity, amplitude); chirp c is sent by
+    # Tx (c mod len(TxPosn)), as with MimoEna in the RfMeas dCfg
+    rng = np.random.default_rng(Seed)
+    n = np.arange(256)
+    k = 2 * np.pi * fc / c0
+    Data = rng.normal(0, Noise, (Chirps, 256, len(RxPosn)))
+    for R, Ang, v, Amp in Tars:
+        fb = 2 * kf * R / c0 / fs
+        for c in range(Chirps):
+            Posn = TxPosn[c % len(TxPosn)] + RxPosn
+            Phi = k * Posn * np.sin(np.deg2rad(Ang)) + 2 * k * v * c * Tp
+            Data[c] += Amp * np.cos(2 * np.pi * fb * n[:, None] + Phi[None, :])
+    return np.round(Data.reshape(-1, len(RxPosn))).astype(np.int16)
+
+
+@pytest.mark.parametrize("v", [0, 0.5, 1.5])
+def test_mimo_moving_target(v):
+    # The Doppler phase between the Tx slots is removed before the virtual
+    # array is formed; without it the peak moves with the velocity
+    Proc = proc({"Mode": "Steer", "MimoEna": 1, "TxPosn": TxPosn})
+    JOpt = Proc.BeamformingUla(chirps([(3, 17, v, 1000)], 16))
+    Ang = Proc.GetBeamformingUla("Ang")
+    assert JOpt.shape == (len(Proc.GetBeamformingUla("Range")), len(Ang))
+    assert Ang[np.argmax(np.max(JOpt, axis=0))] == 17
+
+
+@pytest.mark.parametrize("CalData", [np.ones(4), np.exp(0.3j * np.arange(4)) * [1, 0.9, 1.1, 1]])
+def test_steer_matches_fft(CalData):
+    # The angles of the FFT bins: sin(Ang) = AngFreqNorm*lambda/d
+    Data = chirps([(3, -20, 0, 1000), (5, 15, 0, 1000)], 1, TxPosn=np.zeros(1))
+    Fft = proc({"Mode": "FFT", "AngFFT": 2**7, "CalData": CalData, "dB": 0})
+    SinAng = Fft.GetBeamformingUla("AngFreqNorm") * c0 / fc / (RxPosn[1] - RxPosn[0])
+    Valid = np.abs(SinAng) <= 1
+    Steer = proc({"Mode": "Steer", "Ang": np.rad2deg(np.arcsin(SinAng[Valid])), "CalData": CalData, "dB": 0})
+
+    JFft = Fft.BeamformingUla(Data)[:, Valid]
+    JSteer = Steer.BeamformingUla(Data)
+    assert JSteer.shape == JFft.shape
+    assert np.max(np.abs(JSteer - JFft)) / np.max(JFft) < 1e-14
+
+
+def peaks(Spec, Count):
+    # Angle indices of the Count largest local maxima
+    Idcs = np.nonzero((Spec[1:-1] > Spec[:-2]) & (Spec[1:-1] > Spec[2:]))[0] + 1
+    return np.sort(Idcs[np.argsort(Spec[Idcs])[::-1][:Count]])
+
+
+@pytest.mark.parametrize("Mode", ["Mvdr", "Music"])
+def test_two_targets(Mode):
+    # Two targets in one range bin; their different velocities make them
+    # incoherent over the 32 chirps of a frame
+    Data = chirps([(3, -20, 0, 1000), (3, 15, 1, 1000)], 32, TxPosn=np.zeros(1))
+    Proc = proc({"Mode": Mode, "NrTar": 2, "dB": 0})
+    JOpt = Proc.BeamformingUla(Data)
+    Ang = Proc.GetBeamformingUla("Ang")
+    Spec = JOpt[np.argmax(np.max(JOpt, axis=1))]
+    Idcs = peaks(Spec, 2)
+    np.testing.assert_array_equal(Ang[Idcs], [-20, 15])
+    # A deep null between the targets
+    assert Spec[Ang == -2][0] < 0.1 * np.min(Spec[Idcs])
+
+    # Delay-and-sum over the same aperture has a single broad maximum
+    Steer = proc({"Mode": "Steer", "dB": 0}).BeamformingUla(Data[:256])
+    assert len(peaks(Steer[np.argmax(np.max(Steer, axis=1))], 2)) == 1
@@ -0,0 +1,160 @@
+"""
+Cfar.Detect against the range profile target list of the original
+RangeProfileCfar loop, and the border handling of Edge and PeakExt.
+"""
+
+import numpy as np
+import pytest
+
+import Class.Cfar as Cfar
+import Class.RadarProc as RadarProc
+
+fs = 1.0e6
+kf = (24.3e9 - 23.9e9) / (260 / 1.0e6)
+FuSca = 0.498 / 65536
+
+
+def frames(count=20):
+    # Four tones per frame on all channels over receiver noise
+    rng = np.random.default_rng(0)
+    n = np.arange(256)
+    out = []
+    for _ in range(count):
+        sig = rng.normal(0, 20, (256, 4))
+        for f in rng.uniform(0.03, 0.4, 4):
+            sig += rng.uniform(200, 2000) * np.cos(2 * np.pi * f * n + rng.uniform(0, 2 * np.pi))[:, None]
+        out.append(np.round(sig).astype(np.int16))
+    return out
+
+
+def proc(cfar_type):
+    Proc = RadarProc.RadarProc()
+    Proc.CfgRangeProfile(
+        {"RemoveMean": 1, "FFT": 2**9, "FuSca": FuSca, "fs": fs, "kf": kf,
+         "RMin": 1, "RMax": 50, "dB": 1, "Ext": 1}
+    )
+    Proc.CfgRangeProfileCfar({"Type": cfar_type, "ThresdB": 15})
+    return Proc
+
+
+def old_list(RP, X, Range):
+    # The 'List' loop of RangeProfileCfar before Cfar.Detect, with scalar
+    # indices so that it runs on current numpy
+    TarMap = (RP > X) * np.ones(RP.shape)
+    Ny, Nx = TarMap.shape
+    TarMap = TarMap[1:Ny, :] - TarMap[0:Ny - 1, :]
+    lTar = []
+    for Idx in range(Nx):
+        lChn = []
+        TarMap[0, Idx] = 0
+        TarMap[1, Idx] = 0
+        TarMap[Ny - 3, Idx] = 0
+        TarMap[Ny - 2, Idx] = 0
+        IdcsPos = np.argwhere(TarMap[:, Idx] > 0.1)[:, 0] + 1
+        IdcsNeg = np.argwhere(TarMap[:, Idx] < -0.1)[:, 0] + 1
+        # A run from the first bins leaves a falling edge without a rising
+        # one, which the old loop paired with the next rising edge (and then
+        # returned empty dicts); drop it, as Edge does
+        if len(IdcsNeg) > 0 and (len(IdcsPos) == 0 or IdcsNeg[0] < IdcsPos[0]):
+            IdcsNeg = IdcsNeg[1:]
+        if len(IdcsPos) < len(IdcsNeg):
+            IdcsNeg = IdcsNeg[0:len(IdcsPos)]
+        if len(IdcsNeg) < len(IdcsPos):
+            IdcsPos = IdcsPos[0:len(IdcsNeg)]
+        for Pos, Neg in zip(IdcsPos, IdcsNeg):
+            assert Pos < Neg
+            MaxIdx = np.argmax(RP[Pos - 2:Neg + 2, Idx]) + Pos - 2
+            lChn.append({"R": Range[MaxIdx], "Amp": RP[MaxIdx, Idx], "Bins": Neg - Pos, "Idx": MaxIdx})
+        lTar.append(lChn)
+    return lTar
+
+
+@pytest.mark.parametrize("cfar_type", ["CA", "OS"])
+def test_detect_matches_old_list(cfar_type):
+    Proc = proc(cfar_type)
+    Range = Proc.GetRangeProfile("Range")
+    NrTar = 0
+    for Data in frames():
+        RP = Proc.RangeProfile(Data).copy()
+        X = Proc.RangeProfileCfar(Data, "Thres").copy()
+        lOld = old_list(RP, X, Range)
+        lTar = Proc.RangeProfileCfar(Data, "List")
+        Det = Proc.RangeProfileCfar(Data, "Det")
+        DetDirect = Proc.RangeProfileCfar_Det.Detect(RP, X, Range)
+
+        assert Det.dtype == Cfar.DetDtype
+        np.testing.assert_array_equal(Det, DetDirect)
+        assert len(lTar) == len(lOld) == RP.shape[1]
+        for Chn, (lChn, lChnOld) in enumerate(zip(lTar, lOld)):
+            DetChn = Det[Det["Chn"] == Chn]
+            assert len(lChn) == len(lChnOld) == len(DetChn)
+            for dTar, dOld, Tar in zip(lChn, lChnOld, DetChn):
+                assert dTar["R"] == dOld["R"]
+                assert dTar["Amp"] == dOld["Amp"]
+                assert dTar["Bins"] == dOld["Bins"]
+                assert Tar["Idx"] == dOld["Idx"]
+                assert Tar["R"] == dOld["R"]
+                assert Tar["Amp"] == dOld["Amp"]
+                assert Tar["Bins"] == dOld["Bins"]
+                assert Tar["Frm"] == 0
+            NrTar += len(lChn)
+    assert NrTar > 100
+
+
+def border_profile():
+    # Runs over a threshold of 1: bins 0-1 (first bin), 5-7 with a higher
+    # cell below its own threshold at bin 4, and 17-19 (last bin)
+    X = np.array([4, 3, 0, 0, 9, 3, 5, 4, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2, 6, 7], dtype=float)
+    Thres = np.ones_like(X)
+    Thres[4] = 10
+    return X[:, None], Thres[:, None]
+
+
+@pytest.mark.parametrize("cfar_type", ["CA", "OS"])
+def test_detect_edge(cfar_type):
+    X, Thres = border_profile()
+    Range = 0.5 * np.arange(len(X))
+
+    Det = Cfar.Cfar({"Type": cfar_type, "Edge": 0}).Detect(X, Thres, Range)
+    np.testing.assert_array_equal(Det["Idx"], [0, 6, 19])
+    np.testing.assert_array_equal(Det["R"], [0, 3, 9.5])
+    np.testing.assert_array_equal(Det["Amp"], [4, 5, 7])
+    np.testing.assert_array_equal(Det["Bins"], [2, 3, 3])
+
+    # Edge drops runs that start or end within Edge bins of the border
+    Det = Cfar.Cfar({"Type": cfar_type, "Edge": 3}).Detect(X, Thres, Range)
+    np.testing.assert_array_equal(Det["Idx"], [6])
+    Det = Cfar.Cfar({"Type": cfar_type, "Edge": 5}).Detect(X, Thres, Range)
+    np.testing.assert_array_equal(Det["Idx"], [6])
+    Det = Cfar.Cfar({"Type": cfar_type, "Edge": 6}).Detect(X, Thres, Range)
+    assert len(Det) == 0
+
+
+def test_detect_peak_ext():
+    X, Thres = border_profile()
+
+    # The peak search extends PeakExt bins beyond the run, clipped at the
+    # borders; Bins still counts the cells above the threshold
+    Det = Cfar.Cfar({"PeakExt": 2}).Detect(X, Thres)
+    np.testing.assert_array_equal(Det["Idx"], [0, 4, 19])
+    np.testing.assert_array_equal(Det["R"], [0, 4, 19])
+    np.testing.assert_array_equal(Det["Amp"], [4, 9, 7])
+    np.testing.assert_array_equal(Det["Bins"], [2, 3, 3])
+
+    Det = Cfar.Cfar({"PeakExt": 1}).Detect(X, Thres)
+    np.testing.assert_array_equal(Det["Idx"], [0, 4, 19])
+    Det = Cfar.Cfar({"PeakExt": 0}).Detect(X, Thres)
+    np.testing.assert_array_equal(Det["Idx"], [0, 6, 19])
+
+
+def test_detect_fields():
+    X, Thres = border_profile()
+    # (frame, range, channel): channel 1 is channel 0 reversed along range
+    Cube = np.stack([np.hstack([X, X[::-1]]), np.hstack([X[::-1], X])])
+    Thr = np.stack([np.hstack([Thres, Thres[::-1]]), np.hstack([Thres[::-1], Thres])])
+    Det = Cfar.Cfar({"Edge": 1, "PeakExt": 1}).Detect(Cube, Thr)
+
+    assert Det.dtype == Cfar.DetDtype
+    Ref = np.array([(4, 9, 3, 4, 0, 0), (15, 9, 3, 15, 1, 0),
+                    (15, 9, 3, 15, 0, 1), (4, 9, 3, 4, 1, 1)], dtype=Cfar.DetDtype)
+    np.testing.assert_array_equal(np.sort(Det, order=["Frm", "Chn"]), Ref)
@@ -0,0 +1,133 @@
+"""
+Cfar2D against a brute force cell averaging loop, and target lists of
+single maps and of map stacks in RangeDopplerCfar.
+"""
+
+import numpy as np
+import pytest
+
+import Class.Cfar as Cfar
+import Class.RadarProc as RadarProc
+
+fs = 1.0e6
+kf = (24.3e9 - 23.9e9) / (260 / 1.0e6)
+FuSca = 0.498 / 65536
+
+
+def old_thres(X, dCfg):
+    # Mean of the training cells of every cell under test, one cell at a time
+    Det = Cfar.Cfar2D(dCfg)
+    Nr, Nv = X.shape
+    Thres = np.zeros(X.shape)
+    for r in range(Nr):
+        for v in range(Nv):
+            RLo = r - Det.RangeLz // 2
+            VLo = v - Det.VelLz // 2
+            Vals = []
+            for rr in range(RLo - Det.RangeLb, RLo + Det.RangeLz + Det.RangeLa):
+                for vv in range(VLo - Det.VelLb, VLo + Det.VelLz + Det.VelLa):
+                    if RLo <= rr < RLo + Det.RangeLz and VLo <= vv < VLo + Det.VelLz:
+                        continue
+                    if rr < 0 or rr >= Nr:
+                        continue
+                    if Det.VelWrap > 0:
+                        vv = vv % Nv
+                    elif vv < 0 or vv >= Nv:
+                        continue
+                    Vals.append(X[rr, vv])
+            Thres[r, v] = np.mean(Vals) if len(Vals) > 0 else 0
+    if Det.dB > 0:
+        return Thres + Det.ThresdB
+    return Thres * 10 ** (Det.ThresdB / 20)
+
+
+@pytest.mark.parametrize("VelWrap", [0, 1])
+@pytest.mark.parametrize("dCfg", [
+    {},
+    {"RangeLz": 3, "RangeLb": 2, "RangeLa": 6, "VelLz": 4, "VelLb": 5, "VelLa": 1},
+    {"RangeLz": 1, "RangeLb": 0, "RangeLa": 3, "VelLz": 1, "VelLb": 2, "VelLa": 0, "dB": 1},
+])
+def test_thres_matches_loop(dCfg, VelWrap):
+    dCfg = dict(dCfg, VelWrap=VelWrap, ThresdB=10)
+    X = np.random.default_rng(0).uniform(0, 10, (30, 24))
+    Thres = Cfar.Cfar2D(dCfg).Thres(X)
+    np.testing.assert_allclose(Thres, old_thres(X, dCfg), rtol=1e-12)
+
+    # A stack of maps gives the thresholds of the single maps
+    Stack = np.stack([X, X[::-1], 2 * X])
+    ThresStack = Cfar.Cfar2D(dCfg).Thres(Stack)
+    for Map, ThresMap in zip(Stack, ThresStack):
+        np.testing.assert_allclose(ThresMap, old_thres(Map, dCfg), rtol=1e-12)
+
+
+def target_map():
+    # Two targets on a noise floor of about 1: a peak with a weaker
+    # neighbour at (10, 3), and one at the velocity border (20, 15)
+    X = np.random.default_rng(1).uniform(0.5, 1.5, (32, 16))
+    X[10, 3] = 50
+    X[10, 4] = 20
+    X[20, 15] = 40
+    return X
+
+
+@pytest.mark.parametrize("VelWrap", [0, 1])
+def test_detect_targets(VelWrap):
+    X = target_map()
+    Range = 0.1 * np.arange(32)
+    Vel = np.arange(16) - 8.0
+    Det = Cfar.Cfar2D({"VelWrap": VelWrap}).Detect(X, Range=Range, Vel=Vel)
+
+    assert Det.dtype == Cfar.Det2DDtype
+    Ref = np.array([(1.0, -5, 50, 10, 3, 0), (2.0, 7, 40, 20, 15, 0)], dtype=Cfar.Det2DDtype)
+    np.testing.assert_array_equal(Det, Ref)
+
+    # Without the peak search the neighbour is reported as well
+    Det = Cfar.Cfar2D({"VelWrap": VelWrap, "Peak": 0}).Detect(X)
+    np.testing.assert_array_equal(Det["RIdx"], [10, 10, 20])
+    np.testing.assert_array_equal(Det["VIdx"], [3, 4, 15])
+    np.testing.assert_array_equal(Det["R"], Det["RIdx"])
+
+
+def test_detect_stack():
+    X = target_map()
+    Det = Cfar.Cfar2D().Detect(np.stack([X, X[:, ::-1]]))
+    np.testing.assert_array_equal(Det["Frm"], [0, 0, 1, 1])
+    np.testing.assert_array_equal(Det["RIdx"], [10, 20, 10, 20])
+    np.testing.assert_array_equal(Det["VIdx"], [3, 15, 12, 0])
+
+
+def frames(count):
+    # Two moving targets per frame over receiver noise
+    rng = np.random.default_rng(2)
+    n = np.arange(256)
+    Data = rng.normal(0, 20, (count, 32, 256))
+    for Idx in range(count):
+        for f, fd in rng.uniform((0.02, -0.4), (0.3, 0.4), (2, 2)):
+            Data[Idx] += 1000 * np.cos(2 * np.pi * (f * n[None, :] + fd * np.arange(32)[:, None]))
+    return np.round(Data.reshape(count, -1)).astype(np.int16)
+
+
+@pytest.mark.parametrize("dB", [0, 1])
+def test_range_doppler_cfar_stack(dB):
+    Proc = RadarProc.RadarProc()
+    Proc.CfgRangeDoppler(
+        {"fs": fs, "kf": kf, "RangeFFT": 2**9, "VelFFT": 2**6, "Abs": 1, "dB": dB,
+         "Ext": 1, "RMin": 1, "RMax": 30, "N": 256, "Frms": 32, "FuSca": FuSca}
+    )
+    Proc.CfgRangeDopplerCfar({"ThresdB": 15})
+    Data = frames(3)
+
+    Det = Proc.RangeDopplerCfar(Data, "Det")
+    Tar = Proc.RangeDopplerCfar(Data, "Tar")
+    assert Det.dtype == Cfar.Det2DDtype
+    assert Tar.shape[0] == 3
+    NrTar = 0
+    for Idx, Map in enumerate(Data):
+        DetMap = Proc.RangeDopplerCfar(Map, "Det")
+        Ref = DetMap.copy()
+        Ref["Frm"] = Idx
+        np.testing.assert_array_equal(Det[Det["Frm"] == Idx], Ref)
+        np.testing.assert_array_equal(Tar[Idx], Proc.RangeDopplerCfar(Map, "Tar"))
+        assert len(DetMap) >= 2
+        NrTar += len(DetMap)
+    assert len(Det) == NrTar
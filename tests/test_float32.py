@@ -0,0 +1,82 @@
+"""
+Single-precision mode against double precision for sar and RadarProc.
+
+Outputs must agree within RTOL of their largest magnitude; outputs in dB
+are compared as magnitudes.
+"""
+
+import numpy as np
+import pytest
+
+import Class.RadarProc as RadarProc
+import sar
+
+RTOL = 1e-5
+
+fs = 1.0e6
+kf = (24.3e9 - 23.9e9) / (260 / 1.0e6)
+FuSca = 0.498 / 65536
+
+
+def assert_close(out32, out64, tol=RTOL):
+    assert out32.dtype in (np.float32, np.complex64)
+    assert out64.dtype in (np.float64, np.complex128)
+    err = np.max(np.abs(out32 - out64)) / np.max(np.abs(out64))
+    assert err < tol
+
+
+def cube():
+    rng = np.random.default_rng(0)
+    return rng.integers(-2000, 2000, (256, 400), dtype="int16")
+
+
+def frames(chirps):
+    rng = np.random.default_rng(1)
+    n = np.arange(256)
+    sig = rng.normal(0, 20, (256 * chirps, 4))
+    for f in (0.05, 0.12, 0.3):
+        sig += 1000 * np.cos(2 * np.pi * f * np.tile(n, chirps))[:, None] * np.exp(0.4j * np.arange(4)).real
+    return np.round(sig).astype(np.int16)
+
+
+@pytest.mark.parametrize("func", [sar.sar, sar.sar2])
+def test_sar(func):
+    Data = cube()
+    assert_close(func(Data, 9, dtype="float32"), func(Data, 9, dtype="float64"))
+
+
+def test_focused_sar():
+    Data = cube()
+    assert_close(sar.focused_sar(Data, 9, kf, dtype="float32"), sar.focused_sar(Data, 9, kf, dtype="float64"))
+
+
+def proc(Dtype, dB):
+    Proc = RadarProc.RadarProc()
+    Proc.CfgRangeProfile(
+        {"RemoveMean": 1, "FFT": 2**9, "FuSca": FuSca, "fs": fs, "kf": kf,
+         "RMin": 1, "RMax": 50, "dB": dB, "Ext": 1, "Dtype": Dtype}
+    )
+    Proc.CfgRangeDoppler(
+        {"fs": fs, "kf": kf, "RangeFFT": 2**9, "VelFFT": 2**7, "Abs": 1, "dB": dB,
+         "Ext": 1, "RMin": 1, "RMax": 10, "N": 256, "Frms": 32, "FuSca": FuSca, "Dtype": Dtype}
+    )
+    Proc.CfgBeamformingUla(
+        {"fs": fs, "kf": kf, "RangeFFT": 2**10, "AngFFT": 2**7, "Abs": 1, "dB": dB, "Ext": 1,
+         "RMin": 1, "RMax": 10, "FuSca": FuSca, "Dtype": Dtype}
+    )
+    return Proc
+
+
+@pytest.mark.parametrize("dB", [0, 1])
+def test_radarproc(dB):
+    Proc32 = proc("float32", dB)
+    Proc64 = proc("float64", dB)
+    Data = frames(32)
+    Rp = (Proc32.RangeProfile(Data[:256]), Proc64.RangeProfile(Data[:256]))
+    Rd = (Proc32.RangeDoppler(Data[:, 0]), Proc64.RangeDoppler(Data[:, 0]))
+    Bf = (Proc32.BeamformingUla(Data[:256]), Proc64.BeamformingUla(Data[:256]))
+    for out32, out64 in (Rp, Rd, Bf):
+        if dB:
+            out32 = 10 ** (out32 / np.float32(20))
+            out64 = 10 ** (out64 / 20)
+        assert_close(out32, out64)
@@ -0,0 +1,46 @@
+"""
+omega_k of a simulated point target, and batches of captures.
+"""
+
+import numpy as np
+
+import omegak
+
+c0 = 3e8
+fs = 1.0e6
+fStrt = 23.9e9
+fStop = 24.3e9
+TRampUp = 260 / 1.0e6
+kf = (fStop - fStrt) / TRampUp
+step = 0.005
+
+
+def capture(N, Tars, Ns=256):
+    # Beat signal of point targets (x, y) for rail positions x = i*step;
+    # fast time is stored reversed, as sarImage.py does
+    t = np.arange(Ns)[:, np.newaxis] / fs
+    Data = np.zeros((Ns, N))
+    for xTar, yTar in Tars:
+        R = np.sqrt((np.arange(N) * step - xTar) ** 2 + yTar**2)
+        Data += 1000 * np.cos(2 * np.pi * 2 * kf * R / c0 * t + 4 * np.pi * fStrt * R / c0)
+    return np.round(Data[::-1]).astype(np.int16)
+
+
+def test_point_target():
+    Img, x, y = omegak.omega_k(capture(201, [(0.5, 2.5)]), step, fStrt, fStop, TRampUp)
+    assert Img.shape == (y.size, x.size) == (1024, 512)
+    Row, Col = np.unravel_index(np.argmax(np.abs(Img)), Img.shape)
+    # The peak is on the grid points closest to the target
+    assert Col == np.argmin(np.abs(x - 0.5))
+    assert Row == np.argmin(np.abs(y - 2.5))
+
+
+def test_batch():
+    Data = np.stack([capture(201, [(0.5, 2.5)]), capture(201, [(0.3, 1.5), (0.8, 3.0)])])
+    Img, x, y = omegak.omega_k(Data, step, fStrt, fStop, TRampUp)
+    assert Img.shape == (2, 1024, 512)
+    for Idx in range(2):
+        ImgIdx, xIdx, yIdx = omegak.omega_k(Data[Idx], step, fStrt, fStop, TRampUp)
+        np.testing.assert_array_equal(Img[Idx], ImgIdx)
+        np.testing.assert_array_equal(x, xIdx)
+        np.testing.assert_array_equal(y, yIdx)
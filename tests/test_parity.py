@@ -0,0 +1,302 @@
+"""
+RangeProfile, RangeDoppler and BeamformingUla against the first version
+of RadarProc.
+
+The reference functions are the original methods with self replaced by
+the configured RadarProc object. Errors are relative to the largest
+magnitude of the reference; outputs in dB are compared as magnitudes.
+"""
+
+import numpy as np
+import pytest
+
+import Class.RadarProc as RadarProc
+
+TOL = 1.2e-14
+
+fs = 1.0e6
+kf = (24.3e9 - 23.9e9) / (260 / 1.0e6)
+FuSca = 0.498 / 65536
+
+
+def rel_err(out, ref, dB=0):
+    assert out.shape == ref.shape
+    if dB:
+        out = 10 ** (out / 20)
+        ref = 10 ** (ref / 20)
+    return np.max(np.abs(out - ref)) / np.max(np.abs(ref))
+
+
+def frames(count, chirps=1, N=256):
+    # Three tones on all channels over receiver noise
+    rng = np.random.default_rng(0)
+    n = np.arange(N * chirps)[:, np.newaxis]
+    out = []
+    for _ in range(count):
+        sig = rng.normal(0, 20, (N * chirps, 4))
+        for f in rng.uniform(0.01, 0.45, 3):
+            sig += 1000 * np.cos(2 * np.pi * f * n + rng.uniform(0, 2 * np.pi, 4))
+        out.append(np.round(sig).astype(np.int16))
+    return out
+
+
+def old_range_profile_fft(self, Data):
+    Data = Data[self.RangeProfile_NIni:, :]
+    Siz = Data.shape
+    Ny = Siz[0]
+    Nx = Siz[1]
+
+    if self.RangeProfile_RemoveMean > 0:
+        Tmp = np.mean(Data, axis=0)
+        mTmp = np.tile(Tmp, (Ny, 1))
+        Data = Data - mTmp
+
+    if self.RangeProfile_Window > 0:
+        Win = np.hanning(Ny)
+        ScaWin = sum(Win)
+        Win2D = np.tile(Win, (Nx, 1))
+        Win2D = Win2D.transpose()
+    else:
+        ScaWin = Ny
+        # ones(Ny, Nx) in the original, which fails on current numpy
+        Win2D = np.ones((Ny, Nx))
+
+    Data = Data * Win2D
+    x = np.zeros((int(self.RangeProfile_FFT), Nx), dtype="complex128")
+    StrtIdx = int((self.RangeProfile_FFT - Ny) / 2)
+    x[StrtIdx:StrtIdx + Ny, :] = Data
+
+    x = np.fft.fftshift(x, axes=0)
+    X = np.fft.fft(x, self.RangeProfile_FFT, 0) / ScaWin * self.FuSca
+    return X
+
+
+def old_range_profile(self, Data):
+    X = old_range_profile_fft(self, Data)
+
+    if self.RangeProfile_XPos > 0:
+        X = X[0:int(self.RangeProfile_FFT / 2), :]
+
+    if self.RangeProfile_Abs > 0:
+        X = abs(X)
+        if self.RangeProfile_dB > 0:
+            X = 20 * np.log10(X)
+
+    if self.RangeProfile_Ext > 0:
+        X = X[int(self.RangeProfile_IdxMin):int(self.RangeProfile_IdxMax), :]
+
+    return X
+
+
+def proc_range_profile(dCfg, Zoom=0, FftLib="numpy"):
+    Proc = RadarProc.RadarProc()
+    Cfg = {"fs": fs, "kf": kf, "FuSca": FuSca, "RMin": 1, "RMax": 30, "Zoom": Zoom, "FftLib": FftLib}
+    Cfg.update(dCfg)
+    Proc.CfgRangeProfile(Cfg)
+    return Proc
+
+
+RANGE_PROFILE = [
+    {"FFT": 2**12, "Ext": 0, "XPos": 1, "dB": 1},
+    {"FFT": 2**12, "Ext": 1, "XPos": 1, "dB": 1},
+    {"FFT": 2**10, "Ext": 1, "XPos": 0, "dB": 0},
+    {"FFT": 2**9, "Ext": 0, "XPos": 0, "Abs": 0, "NIni": 0},
+    {"FFT": 2**11, "Ext": 1, "XPos": 1, "Abs": 0, "RemoveMean": 0, "Window": 0},
+]
+
+
+@pytest.mark.parametrize("FftLib", ["numpy", "scipy"])
+@pytest.mark.parametrize("Zoom", [0, 1, 2])
+@pytest.mark.parametrize("dCfg", RANGE_PROFILE)
+def test_range_profile(dCfg, Zoom, FftLib):
+    # The plan is reused across frames and rebuilt for another frame length
+    Proc = proc_range_profile(dCfg, Zoom, FftLib)
+    dB = Proc.RangeProfile_Abs > 0 and Proc.RangeProfile_dB > 0
+    for Data in frames(3) + frames(2, N=200):
+        Out = Proc.RangeProfile(Data)
+        assert rel_err(Out, old_range_profile(Proc, Data), dB) < TOL
+    if Zoom == 2 and Proc.RangeProfile_Ext > 0 and Proc.RangeProfile_XPos > 0:
+        # The range interval went through the chirp-z transform
+        assert any(Czt is not None for Czt in Proc.RangeFFT_Czt.values())
+
+
+def old_range_doppler(self, Data):
+    Data = Data.reshape(self.RangeDoppler_Frms, self.RangeDoppler_N)
+    Data = Data.transpose()
+    Data = Data[self.RangeDoppler_NIni:, :]
+
+    Siz = Data.shape
+    Ny = Siz[0]
+    Nx = Siz[1]
+
+    if self.RangeDoppler_RemoveMean > 0:
+        Tmp = np.mean(Data, axis=1)
+        mTmp = np.tile(Tmp, (Nx, 1))
+        Data = Data - mTmp.transpose()
+
+    if self.RangeDoppler_RangeWindow > 0:
+        Win = np.hanning(Ny)
+        ScaWin = sum(Win)
+        Win2D = np.tile(Win, (Nx, 1))
+        Win2D = Win2D.transpose()
+        Data = Data * Win2D
+    else:
+        ScaWin = Ny
+
+    x = np.zeros((int(self.RangeDoppler_RangeFFT), Nx))
+    StrtIdx = int((self.RangeDoppler_RangeFFT - Ny) / 2)
+    x[StrtIdx:StrtIdx + Ny, :] = Data
+    X = np.fft.fft(x, self.RangeDoppler_RangeFFT, 0) / ScaWin * self.FuSca
+    X = X[0:int(self.RangeDoppler_RangeFFT / 2), :]
+
+    if self.RangeDoppler_Ext > 0:
+        X = X[int(self.RangeDoppler_IdxMin):int(self.RangeDoppler_IdxMax), :]
+
+    Siz = X.shape
+    Ny = Siz[0]
+    Nx = Siz[1]
+
+    if self.RangeDoppler_VelWindow > 0:
+        Win = np.hanning(Nx)
+        ScaWin = sum(Win)
+        Win2D = np.tile(Win, (Ny, 1))
+        X = X * Win2D
+    else:
+        ScaWin = Nx
+
+    rd = np.zeros((Ny, int(self.RangeDoppler_VelFFT)), dtype="complex128")
+    StrtIdx = int((self.RangeDoppler_VelFFT - Nx) / 2)
+    rd[:, StrtIdx:StrtIdx + Nx] = X
+
+    RD = np.fft.fft(rd, self.RangeDoppler_VelFFT, 1) / ScaWin
+    RD = np.fft.fftshift(RD, axes=1)
+
+    if self.RangeDoppler_Abs > 0:
+        RD = abs(RD)
+        if self.RangeDoppler_dB > 0:
+            RD = 20 * np.log10(RD)
+
+    return RD
+
+
+def old_beamforming_ula(self, Data):
+    Data = Data[self.BeamformingUla_NIni:, :]
+    Siz = Data.shape
+    Ny = Siz[0]
+    Nx = Siz[1]
+
+    if self.BeamformingUla_RemoveMean > 0:
+        Tmp = np.mean(Data, axis=0)
+        mTmp = np.tile(Tmp, (Ny, 1))
+        Data = Data - mTmp
+
+    if self.BeamformingUla_RangeWindow > 0:
+        Win = np.hanning(Ny)
+        ScaWin = sum(Win)
+        Win2D = np.tile(Win, (Nx, 1))
+        Win2D = Win2D.transpose()
+        Data = Data * Win2D
+    else:
+        ScaWin = Ny
+
+    x = np.zeros((int(self.BeamformingUla_RangeFFT), Nx))
+    StrtIdx = int((self.BeamformingUla_RangeFFT - Ny) / 2)
+    x[StrtIdx:StrtIdx + Ny, :] = Data
+
+    x = np.fft.fftshift(x, axes=0)
+    X = np.fft.fft(x, self.BeamformingUla_RangeFFT, 0) / ScaWin * self.FuSca
+    X = X[0:int(self.BeamformingUla_RangeFFT / 2), :]
+
+    if self.BeamformingUla_Ext > 0:
+        X = X[int(self.BeamformingUla_IdxMin):int(self.BeamformingUla_IdxMax), :]
+
+    XChn = X[:, self.BeamformingUla_ChnOrder]
+    CalChn = self.BeamformingUla_CalData[self.BeamformingUla_ChnOrder]
+
+    Siz = XChn.shape
+    Ny = Siz[0]
+    Nx = Siz[1]
+
+    if self.BeamformingUla_AngWindow > 0:
+        Win = np.hanning(Nx)
+        ScaWin = sum(Win)
+        Win = Win * CalChn
+        Win2D = np.tile(Win, (Ny, 1))
+        XChn = XChn * Win2D
+    else:
+        ScaWin = Nx
+        Win2D = np.tile(CalChn, (Ny, 1))
+        XChn = XChn * Win2D
+
+    jOpt = np.zeros((Ny, int(self.BeamformingUla_AngFFT)), dtype="complex128")
+    StrtIdx = int((self.BeamformingUla_AngFFT - Nx) / 2)
+    jOpt[:, StrtIdx:StrtIdx + Nx] = XChn
+
+    JOpt = np.fft.fft(jOpt, self.BeamformingUla_AngFFT, 1) / ScaWin
+    JOpt = np.fft.fftshift(JOpt, axes=(1))
+
+    if self.BeamformingUla_Abs > 0:
+        JOpt = abs(JOpt)
+        if self.BeamformingUla_dB > 0:
+            JOpt = 20 * np.log10(JOpt)
+
+    return JOpt
+
+
+RANGE_DOPPLER = [
+    {"RangeFFT": 2**10, "VelFFT": 2**7, "Ext": 1, "Abs": 1, "dB": 1},
+    {"RangeFFT": 2**9, "VelFFT": 2**6, "Ext": 0, "Abs": 1, "dB": 0},
+    {"RangeFFT": 2**12, "VelFFT": 2**8, "Ext": 1, "Abs": 0, "NIni": 0},
+]
+
+
+@pytest.mark.parametrize("FftLib", ["numpy", "scipy"])
+@pytest.mark.parametrize("Zoom", [0, 1, 2])
+@pytest.mark.parametrize("dCfg", RANGE_DOPPLER)
+def test_range_doppler(dCfg, Zoom, FftLib):
+    Proc = RadarProc.RadarProc()
+    Cfg = {"fs": fs, "kf": kf, "FuSca": FuSca, "RMin": 1, "RMax": 30, "N": 256, "Frms": 32,
+           "Zoom": Zoom, "FftLib": FftLib}
+    Cfg.update(dCfg)
+    Proc.CfgRangeDoppler(Cfg)
+    dB = Proc.RangeDoppler_Abs > 0 and Proc.RangeDoppler_dB > 0
+    for Data in frames(2, chirps=32):
+        Out = Proc.RangeDoppler(Data[:, 0])
+        assert rel_err(Out, old_range_doppler(Proc, Data[:, 0]), dB) < TOL
+
+
+BEAMFORMING_ULA = [
+    {"RangeFFT": 2**10, "AngFFT": 2**7, "Ext": 1, "Abs": 1, "dB": 1},
+    {"RangeFFT": 2**12, "AngFFT": 2**8, "Ext": 0, "Abs": 1, "dB": 0},
+    {"RangeFFT": 2**9, "AngFFT": 2**6, "Ext": 1, "Abs": 0, "ChnOrder": [3, 1, 2, 0],
+     "CalData": np.exp(0.3j * np.arange(4))},
+]
+
+
+@pytest.mark.parametrize("FftLib", ["numpy", "scipy"])
+@pytest.mark.parametrize("Zoom", [0, 1, 2])
+@pytest.mark.parametrize("dCfg", BEAMFORMING_ULA)
+def test_beamforming_ula(dCfg, Zoom, FftLib):
+    Proc = RadarProc.RadarProc()
+    Cfg = {"fs": fs, "kf": kf, "FuSca": FuSca, "RMin": 1, "RMax": 30, "Zoom": Zoom, "FftLib": FftLib}
+    Cfg.update(dCfg)
+    Proc.CfgBeamformingUla(Cfg)
+    dB = Proc.BeamformingUla_Abs > 0 and Proc.BeamformingUla_dB > 0
+    for Data in frames(3):
+        Out = Proc.BeamformingUla(Data)
+        assert rel_err(Out, old_beamforming_ula(Proc, Data), dB) < TOL
+
+
+@pytest.mark.parametrize("Zoom", [0, 2])
+@pytest.mark.parametrize("dCfg", RANGE_PROFILE)
+def test_range_profile_batch(dCfg, Zoom):
+    # 70 frames: a full block of 64 and a shorter last block
+    Proc = proc_range_profile(dict(dCfg, N=256), Zoom)
+    Data = np.stack(frames(70))
+    Rp = Proc.RangeProfileBatch(Data)
+    assert Rp.shape[0] == 70
+    for Idx in range(70):
+        np.testing.assert_array_equal(Rp[Idx], Proc.RangeProfile(Data[Idx]))
+
+    # A block of chirps as returned for StopIdx > 1
+    np.testing.assert_array_equal(Proc.RangeProfileBatch(Data[:8].reshape(-1, 4)), Rp[:8])
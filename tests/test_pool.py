@@ -0,0 +1,82 @@
+"""
+Stage outputs are new arrays unless CfgPool(1) makes them pooled.
+"""
+
+import numpy as np
+import pytest
+
+import Class.RadarProc as RadarProc
+
+fs = 1.0e6
+kf = (24.3e9 - 23.9e9) / (260 / 1.0e6)
+FuSca = 0.498 / 65536
+
+
+def proc(XPos):
+    Proc = RadarProc.RadarProc()
+    Proc.CfgRangeProfile(
+        {"RemoveMean": 1, "FFT": 2**9, "FuSca": FuSca, "fs": fs, "kf": kf,
+         "RMin": 1, "RMax": 50, "dB": 1, "Ext": 1, "XPos": XPos}
+    )
+    Proc.CfgRangeDoppler(
+        {"fs": fs, "kf": kf, "RangeFFT": 2**9, "VelFFT": 2**7, "Abs": 1, "dB": 1,
+         "Ext": 1, "RMin": 1, "RMax": 10, "N": 256, "Frms": 32, "FuSca": FuSca}
+    )
+    Proc.CfgBeamformingUla(
+        {"fs": fs, "kf": kf, "RangeFFT": 2**10, "AngFFT": 2**7, "Abs": 1, "Ext": 1,
+         "RMin": 1, "RMax": 10, "FuSca": FuSca}
+    )
+    Proc.CfgRangeProfileCfar({"Lz": 9, "Lb": 8, "La": 8})
+    return Proc
+
+
+def stages(Proc):
+    return [
+        lambda D: Proc.RangeProfileFFT(D[:256]),
+        lambda D: Proc.RangeProfileFFT(D[:256], "Cfar"),
+        lambda D: Proc.RangeProfile(D[:256]),
+        lambda D: Proc.RangeProfileCfar(D[:256], "Thres"),
+        lambda D: Proc.RangeDoppler(D[:, 0]),
+        lambda D: Proc.BeamformingUla(D[:256]),
+    ]
+
+
+def frames():
+    rng = np.random.default_rng(0)
+    return rng.integers(-2000, 2000, (2, 256 * 32, 4), dtype="int16")
+
+
+@pytest.mark.parametrize("XPos", [0, 1])
+def test_outputs_are_new_arrays(XPos):
+    Proc = proc(XPos)
+    D1, D2 = frames()
+    for stage in stages(Proc):
+        Out1 = stage(D1)
+        Ref1 = Out1.copy()
+        Out2 = stage(D2)
+        assert not np.shares_memory(Out1, Out2)
+        np.testing.assert_array_equal(Out1, Ref1)
+
+
+@pytest.mark.parametrize("XPos", [0, 1])
+def test_pooled_outputs(XPos):
+    Proc = proc(XPos)
+    Proc.CfgPool(1)
+    D1, D2 = frames()
+    for stage in stages(Proc):
+        Out1 = stage(D1)
+        Out2 = stage(D2)
+        assert np.shares_memory(Out1, Out2)
+
+
+@pytest.mark.parametrize("PoolOut", [0, 1])
+def test_range_doppler_cfar_maps(PoolOut):
+    # A stack of maps gives the thresholds of the single maps
+    Proc = proc(0)
+    Proc.CfgPool(PoolOut)
+    Maps = np.random.default_rng(1).integers(-2000, 2000, (3, 256 * 32), dtype="int16")
+    Thres = Proc.RangeDopplerCfar(Maps, "Thres")
+    assert Thres.shape[0] == 3
+    for Idx, Map in enumerate(Maps):
+        np.testing.assert_array_equal(Thres[Idx], Proc.RangeDopplerCfar(Map, "Thres"))
+    assert not np.array_equal(Thres[0], Thres[2])
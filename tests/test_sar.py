@@ -0,0 +1,189 @@
+"""
+sar, sar2 and focused_sar against the column loops they replaced.
+
+The loops are copied from the first version of sar.py. Errors are the
+norm of the difference relative to the norm of the reference image.
+"""
+
+import numpy as np
+import pytest
+import scipy.signal as sg
+
+import capture
+import sar
+
+# A few ulp of float64: the running sums and the FFT correlation round
+# differently from the loops
+TOL = 1e-15
+
+kf = (24.3e9 - 23.9e9) / (260 / 1.0e6)
+KS = [1, 3, 9, 31, 33, 65]
+
+
+def rel_err(out, ref):
+    assert out.shape == ref.shape
+    return np.linalg.norm(out - ref) / np.linalg.norm(ref)
+
+
+def cube(cols=200):
+    rng = np.random.default_rng(0)
+    return rng.integers(-2000, 2000, (256, cols), dtype="int16")
+
+
+def old_window(Data):
+    Win = np.hanning(Data.shape[0])
+    ScaWin = Win.sum()
+    Win = np.tile(Win, (Data.shape[1], 1)).T
+    return Data * Win / ScaWin
+
+
+def old_sar(Data, k, window=True):
+    if window:
+        Data = old_window(Data)
+    output = np.zeros((Data.shape[0], Data.shape[1] - k), dtype="float64")
+    for i in range(0, Data.shape[1] - k):
+        output[:, i] = Data[:, i : i + k].sum(axis=1)
+    return np.fft.rfft(output, axis=0)
+
+
+def old_sar2(Data, k, window=True):
+    if window:
+        Data = old_window(Data)
+    h = np.ones((1, k))
+    output = sg.convolve(h, Data, mode="valid")
+    return np.fft.rfft(output, axis=0)
+
+
+def old_phase_corr(N, k, kf):
+    b = k // 2
+    d = np.abs(np.arange(-b, b + 1, dtype=int) * sar.D0)
+    Range = np.fft.rfftfreq(N, 1e-6) * 3e8 / (2 * kf)
+    X, Y = np.meshgrid(d, Range)
+    xi = np.divide(2 * np.pi * X**2, (sar.lam * Y), out=np.zeros_like(X), where=Y != 0)
+    return np.exp(1j * xi)
+
+
+def old_focused_sar(Data, k, kf, window=True):
+    phase_corr = old_phase_corr(Data.shape[0], k, kf)
+    if window:
+        Data = old_window(Data)
+    data_freq = np.fft.rfft(Data, axis=0)
+    output = np.zeros((data_freq.shape[0], data_freq.shape[1] - k), dtype="complex128")
+    for i in range(0, data_freq.shape[1] - k):
+        output[:, i] = (data_freq[:, i : i + k] * phase_corr).sum(axis=1)
+    return output
+
+
+@pytest.mark.parametrize("k", KS)
+def test_sar(k):
+    Data = cube()
+    # Integer captures are summed exactly, so without the window the image
+    # is the same bit for bit
+    np.testing.assert_array_equal(sar.sar(Data, k, window=False), old_sar(Data, k, window=False))
+    assert rel_err(sar.sar(Data, k), old_sar(Data, k)) < TOL
+
+
+@pytest.mark.parametrize("window", [False, True])
+@pytest.mark.parametrize("k", KS)
+def test_sar2(k, window):
+    Data = cube()
+    assert rel_err(sar.sar2(Data, k, window), old_sar2(Data, k, window)) < TOL
+
+
+@pytest.mark.parametrize("window", [False, True])
+@pytest.mark.parametrize("k", KS)
+def test_focused_sar(k, window):
+    Data = cube()
+    assert rel_err(sar.focused_sar(Data, k, kf, window), old_focused_sar(Data, k, kf, window)) < TOL
+
+
+@pytest.mark.parametrize("k", [0, 2, 32])
+def test_focused_sar_even_k(k):
+    with pytest.raises(ValueError):
+        sar.focused_sar(cube(), k, kf)
+
+
+@pytest.mark.parametrize("window", [False, True])
+@pytest.mark.parametrize("k", KS)
+def test_incremental_sar(k, window):
+    Data = cube()
+    Inc = sar.IncrementalSar(Data.shape[0], k, kf, Data.shape[1], window)
+    Ref = sar.sar(Data, k, window)
+    for Idx, Col in enumerate(Data.T):
+        i = Inc.update(Col)
+        assert i == Idx - k + 1
+        if Idx == Data.shape[1] // 2:
+            # Finished columns are final while the scan is still running
+            np.testing.assert_array_equal(Inc.unfocused[:, :i], Ref[:, :i])
+    np.testing.assert_array_equal(Inc.unfocused, Ref)
+    assert rel_err(Inc.focused, sar.focused_sar(Data, k, kf, window)) < TOL
+
+
+@pytest.mark.parametrize("window", [False, True])
+@pytest.mark.parametrize("ks", [KS, [3, 99], [65, 1, 9, 9], [5]])
+def test_sar_sweep(ks, window):
+    # Unsorted, repeated and widely spaced ks; [3, 99] jumps with an FFT
+    # correlation
+    Data = cube()
+    Out = sar.sar_sweep(Data, ks, kf, window)
+    assert sorted(Out) == sorted(set(ks))
+    for k in ks:
+        assert rel_err(Out[k][0], sar.sar(Data, k, window)) < TOL
+        assert rel_err(Out[k][1], sar.focused_sar(Data, k, kf, window)) < TOL
+
+
+def test_sar_sweep_even_k():
+    with pytest.raises(ValueError):
+        sar.sar_sweep(cube(), [3, 8], kf)
+
+
+@pytest.mark.parametrize("k", [9, 33])
+@pytest.mark.parametrize("width", [1, 50, 100, 857, 1000])
+@pytest.mark.parametrize("func", [sar.sar, sar.sar2, sar.focused_sar])
+def test_chunks(func, width, k):
+    # sar2 trims the final window of every chunk but the last
+    Data = cube(1000)
+    args = (kf,) if func is sar.focused_sar else ()
+    Out = func(capture.iter_chunks(Data, k, width), k, *args)
+    Ref = func(Data, k, *args)
+    if func is sar.focused_sar and k > sar._FFT_MIN_K:
+        # The FFT correlation rounds differently for every chunk length
+        assert rel_err(Out, Ref) < TOL
+    else:
+        np.testing.assert_array_equal(Out, Ref)
+
+
+def test_capture_chunks(tmp_path):
+    Data = cube(1000)
+    np.save(tmp_path / "a.npy", Data)
+    (Cap,) = capture.open_dir(str(tmp_path))
+    assert Cap.shape == Data.shape and len(Cap) == 1000
+    assert isinstance(Cap.data, np.memmap)
+
+    Chunks = list(Cap.chunks(9, 300))
+    assert all(np.shares_memory(Chunk, Cap.data) for Chunk in Chunks)
+    Out = np.concatenate(list(sar.chunked(sar.focused_sar, Chunks, 9, kf)), axis=1)
+    np.testing.assert_array_equal(Out, sar.focused_sar(Data, 9, kf))
+    np.testing.assert_array_equal(sar.sar(Cap.chunks(9, 300), 9), sar.sar(Data, 9))
+
+
+@pytest.mark.parametrize("k", [1, 9, 31, 33, 65])
+def test_phase_kernel(k):
+    Kernel = sar._phase_kernel(256, k, kf, sar.D0, sar.lam)
+    np.testing.assert_array_equal(Kernel, old_phase_corr(256, k, kf))
+    assert not Kernel.flags.writeable
+    assert sar._phase_kernel(256, k, kf, sar.D0, sar.lam) is Kernel
+
+
+@pytest.mark.parametrize("k", [9, 31, 33, 65])
+def test_azimuth_correlate(k, monkeypatch):
+    # The same correlation through both branches: the sliding window sum
+    # for k <= _FFT_MIN_K and the FFT above it
+    data_freq = np.fft.rfft(cube().astype("float64"), axis=0)
+    Kernel = sar._phase_kernel(256, k, kf, sar.D0, sar.lam)
+    cols = data_freq.shape[1] - k
+    Out = sar._azimuth_correlate(data_freq, Kernel, cols)
+    monkeypatch.setattr(sar, "_FFT_MIN_K", k if k > sar._FFT_MIN_K else 0)
+    Other = sar._azimuth_correlate(data_freq, Kernel, cols)
+    assert Out.shape == Other.shape == (data_freq.shape[0], cols)
+    assert rel_err(Out, Other) < TOL
@@ -0,0 +1,234 @@
+"""
+DemoRad chirp reads and usbADI command packing against fake USB objects.
+
+pyusb is only needed to find a board; without it the usb modules are
+replaced by empty ones so that the classes can be imported.
+"""
+
+import importlib
+import importlib.util
+import sys
+import types
+from array import array
+from collections import deque
+
+import numpy as np
+import pytest
+
+Cod_GetChirp = 0x7003
+
+
+def load(monkeypatch, Name):
+    if importlib.util.find_spec("usb") is None:
+        for UsbName in ("usb", "usb.core", "usb.util"):
+            monkeypatch.setitem(sys.modules, UsbName, types.ModuleType(UsbName))
+    return importlib.import_module(Name)
+
+
+@pytest.fixture
+def DemoRad(monkeypatch):
+    return load(monkeypatch, "Class.DemoRad")
+
+
+@pytest.fixture
+def UsbAdiLinux(monkeypatch):
+    return load(monkeypatch, "Class.UsbAdiLinux")
+
+
+class Usb:
+    # The board side of usbADI: chirp requests are answered in order, the
+    # samples of request Seq and channel Chn are 100*Seq + Chn
+    def __init__(self):
+        self.Log = []
+        self.Pending = deque()
+        self.Seq = 0
+        self.Short = False
+
+    def CmdSend(self, Ack, Cod, Data):
+        self.Log.append(("Cmd", Cod))
+        if Cod == Cod_GetChirp:
+            self.Pending.append((self.Seq, int(Data[2]) - int(Data[1])))
+            self.Seq += 1
+
+    def CmdRecv(self):
+        return (True, ())
+
+    def GetRdBuf(self, NrBytes):
+        RdBuf = array("h", bytes(int(NrBytes)))
+        return RdBuf, np.frombuffer(RdBuf, dtype="int16")
+
+    def UsbReadInto(self, RdBuf):
+        Seq, Chirps = self.Pending.popleft()
+        self.Log.append(("Read", Seq))
+        Data = np.frombuffer(RdBuf, dtype="int16").reshape(-1, 4)
+        Data[:] = 100 * Seq + np.arange(4)
+        if self.Short:
+            return 2 * Data.size - 512
+        return 2 * Data.size
+
+
+def board(DemoRad):
+    # DemoRad without opening a board
+    Brd = DemoRad.DemoRad.__new__(DemoRad.DemoRad)
+    Brd.usb = Usb()
+    Brd.ChirpSize = 256 * 4 * 4 / 2
+    Brd.ChirpPipe = deque()
+    Brd.ChirpPipe_Depth = 1
+    Brd.ChirpBuf = dict()
+    Brd.ChirpBuf_Nr = 2
+    Brd.ChirpBuf_Idx = 0
+    Brd.ChirpBuf_View = 0
+    return Brd
+
+
+def check_frame(Data, Seq, Chirps=2):
+    # Channels are returned in reverse order of the transfer
+    assert Data.shape == (256 * Chirps, 4)
+    np.testing.assert_array_equal(Data, np.broadcast_to(100 * Seq + np.arange(4)[::-1], Data.shape))
+
+
+def test_pipeline(DemoRad):
+    Brd = board(DemoRad)
+    Brd.Set("PipeDepth", 3)
+    Brd.Dsp_GetChirpStrt(0, 2)
+    assert Brd.usb.Log == [("Cmd", Cod_GetChirp)] * 3
+
+    for Seq in range(5):
+        check_frame(Brd.Dsp_GetChirpNext(), Seq)
+        # The next request goes out before the oldest one is read
+        assert Brd.usb.Log[-2:] == [("Cmd", Cod_GetChirp), ("Read", Seq)]
+        assert len(Brd.ChirpPipe) == 3
+
+    Brd.Dsp_GetChirpStop()
+    assert len(Brd.ChirpPipe) == 0 and len(Brd.usb.Pending) == 0
+    assert [Seq for Ev, Seq in Brd.usb.Log if Ev == "Read"] == list(range(8))
+    with pytest.raises(RuntimeError):
+        Brd.Dsp_GetChirpNext()
+
+
+def test_cmd_send_drains_pipe(DemoRad):
+    Brd = board(DemoRad)
+    Brd.Set("PipeDepth", 2)
+    Brd.Dsp_GetChirpStrt(0, 2)
+    check_frame(Brd.Dsp_GetChirpNext(), 0)
+
+    # Another command reads the chirps in flight first, so their data
+    # cannot be taken for its response
+    Brd.CmdSend(0, 0x9030, [1])
+    assert Brd.usb.Log[-3:] == [("Read", 1), ("Read", 2), ("Cmd", 0x9030)]
+    assert len(Brd.ChirpPipe) == 0
+
+    # Single reads after the pipeline
+    check_frame(Brd.Dsp_GetChirp(0, 4), 3, 4)
+
+
+def test_short_read(DemoRad):
+    Brd = board(DemoRad)
+    Brd.Set("PipeDepth", 2)
+    Brd.Dsp_GetChirpStrt(0, 2)
+    Brd.usb.Short = True
+    with pytest.raises(IOError):
+        Brd.Dsp_GetChirpNext()
+    # The responses cannot be matched to the requests any more
+    assert len(Brd.ChirpPipe) == 0
+
+
+def test_read_buffers(DemoRad):
+    Brd = board(DemoRad)
+    # Copies by default
+    Data = [Brd.Dsp_GetChirp(0, 2) for _ in range(3)]
+    for Seq, Frm in enumerate(Data):
+        check_frame(Frm, Seq)
+    assert not any(np.shares_memory(Frm, Buf[1]) for Frm in Data for Buf in Brd.ChirpBuf.values())
+
+    # Views of RdBufs rotating buffers: the frames of the last RdBufs reads
+    # stay valid
+    Brd.Set("RdView", 1)
+    Brd.Set("RdBufs", 3)
+    Data = [Brd.Dsp_GetChirp(0, 2) for _ in range(5)]
+    assert len(Brd.ChirpBuf) == 3
+    assert np.shares_memory(Data[0], Data[3]) and not np.shares_memory(Data[3], Data[4])
+    for Seq in (2, 3, 4):
+        check_frame(Data[Seq], Seq + 3)
+
+    # Another chirp range drops the buffers of the old one
+    check_frame(Brd.Dsp_GetChirp(0, 4), 8, 4)
+    assert len(Brd.ChirpBuf) == 1
+
+
+class Endpoint:
+    # Keeps a copy of every payload written
+    def __init__(self):
+        self.Payloads = []
+
+    def write(self, Data):
+        self.Payloads.append(bytes(Data))
+        return len(Data)
+
+
+def usb_adi(UsbAdiLinux):
+    # usbADI without looking for a board
+    Usb = UsbAdiLinux.usbADI.__new__(UsbAdiLinux.usbADI)
+    Usb.InitPayload()
+    Usb.UsbOpen = True
+    Usb.usbWrEp = Endpoint()
+    return Usb
+
+
+def old_payload(Cmd):
+    # The payload loop of the original UsbWrCmd
+    Payload = np.zeros(2048, dtype="uint8")
+    PayloadIndex = 2
+    for Val in Cmd:
+        Payload[PayloadIndex + 3] = (Val >> 24) & 0xFF
+        Payload[PayloadIndex + 2] = (Val >> 16) & 0xFF
+        Payload[PayloadIndex + 1] = (Val >> 8) & 0xFF
+        Payload[PayloadIndex] = (Val) & 0xFF
+        PayloadIndex += 4
+    PayloadIndex -= 2
+    Payload[0] = PayloadIndex & 0xFF
+    Payload[1] = (PayloadIndex >> 8) & 0xFF
+    return Payload.tobytes()
+
+
+def commands():
+    # (Ack, Cod, Data): longer commands are followed by shorter ones, whose
+    # payloads must not keep the words of the longer one
+    rng = np.random.default_rng(0)
+
+    def Words(Nr):
+        return rng.integers(0, 2**32, Nr, dtype="uint64").astype("uint32")
+
+    return [
+        (0, 0x7003, np.array([1, 0, 2], dtype="uint32")),
+        (1, 0x9017, Words(78)),
+        (1, 0x9030, Words(1)),
+        (0, 0x9001, np.array([0xFFFFFFFF, 0x80000000], dtype="uint32")),
+        (1, 0x9017, Words(510)),
+        (0, 0x9002, Words(5)),
+        (1, 0x9030, []),
+    ]
+
+
+def test_cmd_send(UsbAdiLinux):
+    Usb = usb_adi(UsbAdiLinux)
+    Ref = []
+    for Ack, Cod, Data in commands():
+        Usb.CmdSend(Ack, Cod, Data)
+        Cmd = Usb.CmdBuild(Ack, Cod, Data)
+        Usb.UsbWrCmd(Cmd)
+        Usb.UsbWriteADICmd(Cmd)
+        Ref += [old_payload(Cmd)] * 3
+    assert len(Usb.usbWrEp.Payloads) == len(Ref)
+    for Payload, RefPayload in zip(Usb.usbWrEp.Payloads, Ref):
+        assert Payload == RefPayload
+
+
+def test_cmd_too_long(UsbAdiLinux):
+    # The length field and 511 words fill the 2048 byte payload
+    Usb = usb_adi(UsbAdiLinux)
+    with pytest.raises(ValueError):
+        Usb.CmdSend(0, 0x9017, np.zeros(511, dtype="uint32"))
+    with pytest.raises(ValueError):
+        Usb.UsbWrCmd(np.zeros(512, dtype="uint32"))
+    assert Usb.usbWrEp.Payloads == []